@@ -0,0 +1,21 @@
+"""Benchmarks of MIDIOgre on synthetic corpora.
+
+The suites are run from the root of the repository:
+
+- `python -m benchmarks.micro`: times every transform, conversion and some
+  `Compose` chains on synthetic pieces from 100 to 1M notes and 1 to 64
+  instruments, reports the time per note and flags superlinear scaling.
+- `python -m benchmarks.loader`: measures the throughput and the p50/p99
+  per-sample latency of a DataLoader running the full pipeline (load, all six
+  augmentations, `ToPRollTensor`, collate) over worker counts, batch sizes and
+  file-length distributions, and writes a JSON report.
+- `python -m benchmarks.memory`: measures the peak RSS and the tracemalloc peak
+  of loading, augmenting and rasterizing files of increasing size, and breaks
+  every file down with `midiogre.inspect.memory_usage`.
+- `python -m benchmarks.imports`: times the import of every module in fresh
+  interpreters and fails if a module that does not need torch or matplotlib
+  imports them, or, with `--max-seconds`, exceeds an import-time budget.
+
+Synthetic pieces are built by `benchmarks.synthetic`, so results do not depend on
+any dataset being available.
+"""
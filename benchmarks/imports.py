@@ -0,0 +1,159 @@
+"""Import-time benchmark of the MIDIOgre modules.
+
+Every module is imported in fresh interpreters, so that nothing is cached from
+earlier imports, and the benchmark reports:
+
+- the median and best wall time of the import statement alone, without the
+  startup of the interpreter,
+- the heavy dependencies it pulled in (torch and matplotlib), which only
+  `ToPRollTensor`, `midiogre.data` and the visualization functions should need,
+- the dependencies that took longest to import, from `python -X importtime`.
+
+With `--max-seconds`, the benchmark exits with status 1 if a module that should
+not need torch or matplotlib imports them or takes longer than the budget, so it
+can guard against import-time regressions in CI.
+
+Example:
+    $ python -m benchmarks.imports --json imports.json
+    $ python -m benchmarks.imports --modules midiogre.augmentations --max-seconds 0.5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from statistics import median
+from typing import Optional, Sequence
+
+# Modules that must not import HEAVY_DEPENDENCIES
+LIGHT_MODULES = ('midiogre', 'midiogre.augmentations', 'midiogre.core', 'midiogre.core.conversions',
+                 'midiogre.core.transforms_viz', 'midiogre.parallel', 'midiogre.inspect', 'midiogre.cli')
+# Modules built on torch, measured for reference
+TORCH_MODULES = ('midiogre.data',)
+HEAVY_DEPENDENCIES = ('torch', 'matplotlib')
+REPEATS = 5
+TOP = 5
+
+_CHILD = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *[name for name in {heavy!r} if name in sys.modules])
+"""
+
+
+def _import_once(module: str, importtime: bool = False) -> tuple:
+    """Import a module in a fresh interpreter and return its wall time, heavy imports and stderr."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += ['-c', _CHILD.format(module=module, heavy=HEAVY_DEPENDENCIES)]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    elapsed, *heavy = completed.stdout.split()
+    return float(elapsed), heavy, completed.stderr
+
+
+def slowest_dependencies(importtime_output: str, top: int = TOP) -> list:
+    """Sum the self import time of every top-level package in `-X importtime` output.
+
+    Returns:
+        list: The `top` slowest (package, seconds) pairs, slowest first.
+    """
+    totals = defaultdict(float)
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def time_import(module: str, repeats: int = REPEATS, top: int = TOP) -> dict:
+    """Time the import of a module in fresh interpreters.
+
+    Args:
+        module (str): Name of the module.
+        repeats (int, optional): Number of timed imports.
+            Default: REPEATS
+        top (int, optional): Number of slowest dependencies to report.
+            Default: TOP
+
+    Returns:
+        dict: The 'median' and 'best' import time in seconds, the 'heavy'
+            dependencies it imported and its 'slowest' dependencies as
+            (package, seconds) pairs.
+    """
+    times = []
+    heavy = []
+    for _ in range(repeats):
+        elapsed, heavy, _ = _import_once(module)
+        times.append(elapsed)
+    _, _, importtime_output = _import_once(module, importtime=True)
+    return {'median': median(times), 'best': min(times), 'heavy': heavy,
+            'slowest': slowest_dependencies(importtime_output, top)}
+
+
+def run(modules: Sequence[str] = LIGHT_MODULES + TORCH_MODULES, repeats: int = REPEATS, top: int = TOP,
+        max_seconds: Optional[float] = None, verbose: bool = True) -> dict:
+    """Time the import of every module and check the light ones.
+
+    Args:
+        modules (Sequence[str], optional): Names of the modules.
+            Default: LIGHT_MODULES and TORCH_MODULES
+        repeats (int, optional): Number of timed imports of every module.
+            Default: REPEATS
+        top (int, optional): Number of slowest dependencies to report.
+            Default: TOP
+        max_seconds (float, optional): Budget of the median import time of the
+            modules of LIGHT_MODULES. If None, only heavy imports are checked.
+            Default: None
+        verbose (bool, optional): Whether to print every result as it is measured.
+            Default: True
+
+    Returns:
+        dict: One result per module under 'results' (see `time_import`), with its
+            'module', and the 'failures' of the light modules, as messages.
+    """
+    if verbose:
+        print(f"{'module':<30}{'median ms':>10}{'best ms':>9}  heavy imports / slowest dependencies")
+
+    results = []
+    failures = []
+    for module in modules:
+        result = {'module': module, **time_import(module, repeats, top)}
+        results.append(result)
+        if module in LIGHT_MODULES:
+            if result['heavy']:
+                failures.append(f"{module} imports {', '.join(result['heavy'])}")
+            if max_seconds is not None and result['median'] > max_seconds:
+                failures.append(f"{module} takes {result['median']:.3f} s to import, above {max_seconds} s")
+        if verbose:
+            slowest = ', '.join(f'{name} {seconds * 1e3:.0f}' for name, seconds in result['slowest'])
+            print(f"{module:<30}{result['median'] * 1e3:>10.1f}{result['best'] * 1e3:>9.1f}  "
+                  f"[{', '.join(result['heavy'])}] {slowest}", flush=True)
+    return {'results': results, 'failures': failures}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.imports', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--modules', nargs='+', default=LIGHT_MODULES + TORCH_MODULES, help="modules to import")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="timed imports per module")
+    parser.add_argument('--top', type=int, default=TOP, help="number of slowest dependencies to show")
+    parser.add_argument('--max-seconds', type=float,
+                        help="fail if a module that does not need torch takes longer to import")
+    parser.add_argument('--json', help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.modules, args.repeats, args.top, args.max_seconds)
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+    for failure in report['failures']:
+        print(failure, file=sys.stderr)
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""End-to-end DataLoader throughput and tail-latency benchmark.
+
+A corpus of synthetic MIDI files (see `benchmarks.synthetic`) is written to a
+temporary directory and read with the full training pipeline: every file is
+loaded with `ConvertToPrettyMIDI`, augmented with a `Compose` of all six
+augmentations, converted with `ToPRollTensor` and collated into zero-padded
+batches by a PyTorch DataLoader. For every combination of worker count, batch
+size and file-length distribution, the harness reports:
+
+- throughput in samples per second, over the whole epoch including worker
+  startup, and in the steady state after the first batch,
+- p50, p90 and p99 per-sample latency, i.e. the time a worker spends loading,
+  augmenting and converting one file,
+- p50 and p99 batch wait, i.e. how long the training loop waits for every batch.
+
+Example:
+    $ python -m benchmarks.loader --json loader.json
+    $ python -m benchmarks.loader --workers 0 4 --batch-sizes 16 --distributions lognormal
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from midiogre.augmentations import DurationShift, NoteAdd, NoteDelete, OnsetTimeShift, PitchShift, TempoShift
+from midiogre.core import Compose, ToPRollTensor
+from midiogre.data import MidiDataset
+
+from benchmarks.synthetic import make_note_table
+
+WORKER_COUNTS = (0, 1, 2, 4)
+BATCH_SIZES = (1, 8, 32)
+DISTRIBUTIONS = ('fixed', 'lognormal', 'bimodal')
+QUICK_WORKER_COUNTS = (0, 2)
+QUICK_BATCH_SIZES = (8,)
+
+NUM_FILES = 64
+MEDIAN_NOTES = 1000
+NUM_INSTRUMENTS = 4
+MIN_NOTES = 16
+MAX_NOTES = 50000
+FS = 25  # Hz, piano roll sampling frequency
+
+
+def file_lengths(distribution: str, num_files: int, median_notes: int, seed: int = 0) -> np.ndarray:
+    """Draw the number of notes of every file of a corpus.
+
+    Args:
+        distribution (str): 'fixed' (every file has `median_notes` notes),
+            'lognormal' (a heavy tail of long files) or 'bimodal' (90% short files
+            and 10% files 32 times longer).
+        num_files (int): Number of files.
+        median_notes (int): Typical number of notes of a file.
+        seed (int, optional): Seed of the draw.
+            Default: 0
+
+    Returns:
+        np.ndarray: Note counts, between MIN_NOTES and MAX_NOTES.
+
+    Raises:
+        ValueError: If the distribution is unknown.
+    """
+    rng = np.random.default_rng(seed)
+    if distribution == 'fixed':
+        lengths = np.full(num_files, median_notes, dtype=np.float64)
+    elif distribution == 'lognormal':
+        lengths = median_notes * rng.lognormal(0.0, 1.0, size=num_files)
+    elif distribution == 'bimodal':
+        lengths = np.where(rng.random(num_files) < 0.9, median_notes / 4, median_notes * 8)
+    else:
+        raise ValueError(f"Unknown distribution {distribution}, expected one of {DISTRIBUTIONS}")
+    return np.clip(lengths.round(), MIN_NOTES, MAX_NOTES).astype(np.int64)
+
+
+def write_corpus(directory: str, lengths: Sequence[int], num_instruments: int = NUM_INSTRUMENTS) -> List[str]:
+    """Write one synthetic MIDI file per note count and return their paths."""
+    paths = []
+    for idx, num_notes in enumerate(lengths):
+        path = os.path.join(directory, f'{idx:05d}.mid')
+        make_note_table(int(num_notes), num_instruments, seed=idx).to_pretty_midi().write(path)
+        paths.append(path)
+    return paths
+
+
+def make_transform() -> Compose:
+    """The augmentation pipeline: all six augmentations."""
+    return Compose([
+        PitchShift(max_shift=3, p=0.5),
+        OnsetTimeShift(max_shift=0.05, p=0.3),
+        DurationShift(max_shift=0.05, p=0.3),
+        NoteDelete(p=0.1),
+        NoteAdd(note_num_range=(40, 80), note_velocity_range=(50, 100), note_duration_range=(0.1, 0.5), p=0.1),
+        TempoShift(max_shift=10, p=0.5),
+    ])
+
+
+class TimedDataset(Dataset):
+    """Dataset returning every item of another dataset with the time taken to get it."""
+
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx: int):
+        start = time.perf_counter()
+        item = self.dataset[idx]
+        return item, time.perf_counter() - start
+
+
+def pad_collate(samples: list) -> tuple:
+    """Stack piano rolls of different lengths into one zero-padded batch.
+
+    Returns:
+        tuple: The batch of shape (batch, 128, longest) and the latency of every
+            sample in seconds.
+    """
+    rolls, latencies = zip(*samples)
+    batch = rolls[0].new_zeros((len(rolls), rolls[0].shape[0], max(roll.shape[-1] for roll in rolls)))
+    for row, roll in zip(batch, rolls):
+        row[:, :roll.shape[-1]] = roll
+    return batch, torch.tensor(latencies, dtype=torch.float64)
+
+
+def run_config(paths: Sequence[str], num_workers: int, batch_size: int) -> dict:
+    """Read a corpus once with one DataLoader configuration.
+
+    Returns:
+        dict: The number of 'samples' and 'batches', the 'wall_time' of the epoch,
+            the 'time_to_first_batch', 'samples_per_second' over the epoch,
+            'steady_samples_per_second' after the first batch, per-sample
+            'latency_p50', 'latency_p90', 'latency_p99' and 'latency_max', and
+            'batch_wait_p50' and 'batch_wait_p99', all in seconds.
+    """
+    dataset = TimedDataset(MidiDataset(paths, make_transform(), ToPRollTensor(fs=FS), seed=0))
+    loader = DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, collate_fn=pad_collate)
+
+    latencies = []
+    waits = []
+    start = last = time.perf_counter()
+    for _, batch_latencies in loader:
+        now = time.perf_counter()
+        waits.append(now - last)
+        latencies.extend(batch_latencies.tolist())
+        last = now
+    wall_time = last - start
+
+    steady_time = wall_time - waits[0]
+    steady_samples = len(latencies) - min(batch_size, len(latencies))
+    return {
+        'samples': len(latencies),
+        'batches': len(waits),
+        'wall_time': wall_time,
+        'time_to_first_batch': waits[0],
+        'samples_per_second': len(latencies) / wall_time,
+        'steady_samples_per_second': steady_samples / steady_time if steady_samples and steady_time > 0 else None,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'latency_max': max(latencies),
+        'batch_wait_p50': float(np.percentile(waits, 50)),
+        'batch_wait_p99': float(np.percentile(waits, 99)),
+    }
+
+
+def environment() -> dict:
+    """Describe the machine and library versions the benchmark ran with."""
+    try:
+        from midiogre._version import __version__
+    except ImportError:  # written by setuptools_scm when the package is built
+        __version__ = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'torch': torch.__version__, 'numpy': np.__version__, 'midiogre': __version__}
+
+
+def run(worker_counts: Sequence[int] = WORKER_COUNTS, batch_sizes: Sequence[int] = BATCH_SIZES,
+        distributions: Sequence[str] = DISTRIBUTIONS, num_files: int = NUM_FILES,
+        median_notes: int = MEDIAN_NOTES, num_instruments: int = NUM_INSTRUMENTS, verbose: bool = True) -> dict:
+    """Sweep worker counts, batch sizes and file-length distributions.
+
+    Args:
+        worker_counts (Sequence[int], optional): DataLoader worker counts.
+            Default: WORKER_COUNTS
+        batch_sizes (Sequence[int], optional): Batch sizes.
+            Default: BATCH_SIZES
+        distributions (Sequence[str], optional): File-length distributions (see
+            `file_lengths`).
+            Default: DISTRIBUTIONS
+        num_files (int, optional): Number of files of every corpus.
+            Default: NUM_FILES
+        median_notes (int, optional): Typical number of notes of a file.
+            Default: MEDIAN_NOTES
+        num_instruments (int, optional): Number of instruments of every file.
+            Default: NUM_INSTRUMENTS
+        verbose (bool, optional): Whether to print every result as it is measured.
+            Default: True
+
+    Returns:
+        dict: The 'environment', the 'settings' and one result per configuration
+            under 'results' (see `run_config`), with its 'distribution',
+            'num_workers' and 'batch_size'.
+    """
+    settings = {'num_files': num_files, 'median_notes': median_notes, 'num_instruments': num_instruments,
+                'fs': FS}
+    results = []
+    if verbose:
+        print(f"{'distribution':<14}{'workers':>8}{'batch':>7}{'samples/s':>11}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'wait p99 ms':>13}")
+
+    for distribution in distributions:
+        directory = tempfile.mkdtemp(prefix='midiogre-loader-')
+        try:
+            paths = write_corpus(directory, file_lengths(distribution, num_files, median_notes), num_instruments)
+            for num_workers in worker_counts:
+                for batch_size in batch_sizes:
+                    result = {'distribution': distribution, 'num_workers': num_workers, 'batch_size': batch_size,
+                              **run_config(paths, num_workers, batch_size)}
+                    results.append(result)
+                    if verbose:
+                        print(f"{distribution:<14}{num_workers:>8}{batch_size:>7}"
+                              f"{result['samples_per_second']:>11.1f}{result['latency_p50'] * 1e3:>9.2f}"
+                              f"{result['latency_p99'] * 1e3:>9.2f}{result['batch_wait_p99'] * 1e3:>13.2f}",
+                              flush=True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    return {'environment': environment(), 'settings': settings, 'results': results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loader', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', help=f"worker counts (default: {WORKER_COUNTS})")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', help=f"batch sizes (default: {BATCH_SIZES})")
+    parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=DISTRIBUTIONS,
+                        help="file-length distributions")
+    parser.add_argument('--files', type=int, default=NUM_FILES, help="number of files per corpus")
+    parser.add_argument('--median-notes', type=int, default=MEDIAN_NOTES, help="typical number of notes of a file")
+    parser.add_argument('--instruments', type=int, default=NUM_INSTRUMENTS, help="instruments per file")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"use {QUICK_WORKER_COUNTS} workers and batch sizes {QUICK_BATCH_SIZES}")
+    parser.add_argument('--json', help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers or (QUICK_WORKER_COUNTS if args.quick else WORKER_COUNTS)
+    batch_sizes = args.batch_sizes or (QUICK_BATCH_SIZES if args.quick else BATCH_SIZES)
+    report = run(worker_counts, batch_sizes, args.distributions, args.files, args.median_notes, args.instruments)
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Memory-footprint benchmark of loading, augmenting and rasterizing files.
+
+Every stage is run on synthetic files (see `benchmarks.synthetic`) of increasing
+size, each time in a fresh process, so that measurements do not inherit memory
+from earlier runs:
+
+- once to measure the peak resident set size (RSS) of the process during the
+  stage, above the RSS after imports (on Linux; elsewhere, the peak RSS since
+  the process started, which can hide stages that need less than the imports),
+- once under `tracemalloc`, to measure the peak of the memory allocated by Python
+  and NumPy during the stage, which tracemalloc itself would inflate in the
+  first run.
+
+The loaded object is also broken down with `midiogre.inspect.memory_usage`, to
+show whether Note objects, pretty_midi's tick table or the piano roll dominate.
+
+Example:
+    $ python -m benchmarks.memory --json memory.json
+    $ python -m benchmarks.memory --notes 100000 1000000 --instruments 64 --stages load rasterize
+"""
+
+import argparse
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Optional, Sequence
+
+from midiogre.augmentations import DurationShift, NoteAdd, NoteDelete, OnsetTimeShift, PitchShift, TempoShift
+from midiogre.core import Compose, ConvertToNoteTable, ToPRollNumpy, ToPRollTensor
+from midiogre.core.conversions import ConvertToPrettyMIDI
+from midiogre.inspect import memory_usage
+
+from benchmarks.synthetic import SyntheticPiece
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+NOTE_COUNTS = (1000, 10000, 100000, 1000000)
+INSTRUMENT_COUNTS = (16,)
+FS = 100  # Hz, piano roll sampling frequency
+
+
+def _augment(midi_data):
+    return Compose([
+        PitchShift(max_shift=3, p=0.5, seed=0),
+        OnsetTimeShift(max_shift=0.05, p=0.3, seed=0),
+        DurationShift(max_shift=0.05, p=0.3, seed=0),
+        NoteDelete(p=0.1, seed=0),
+        NoteAdd(note_num_range=(40, 80), note_velocity_range=(50, 100), note_duration_range=(0.1, 0.5), p=0.1,
+                seed=0),
+        TempoShift(max_shift=10, p=0.5, seed=0),
+    ])(midi_data)
+
+
+# Every stage maps a path to the objects it leaves in memory
+STAGES = {
+    'load': lambda path: {'midi_data': ConvertToPrettyMIDI()(path)},
+    'load_native': lambda path: {'midi_data': ConvertToPrettyMIDI(parser='native')(path)},
+    'load_note_table': lambda path: {'midi_data': ConvertToNoteTable(parser='native')(path)},
+    'augment': lambda path: {'midi_data': _augment(ConvertToPrettyMIDI()(path))},
+    'rasterize': lambda path: _rasterize(ConvertToPrettyMIDI()(path), ToPRollNumpy(fs=FS)),
+    'pipeline': lambda path: _rasterize(_augment(ConvertToPrettyMIDI()(path)), ToPRollTensor(fs=FS)),
+}
+
+
+def _rasterize(midi_data, conversion) -> dict:
+    return {'midi_data': midi_data, 'roll': conversion(midi_data)}
+
+
+def _read_status(field: str) -> Optional[int]:
+    """Read a memory field of /proc/self/status in bytes, on Linux."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> Optional[int]:
+    """Reset the peak RSS of this process to its current RSS, where possible, and return it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+    return _read_status('VmRSS') or _peak_rss()
+
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes."""
+    peak = _read_status('VmHWM')
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _measure(stage: str, path: str, trace: bool) -> dict:
+    """Run a stage in this process and measure its memory."""
+    baseline = _reset_peak_rss()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    objects = STAGES[stage](path)
+    elapsed = time.perf_counter() - start
+
+    if trace:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {'tracemalloc_peak': peak, 'tracemalloc_current': current}
+
+    peak_rss = _peak_rss()
+    result = {'time': elapsed, 'baseline_rss': baseline, 'peak_rss': peak_rss,
+              'peak_rss_delta': peak_rss - baseline if peak_rss is not None else None,
+              'usage': memory_usage(objects['midi_data'], fs=FS)}
+    if 'roll' in objects:
+        roll = objects['roll']
+        result['roll_nbytes'] = roll.element_size() * roll.nelement() if hasattr(roll, 'nelement') else roll.nbytes
+    return result
+
+
+def _context():
+    """Start method giving every measurement a fresh process with modules already imported."""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def measure_stage(stage: str, path: str) -> dict:
+    """Measure the memory of one stage on one file, in fresh processes.
+
+    Returns:
+        dict: The 'time' of the stage in seconds and, in bytes, the 'baseline_rss'
+            after imports, the 'peak_rss' and the 'peak_rss_delta' between them
+            (None where RSS cannot be measured), the 'tracemalloc_peak' and the
+            'tracemalloc_current' allocations left at the end of the stage, the
+            'usage' of the loaded object (see `midiogre.inspect.memory_usage`) and
+            the 'roll_nbytes' of the piano roll, if the stage rasterizes.
+    """
+    result = {}
+    for trace in (False, True):
+        with _context().Pool(1) as pool:
+            result.update(pool.apply(_measure, (stage, path, trace)))
+    return result
+
+
+def run(note_counts: Sequence[int] = NOTE_COUNTS, instrument_counts: Sequence[int] = INSTRUMENT_COUNTS,
+        stages: Sequence[str] = tuple(STAGES), verbose: bool = True) -> dict:
+    """Measure every stage on synthetic files over a grid of sizes.
+
+    Args:
+        note_counts (Sequence[int], optional): Numbers of notes of the files.
+            Default: NOTE_COUNTS
+        instrument_counts (Sequence[int], optional): Numbers of instruments.
+            Default: INSTRUMENT_COUNTS
+        stages (Sequence[str], optional): Names of the stages, see `STAGES`.
+            Default: all
+        verbose (bool, optional): Whether to print every result as it is measured.
+            Default: True
+
+    Returns:
+        dict: The 'fs' of the piano rolls and one result per stage and file under
+            'results' (see `measure_stage`), with its 'stage', 'notes' and
+            'instruments'.
+
+    Raises:
+        ValueError: If a stage is unknown.
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}, expected some of {list(STAGES)}")
+
+    if verbose:
+        print(f"{'stage':<17}{'instr':>6}{'notes':>9}{'RSS +MiB':>10}{'traced MiB':>12}{'notes MiB':>11}"
+              f"{'ticks MiB':>11}{'roll MiB':>10}")
+
+    mib = 2 ** 20
+    results = []
+    directory = tempfile.mkdtemp(prefix='midiogre-memory-')
+    try:
+        for num_instruments in instrument_counts:
+            for num_notes in note_counts:
+                path = SyntheticPiece(num_notes, num_instruments, directory=directory).path
+                for stage in stages:
+                    result = {'stage': stage, 'notes': num_notes, 'instruments': num_instruments,
+                              **measure_stage(stage, path)}
+                    results.append(result)
+                    if verbose:
+                        usage = result['usage']
+                        rss = f"{result['peak_rss_delta'] / mib:.1f}" if result['peak_rss_delta'] is not None else '-'
+                        roll = f"{result['roll_nbytes'] / mib:.1f}" if 'roll_nbytes' in result else '-'
+                        print(f"{stage:<17}{num_instruments:>6}{num_notes:>9}{rss:>10}"
+                              f"{result['tracemalloc_peak'] / mib:>12.1f}{usage['notes'] / mib:>11.1f}"
+                              f"{usage.get('tick_table', 0) / mib:>11.1f}{roll:>10}", flush=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {'fs': FS, 'results': results}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notes', type=int, nargs='+', default=NOTE_COUNTS, help="note counts")
+    parser.add_argument('--instruments', type=int, nargs='+', default=INSTRUMENT_COUNTS, help="instrument counts")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help="stages")
+    parser.add_argument('--json', help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.notes, args.instruments, args.stages)
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""Micro-benchmarks of every transform, conversion and some Compose chains.
+
+Every benchmark is timed on synthetic pieces (see `benchmarks.synthetic`) over a
+grid of note and instrument counts. The best of several calls is reported, with
+the time per note, and the scaling of every benchmark is checked between
+neighbouring grid points: if the time grows faster than the number of notes (at a
+fixed number of instruments), or grows with the number of instruments faster than
+linearly (at a fixed number of notes), the step is flagged as superlinear.
+
+Example:
+    $ python -m benchmarks.micro                       # full grid, takes several minutes
+    $ python -m benchmarks.micro --quick               # up to 10k notes
+    $ python -m benchmarks.micro --filter 'PitchShift|ToPRoll' --json micro.json
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from midiogre.augmentations import DurationShift, NoteAdd, NoteDelete, OnsetTimeShift, PitchShift, TempoShift
+from midiogre.core import Compose, ConvertToNoteTable, ToPRollNumpy, ToPRollTensor
+from midiogre.core.conversions import ConvertToMido, ConvertToPrettyMIDI
+
+from benchmarks.synthetic import SyntheticPiece
+
+NOTE_COUNTS = (100, 1000, 10000, 100000, 1000000)
+INSTRUMENT_COUNTS = (1, 4, 16, 64)
+QUICK_NOTE_COUNTS = (100, 1000, 10000)
+QUICK_INSTRUMENT_COUNTS = (1, 8)
+
+MIN_TIME = 0.2  # seconds spent on every grid point, at least one call
+MAX_REPEATS = 20
+# Steps whose slower time is below this are too noisy to be flagged
+MIN_FLAGGED_TIME = 1e-3  # seconds
+SUPERLINEAR_EXPONENT = 1.2
+
+
+class Benchmark(NamedTuple):
+    """A callable timed on one representation of the synthetic pieces.
+
+    Attributes:
+        name (str): Name of the benchmark.
+        make (callable): Creates the callable, e.g. a seeded transform.
+        input_kind (str): Representation of the piece passed to the callable (see
+            `benchmarks.synthetic.INPUT_KINDS`).
+    """
+    name: str
+    make: Callable
+    input_kind: str
+
+
+def _note_transforms() -> list:
+    return [PitchShift(max_shift=5, p=1.0, seed=0), OnsetTimeShift(max_shift=0.05, p=1.0, seed=0),
+            DurationShift(max_shift=0.05, p=1.0, seed=0), NoteDelete(p=0.2, seed=0),
+            NoteAdd(note_num_range=(40, 80), note_velocity_range=(50, 100), note_duration_range=(0.1, 0.5), p=0.2,
+                    seed=0)]
+
+
+def _augmentation_benchmarks() -> list:
+    benchmarks = []
+    for position, name in enumerate(['PitchShift', 'OnsetTimeShift', 'DurationShift', 'NoteDelete', 'NoteAdd']):
+        for input_kind in ('note_table', 'pretty_midi'):
+            benchmarks.append(Benchmark(f'{name}[{input_kind}]',
+                                        lambda position=position: _note_transforms()[position], input_kind))
+    for input_kind in ('note_table', 'pretty_midi', 'mido'):
+        benchmarks.append(Benchmark(f'TempoShift[{input_kind}]', lambda: TempoShift(max_shift=20, p=1.0, seed=0),
+                                    input_kind))
+    return benchmarks
+
+
+def _expand(k: int) -> Callable:
+    transform = Compose(_note_transforms())
+    return lambda note_table: transform.expand(note_table, k)
+
+
+BENCHMARKS = _augmentation_benchmarks() + [
+    Benchmark('ConvertToMido[path]', ConvertToMido, 'path'),
+    Benchmark('ConvertToPrettyMIDI[path]', ConvertToPrettyMIDI, 'path'),
+    Benchmark('ConvertToPrettyMIDI[path,native]', lambda: ConvertToPrettyMIDI(parser='native'), 'path'),
+    Benchmark('ConvertToNoteTable[pretty_midi]', ConvertToNoteTable, 'pretty_midi'),
+    Benchmark('ConvertToNoteTable[path,native]', lambda: ConvertToNoteTable(parser='native'), 'path'),
+    Benchmark('ToPRollNumpy[note_table]', lambda: ToPRollNumpy(fs=100), 'note_table'),
+    Benchmark('ToPRollTensor[note_table]', lambda: ToPRollTensor(fs=100), 'note_table'),
+    Benchmark('Compose[notes]', lambda: Compose(_note_transforms()), 'note_table'),
+    Benchmark('Compose[full]', lambda: Compose(_note_transforms() + [TempoShift(max_shift=20, p=1.0, seed=0),
+                                                                      ToPRollNumpy(fs=100)]), 'pretty_midi'),
+    Benchmark('Compose.expand[k=8]', lambda: _expand(8), 'note_table'),
+]
+
+
+def time_benchmark(benchmark: Benchmark, piece: SyntheticPiece, min_time: float = MIN_TIME,
+                   max_repeats: int = MAX_REPEATS) -> dict:
+    """Time a benchmark on one piece.
+
+    The callable is called on fresh copies of the piece until `min_time` seconds
+    were spent in it, or `max_repeats` times. Copying is not timed.
+
+    Returns:
+        dict: The benchmark 'name', the 'notes' and 'instruments' of the piece,
+            the number of 'repeats', and the 'best' and 'median' times in seconds
+            and the best time per note in nanoseconds ('ns_per_note').
+    """
+    func = benchmark.make()
+    times = []
+    while len(times) < max(max_repeats, 1) and (not times or sum(times) < min_time):
+        midi_data = piece.fresh(benchmark.input_kind)
+        start = time.perf_counter()
+        func(midi_data)
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    return {'name': benchmark.name, 'notes': piece.num_notes, 'instruments': piece.num_instruments,
+            'repeats': len(times), 'best': times[0], 'median': times[len(times) // 2],
+            'ns_per_note': times[0] / max(piece.num_notes, 1) * 1e9}
+
+
+def _exponent(size_a: int, time_a: float, size_b: int, time_b: float) -> float:
+    """Exponent of the power law through two (size, time) points."""
+    return math.log(time_b / time_a) / math.log(size_b / size_a)
+
+
+def find_superlinear(results: List[dict], threshold: float = SUPERLINEAR_EXPONENT,
+                     min_time: float = MIN_FLAGGED_TIME) -> List[dict]:
+    """Find steps of the grid over which a benchmark scales superlinearly.
+
+    Args:
+        results (list[dict]): Results of `time_benchmark`.
+        threshold (float, optional): Exponent above which a step is flagged.
+            Default: SUPERLINEAR_EXPONENT
+        min_time (float, optional): Steps whose slower time is below this many
+            seconds are not flagged, since they are dominated by noise.
+            Default: MIN_FLAGGED_TIME
+
+    Returns:
+        list[dict]: For every flagged step, the benchmark 'name', the 'axis'
+            ('notes' or 'instruments'), the value of the other axis ('fixed'), the
+            two sizes ('from', 'to') and the 'exponent'.
+    """
+    flags = []
+    for axis, other in (('notes', 'instruments'), ('instruments', 'notes')):
+        series = {}
+        for result in results:
+            series.setdefault((result['name'], result[other]), []).append(result)
+        for (name, fixed), points in series.items():
+            points = sorted(points, key=lambda result: result[axis])
+            for small, large in zip(points, points[1:]):
+                if large['best'] < min_time or small['best'] <= 0:
+                    continue
+                exponent = _exponent(small[axis], small['best'], large[axis], large['best'])
+                if exponent > threshold:
+                    flags.append({'name': name, 'axis': axis, 'fixed': fixed, 'from': small[axis],
+                                  'to': large[axis], 'exponent': exponent})
+    return flags
+
+
+def run(note_counts: Sequence[int] = NOTE_COUNTS, instrument_counts: Sequence[int] = INSTRUMENT_COUNTS,
+        pattern: Optional[str] = None, min_time: float = MIN_TIME, max_repeats: int = MAX_REPEATS,
+        verbose: bool = True) -> dict:
+    """Run the benchmarks over a grid of pieces.
+
+    Args:
+        note_counts (Sequence[int], optional): Numbers of notes of the pieces.
+            Default: NOTE_COUNTS
+        instrument_counts (Sequence[int], optional): Numbers of instruments.
+            Default: INSTRUMENT_COUNTS
+        pattern (str, optional): Regular expression selecting benchmarks by name.
+            Default: None (all)
+        min_time (float, optional): Seconds spent on every grid point.
+            Default: MIN_TIME
+        max_repeats (int, optional): Maximum number of calls per grid point.
+            Default: MAX_REPEATS
+        verbose (bool, optional): Whether to print every result as it is measured.
+            Default: True
+
+    Returns:
+        dict: The 'results' (see `time_benchmark`) and the steps flagged as
+            'superlinear' (see `find_superlinear`).
+    """
+    benchmarks = [benchmark for benchmark in BENCHMARKS if pattern is None or re.search(pattern, benchmark.name)]
+    if verbose:
+        print(f"{'benchmark':<36}{'instr':>6}{'notes':>10}{'best':>12}{'ns/note':>11}")
+
+    results = []
+    for num_instruments in instrument_counts:
+        for num_notes in note_counts:
+            piece = SyntheticPiece(num_notes, num_instruments)
+            for benchmark in benchmarks:
+                result = time_benchmark(benchmark, piece, min_time, max_repeats)
+                results.append(result)
+                if verbose:
+                    print(f"{result['name']:<36}{num_instruments:>6}{num_notes:>10}"
+                          f"{result['best'] * 1e3:>10.3f}ms{result['ns_per_note']:>11.1f}", flush=True)
+
+    flags = find_superlinear(results)
+    if verbose:
+        print()
+        for flag in flags:
+            other = 'instruments' if flag['axis'] == 'notes' else 'notes'
+            print(f"SUPERLINEAR {flag['name']}: {flag['axis']} {flag['from']} -> {flag['to']} at "
+                  f"{other}={flag['fixed']}, exponent {flag['exponent']:.2f}")
+        if not flags:
+            print("No superlinear scaling found")
+    return {'results': results, 'superlinear': flags}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.micro', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notes', type=int, nargs='+', help=f"note counts (default: {NOTE_COUNTS})")
+    parser.add_argument('--instruments', type=int, nargs='+',
+                        help=f"instrument counts (default: {INSTRUMENT_COUNTS})")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"use {QUICK_NOTE_COUNTS} notes and {QUICK_INSTRUMENT_COUNTS} instruments")
+    parser.add_argument('--filter', help="regular expression selecting benchmarks by name")
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help="seconds spent on every grid point")
+    parser.add_argument('--json', help="write the results to this JSON file")
+    parser.add_argument('--strict', action='store_true', help="exit with status 1 if any scaling is superlinear")
+    args = parser.parse_args(argv)
+
+    note_counts = args.notes or (QUICK_NOTE_COUNTS if args.quick else NOTE_COUNTS)
+    instrument_counts = args.instruments or (QUICK_INSTRUMENT_COUNTS if args.quick else INSTRUMENT_COUNTS)
+    report = run(note_counts, instrument_counts, args.filter, args.min_time)
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+    return 1 if args.strict and report['superlinear'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
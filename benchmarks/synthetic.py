@@ -0,0 +1,147 @@
+"""Synthetic pieces of any size for benchmarks.
+
+Pieces are scaled-up versions of the test and demo data: every instrument repeats
+the C major scale pattern of `demo/generate_examples.create_sample_midi`, moved
+by one octave per instrument and with velocities and onsets jittered by a seeded
+generator, and notes are spread evenly over instruments like in
+`tests/core_mocks.generate_mock_midi_data`.
+
+Pieces last at most `MAX_DURATION` seconds, so large pieces get denser rather
+than longer, like orchestral scores, and piano rolls of any piece fit in memory.
+
+Example:
+    >>> piece = SyntheticPiece(num_notes=100000, num_instruments=16)
+    >>> note_table = piece.fresh('note_table')
+    >>> midi_data = piece.fresh('pretty_midi')
+"""
+
+import os
+import tempfile
+
+import mido
+import numpy as np
+import pretty_midi
+
+from midiogre.core import NoteTable, clone
+
+SCALE = np.array([60, 62, 64, 65, 67, 69, 71, 72])  # C major, as in the demo
+NOTE_STEP = 0.5  # seconds between onsets of an instrument, until pieces get too long
+NOTE_DURATION = 0.5  # seconds
+MAX_DURATION = 600.0  # seconds
+
+INPUT_KINDS = ('note_table', 'pretty_midi', 'mido', 'path')
+
+
+def make_note_table(num_notes: int, num_instruments: int = 1, seed: int = 0) -> NoteTable:
+    """Build a synthetic piece as a NoteTable.
+
+    Args:
+        num_notes (int): Total number of notes.
+        num_instruments (int, optional): Number of instruments; notes are spread
+            evenly over them.
+            Default: 1
+        seed (int, optional): Seed of the jitter of velocities and onsets.
+            Default: 0
+
+    Returns:
+        NoteTable: The piece, with notes sorted by instrument and onset.
+
+    Raises:
+        ValueError: If num_notes is negative or num_instruments is not positive.
+    """
+    if num_notes < 0 or num_instruments < 1:
+        raise ValueError(f"Need at least one instrument and no negative note count, got {num_notes} notes and "
+                         f"{num_instruments} instruments")
+
+    rng = np.random.default_rng(seed)
+    instrument = np.repeat(np.arange(num_instruments), np.diff(np.linspace(0, num_notes, num_instruments + 1)
+                                                               .round().astype(np.int64)))
+    # Position of every note within its instrument
+    first_note = np.searchsorted(instrument, np.arange(num_instruments))
+    position = np.arange(num_notes) - first_note[instrument]
+    notes_per_instrument = np.bincount(instrument, minlength=num_instruments)
+    step = np.minimum(NOTE_STEP, MAX_DURATION / np.maximum(notes_per_instrument, 1))[instrument]
+
+    octave = 12 * (instrument % 5 - 2)
+    pitch = np.clip(SCALE[position % len(SCALE)] + octave, 0, 127)
+    velocity = rng.integers(60, 110, size=num_notes)
+    start = position * step + rng.uniform(0, 0.25, size=num_notes) * step
+    end = start + NOTE_DURATION
+
+    programs = np.arange(num_instruments) % 128
+    return NoteTable(pitch=pitch, velocity=velocity, start=start, end=end, instrument=instrument,
+                     programs=programs, names=[f'instrument {idx}' for idx in range(num_instruments)])
+
+
+class SyntheticPiece:
+    """A synthetic piece, available as a NoteTable, PrettyMIDI object, Mido file or file path.
+
+    Every representation is built once, when it is first needed, and `fresh`
+    returns copies, so transforms that modify their input in place can be timed
+    repeatedly on the same data.
+
+    Args:
+        num_notes (int): Total number of notes.
+        num_instruments (int, optional): Number of instruments.
+            Default: 1
+        seed (int, optional): Seed of the piece.
+            Default: 0
+        directory (str, optional): Directory the MIDI file is written to.
+            Default: None (a temporary directory)
+    """
+
+    def __init__(self, num_notes: int, num_instruments: int = 1, seed: int = 0, directory: str = None):
+        self.num_notes = num_notes
+        self.num_instruments = num_instruments
+        self.note_table = make_note_table(num_notes, num_instruments, seed)
+        self._directory = directory
+        self._pretty_midi = None
+        self._mido = None
+        self._path = None
+
+    def __repr__(self):
+        return f"SyntheticPiece(num_notes={self.num_notes}, num_instruments={self.num_instruments})"
+
+    @property
+    def pretty_midi(self) -> pretty_midi.PrettyMIDI:
+        if self._pretty_midi is None:
+            self._pretty_midi = self.note_table.to_pretty_midi()
+        return self._pretty_midi
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix='midiogre-benchmark-')
+            self._path = os.path.join(self._directory, f'{self.num_notes}_{self.num_instruments}.mid')
+            self.pretty_midi.write(self._path)
+        return self._path
+
+    @property
+    def mido(self) -> mido.MidiFile:
+        if self._mido is None:
+            self._mido = mido.MidiFile(self.path)
+        return self._mido
+
+    def fresh(self, kind: str):
+        """Get the piece in one representation, safe to modify.
+
+        Args:
+            kind (str): One of `INPUT_KINDS`. Mido files are shared rather than
+                copied, since only their tempo events are ever modified.
+
+        Returns:
+            The piece.
+
+        Raises:
+            ValueError: If the kind is unknown.
+        """
+        if kind == 'note_table':
+            return self.note_table.copy()
+        if kind == 'pretty_midi':
+            return clone(self.pretty_midi)
+        if kind == 'mido':
+            return self.mido
+        if kind == 'path':
+            return self.path
+        raise ValueError(f"Unknown input kind {kind}, expected one of {INPUT_KINDS}")
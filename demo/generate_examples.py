@@ -14,14 +14,12 @@ The results are saved in the following structure:
 
 import os
 from pathlib import Path
-import copy
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pretty_midi
-import mido
 
-from midiogre.core import Compose
+from midiogre.core import Compose, clone
 from midiogre.core.transforms_viz import (
     load_midi, 
     save_midi, 
@@ -110,19 +108,8 @@ def generate_examples():
         print(f"Generating {transform_name} example...")
         
         # Apply transformation
-        midi_copy = copy.deepcopy(midi_data)
-        
-        if transform_name == "TempoShift":
-            # Save and load as Mido for tempo shift
-            temp_path = MIDI_TRANS_DIR / "temp.mid"
-            save_midi(midi_copy, str(temp_path))
-            mido_data = mido.MidiFile(str(temp_path))
-            transformed_mido = transform(mido_data)
-            transformed_mido.save(str(temp_path))  # Use Mido's save method
-            transformed = pretty_midi.PrettyMIDI(str(temp_path))  # Load with new tempo
-            temp_path.unlink()  # Clean up temp file
-        else:
-            transformed = transform(midi_copy)
+        midi_copy = clone(midi_data)
+        transformed = transform(midi_copy)
         
         # Save transformed MIDI
         trans_midi_path = MIDI_TRANS_DIR / f"{transform_name.lower()}.mid"
@@ -13,6 +13,7 @@ Available Transforms:
 
 All transforms follow a consistent interface inherited from BaseMidiTransform:
     - They are callable objects that take a PrettyMIDI object as input
+    - Note-level transforms also accept a columnar NoteTable (see midiogre.core.note_table)
     - They support probabilistic application through the 'p' parameter
     - They handle multi-instrument MIDI files through the 'p_instruments' parameter
 
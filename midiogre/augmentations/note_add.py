@@ -27,11 +27,12 @@ Example:
     >>> transformed = transform(midi_data)
 """
 
-import math
+from typing import Optional
 
 import numpy as np
-from pretty_midi import Note
 
+from midiogre.core.note_table import NoteTable
+from midiogre.core.profiling import report
 from midiogre.core.transforms_interface import BaseMidiTransform
 
 
@@ -71,6 +72,10 @@ class NoteAdd(BaseMidiTransform):
             Default: 0.2
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int, optional): Seed of the random generator of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from instead.
+            Default: None
             
     Raises:
         ValueError: If any of the following conditions are met:
@@ -96,7 +101,7 @@ class NoteAdd(BaseMidiTransform):
 
     def __init__(self, note_num_range: (int, int), note_velocity_range: (int, int), note_duration_range: (int, int),
                  restrict_to_instrument_time: bool = True, p_instruments: float = 1.0, p: float = 0.2,
-                 eps: float = 1e-12):
+                 eps: float = 1e-12, seed: Optional[int] = None, rng: Optional[np.random.Generator] = None):
         """Initialize the NoteAdd transform.
         
         Args:
@@ -115,7 +120,7 @@ class NoteAdd(BaseMidiTransform):
         Raises:
             ValueError: If parameters are invalid (see class docstring for details).
         """
-        super().__init__(p_instruments=p_instruments, p=p, eps=eps)
+        super().__init__(p_instruments=p_instruments, p=p, eps=eps, seed=seed, rng=rng)
 
         if len(note_num_range) != 2 or note_num_range[1] < note_num_range[0]:
             raise ValueError(
@@ -155,16 +160,18 @@ class NoteAdd(BaseMidiTransform):
 
         self.restrict_to_instrument_time = restrict_to_instrument_time
 
-    def __generate_n_midi_notes(self, n: int, instrument_end_time: float) -> list:
+    def __generate_n_midi_notes(self, n: int, instrument_end_time) -> NoteTable:
         """Generate n random MIDI notes within the configured ranges.
         
         Args:
             n (int): Number of notes to generate.
-            instrument_end_time (float): End time of the last note in the instrument.
-                Used when restrict_to_instrument_time is True.
+            instrument_end_time (float or np.ndarray): End time of the last note in the
+                instrument, or one end time per generated note when notes are generated
+                for several instruments at once. Used when restrict_to_instrument_time
+                is True.
                 
         Returns:
-            list[Note]: List of n randomly generated MIDI notes.
+            NoteTable: Single-instrument table of n randomly generated MIDI notes.
             
         Note:
             Generated notes have:
@@ -175,29 +182,34 @@ class NoteAdd(BaseMidiTransform):
             - End times clipped to instrument_end_time if restrict_to_instrument_time
         """
         # Vectorized random number generation
-        start_times = np.random.uniform(0, instrument_end_time, n)
-        pitches = np.random.randint(self.min_note_num, self.max_note_num + 1, n)
-        velocities = np.random.randint(self.min_velo, self.max_velo + 1, n)
-        durations = np.random.uniform(self.min_durn, self.max_durn, n)
+        start_times = self.rng.uniform(0, instrument_end_time, n)
+        pitches = self.rng.integers(self.min_note_num, self.max_note_num + 1, n)
+        velocities = self.rng.integers(self.min_velo, self.max_velo + 1, n)
+        durations = self.rng.uniform(self.min_durn, self.max_durn, n)
         end_times = np.clip(start_times + durations, None, instrument_end_time)
         
-        # Create notes in a list comprehension for better performance
-        return [Note(pitch=int(p), velocity=int(v), start=float(s), end=float(e)) 
-                for p, v, s, e in zip(pitches, velocities, start_times, end_times)]
-
-    def apply(self, midi_data):
-        """Apply the note addition transformation to the MIDI data.
+        return NoteTable(
+            pitch=pitches,
+            velocity=velocities,
+            start=start_times,
+            end=end_times,
+            instrument=np.zeros(n, dtype=np.int32)
+        )
+
+    def apply_to_instruments(self, note_table, instrument_ids):
+        """Apply the note addition transformation to selected instruments of a NoteTable.
         
-        For each non-drum instrument selected based on p_instruments, this method:
+        For each selected instrument, this method:
         1. Determines the number of notes to add based on p
         2. Generates random notes within the configured ranges
         3. Adds the new notes to the instrument track
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to transform.
+            note_table (NoteTable): The notes to transform.
+            instrument_ids (list[int]): Instruments selected for modification.
             
         Returns:
-            pretty_midi.PrettyMIDI: The transformed MIDI data with added notes.
+            NoteTable: The transformed notes with added notes.
             
         Note:
             - Drum instruments are skipped by default
@@ -206,16 +218,33 @@ class NoteAdd(BaseMidiTransform):
             - If restrict_to_instrument_time is True, new notes won't extend beyond
               the end of existing notes in the track
         """
-        modified_instruments = self._get_modified_instruments_list(midi_data)
-        for instrument in modified_instruments:
-            if not instrument.notes:  # Skip empty instruments
-                continue
-            num_new_notes = math.ceil(np.random.uniform(self.eps, self.p) * len(instrument.notes))
-            if num_new_notes > 0:  # Only generate notes if we need to
-                instrument.notes.extend(
-                    self.__generate_n_midi_notes(
-                        n=num_new_notes,
-                        instrument_end_time=instrument.notes[-1].end
-                    )
-                )
-        return midi_data
+        instrument_groups = note_table.instrument_groups()
+        # Skip empty instruments
+        instrument_ids = [idx for idx in instrument_ids if len(instrument_groups[idx]) > 0]
+        if not instrument_ids:
+            return note_table
+
+        # Draw the number of new notes for every instrument at once
+        num_notes = np.array([len(instrument_groups[idx]) for idx in instrument_ids])
+        num_new_notes = np.ceil(
+            self.rng.uniform(self.eps, self.p, len(instrument_ids)) * num_notes
+        ).astype(np.int64)
+        if num_new_notes.sum() == 0:
+            return note_table
+        report(added=int(num_new_notes.sum()))
+
+        instrument_end_times = note_table.end[[instrument_groups[idx][-1] for idx in instrument_ids]]
+        new_notes = self.__generate_n_midi_notes(
+            n=int(num_new_notes.sum()),
+            instrument_end_time=np.repeat(instrument_end_times, num_new_notes)
+        )
+
+        # Append all generated notes in a single concatenation
+        note_table.append(
+            pitch=new_notes.pitch,
+            velocity=new_notes.velocity,
+            start=new_notes.start,
+            end=new_notes.end,
+            instrument=np.repeat(instrument_ids, num_new_notes)
+        )
+        return note_table
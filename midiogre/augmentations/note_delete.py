@@ -22,13 +22,11 @@ Example:
     >>> transformed = transform(midi_data)
 """
 
-import logging
-import math
-import random
-from operator import itemgetter
+from typing import Optional
 
 import numpy as np
 
+from midiogre.core.profiling import report
 from midiogre.core.transforms_interface import BaseMidiTransform
 
 
@@ -52,6 +50,10 @@ class NoteDelete(BaseMidiTransform):
             Default: 0.2
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int, optional): Seed of the random generator of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from instead.
+            Default: None
             
     Raises:
         ValueError: If any of the following conditions are met:
@@ -67,7 +69,8 @@ class NoteDelete(BaseMidiTransform):
         >>> transformed = transform(midi_data)
     """
 
-    def __init__(self, p_instruments: float = 1.0, p: float = 0.2, eps: float = 1e-12):
+    def __init__(self, p_instruments: float = 1.0, p: float = 0.2, eps: float = 1e-12,
+                 seed: Optional[int] = None, rng: Optional[np.random.Generator] = None):
         """Initialize the NoteDelete transform.
         
         Args:
@@ -81,21 +84,22 @@ class NoteDelete(BaseMidiTransform):
         Raises:
             ValueError: If parameters are invalid (see class docstring for details).
         """
-        super().__init__(p_instruments=p_instruments, p=p, eps=eps)
+        super().__init__(p_instruments=p_instruments, p=p, eps=eps, seed=seed, rng=rng)
 
-    def apply(self, midi_data):
-        """Apply the note deletion transformation to the MIDI data.
+    def apply_to_instruments(self, note_table, instrument_ids):
+        """Apply the note deletion transformation to selected instruments of a NoteTable.
         
-        For each non-drum instrument selected based on p_instruments, this method:
+        For each selected instrument, this method:
         1. Determines the number of notes to delete based on p
         2. Randomly selects notes for deletion
         3. Removes the selected notes from the instrument track
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to transform.
+            note_table (NoteTable): The notes to transform.
+            instrument_ids (list[int]): Instruments selected for modification.
             
         Returns:
-            pretty_midi.PrettyMIDI: The transformed MIDI data with notes deleted.
+            NoteTable: The transformed notes with notes deleted.
             
         Note:
             - Drum instruments are skipped by default
@@ -103,16 +107,18 @@ class NoteDelete(BaseMidiTransform):
             - Notes are selected for deletion uniformly at random
             - Empty instruments (no notes) are skipped
         """
-        modified_instruments = self._get_modified_instruments_list(midi_data)
-        for instrument in modified_instruments:
-            if not instrument.notes:  # Skip empty instruments
-                continue
-            num_notes_to_delete = math.ceil(np.random.uniform(self.eps, self.p) * len(instrument.notes))
-            if num_notes_to_delete > 0:  # Only delete if we need to
-                indices_to_keep = np.random.choice(
-                    len(instrument.notes),
-                    size=len(instrument.notes) - num_notes_to_delete,
-                    replace=False
-                )
-                instrument.notes = [instrument.notes[i] for i in sorted(indices_to_keep)]
-        return midi_data
+        instrument_groups = note_table.instrument_groups()
+        num_notes = np.array([len(instrument_groups[idx]) for idx in instrument_ids], dtype=np.int64)
+
+        # Draw the number of notes to delete for every instrument at once
+        num_notes_to_delete = np.ceil(
+            self.rng.uniform(self.eps, self.p, len(instrument_ids)) * num_notes
+        ).astype(np.int64)
+        notes_to_delete = self._sample_notes(instrument_groups, instrument_ids, num_notes_to_delete)
+
+        if len(notes_to_delete) > 0:
+            keep_mask = np.ones(len(note_table), dtype=bool)
+            keep_mask[notes_to_delete] = False
+            note_table.filter(keep_mask)
+            report(deleted=len(notes_to_delete))
+        return note_table
@@ -26,11 +26,11 @@ Example:
     >>> transformed = transform(midi_data)
 """
 
-import logging
-import random
+from typing import Optional
 
 import numpy as np
 
+from midiogre.core.profiling import report
 from midiogre.core.transforms_interface import BaseMidiTransform
 
 VALID_MODES = ['both', 'left', 'right']
@@ -66,6 +66,10 @@ class OnsetTimeShift(BaseMidiTransform):
             Default: 0.2
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int, optional): Seed of the random generator of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from instead.
+            Default: None
             
     Raises:
         ValueError: If any of the following conditions are met:
@@ -86,7 +90,8 @@ class OnsetTimeShift(BaseMidiTransform):
     """
 
     def __init__(self, max_shift: float, mode: str = 'both', p_instruments: float = 1.0,
-                 p: float = 0.2, eps: float = 1e-12):
+                 p: float = 0.2, eps: float = 1e-12,
+                 seed: Optional[int] = None, rng: Optional[np.random.Generator] = None):
         """Initialize the OnsetTimeShift transform.
         
         Args:
@@ -103,7 +108,7 @@ class OnsetTimeShift(BaseMidiTransform):
         Raises:
             ValueError: If parameters are invalid (see class docstring for details).
         """
-        super().__init__(p_instruments=p_instruments, p=p, eps=eps)
+        super().__init__(p_instruments=p_instruments, p=p, eps=eps, seed=seed, rng=rng)
 
         if mode not in VALID_MODES:
             raise ValueError(
@@ -138,25 +143,26 @@ class OnsetTimeShift(BaseMidiTransform):
             return np.array([])
             
         if self.mode == 'left':
-            return np.random.uniform(-self.max_shift, 0, num_shifts)
+            return self.rng.uniform(-self.max_shift, 0, num_shifts)
         elif self.mode == 'right':
-            return np.random.uniform(0, self.max_shift, num_shifts)
+            return self.rng.uniform(0, self.max_shift, num_shifts)
         else:  # both
-            return np.random.uniform(-self.max_shift, self.max_shift, num_shifts)
+            return self.rng.uniform(-self.max_shift, self.max_shift, num_shifts)
 
-    def apply(self, midi_data):
-        """Apply the onset time shift transformation to the MIDI data.
+    def apply_to_instruments(self, note_table, instrument_ids):
+        """Apply the onset time shift transformation to selected instruments of a NoteTable.
         
-        For each non-drum instrument selected based on p_instruments, this method:
+        For each selected instrument, this method:
         1. Randomly selects a subset of notes based on p
         2. Generates random time shifts based on mode and max_shift
         3. Applies the shifts while maintaining note durations and ensuring valid times
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to transform.
+            note_table (NoteTable): The notes to transform.
+            instrument_ids (list[int]): Instruments selected for modification.
             
         Returns:
-            pretty_midi.PrettyMIDI: The transformed MIDI data with shifted note timings.
+            NoteTable: The transformed notes with shifted note timings.
             
         Note:
             - Drum instruments are skipped by default
@@ -166,35 +172,27 @@ class OnsetTimeShift(BaseMidiTransform):
                 - No negative start times
                 - No extending beyond the end of the track
         """
-        modified_instruments = self._get_modified_instruments_list(midi_data)
-        for instrument in modified_instruments:
-            if not instrument.notes:
-                continue
-                
-            num_notes_to_shift = int(self.p * len(instrument.notes))
-            if num_notes_to_shift == 0:
-                logging.debug(
-                    "OnsetTimeShift can't be performed on 0 notes on given non-drum instrument. Skipping.",
-                )
-                continue
-
-            instrument_end_time = instrument.notes[-1].end
-            
-            # Select notes to modify
-            notes_to_modify = random.sample(instrument.notes, k=num_notes_to_shift)
-            
-            # Get current onsets and durations
-            onsets = np.array([note.start for note in notes_to_modify])
-            durations = np.array([note.end - note.start for note in notes_to_modify])
+        instrument_groups = note_table.instrument_groups()
+        notes_to_modify = self._sample_notes(instrument_groups, instrument_ids)
+        if len(notes_to_modify) == 0:
+            return note_table
+        report(touched=len(notes_to_modify))
+
+        # Each note is bounded by the end of the last note of its instrument
+        instrument_end_times = np.zeros(note_table.num_instruments)
+        for instrument_idx in instrument_ids:
+            if len(instrument_groups[instrument_idx]) > 0:
+                instrument_end_times[instrument_idx] = note_table.end[instrument_groups[instrument_idx][-1]]
+        instrument_end_times = instrument_end_times[note_table.instrument[notes_to_modify]]
             
-            # Generate and apply shifts
-            shifts = self._generate_shifts(num_notes_to_shift)
-            new_onsets = np.clip(onsets + shifts, 0, instrument_end_time)
-            new_offsets = new_onsets + durations
+        # Get current onsets and durations
+        onsets = note_table.start[notes_to_modify]
+        durations = note_table.end[notes_to_modify] - onsets
             
-            # Update notes with new times
-            for note, new_onset, new_offset in zip(notes_to_modify, new_onsets, new_offsets):
-                note.start = float(new_onset)
-                note.end = float(new_offset)
+        # Generate and apply shifts for all selected notes at once
+        shifts = self._generate_shifts(len(notes_to_modify))
+        new_onsets = np.clip(onsets + shifts, 0, instrument_end_times)
+        note_table.start[notes_to_modify] = new_onsets
+        note_table.end[notes_to_modify] = new_onsets + durations
                 
-        return midi_data
+        return note_table
@@ -20,11 +20,11 @@ Example:
     >>> transformed = transform(midi_data)
 """
 
-import logging
-import random
+from typing import Optional
 
 import numpy as np
 
+from midiogre.core.profiling import report
 from midiogre.core.transforms_interface import BaseMidiTransform
 
 VALID_MODES = ['both', 'up', 'down']
@@ -66,6 +66,10 @@ class PitchShift(BaseMidiTransform):
             Default: 0.2
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int, optional): Seed of the random generator of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from instead.
+            Default: None
             
     Raises:
         ValueError: If any of the following conditions are met:
@@ -86,7 +90,8 @@ class PitchShift(BaseMidiTransform):
     """
 
     def __init__(self, max_shift: int, mode: str = 'both', p_instruments: float = 1.0,
-                 p: float = 0.2, eps: float = 1e-12):
+                 p: float = 0.2, eps: float = 1e-12,
+                 seed: Optional[int] = None, rng: Optional[np.random.Generator] = None):
         """Initialize the PitchShift transform.
         
         Args:
@@ -103,7 +108,7 @@ class PitchShift(BaseMidiTransform):
         Raises:
             ValueError: If parameters are invalid (see class docstring for details).
         """
-        super().__init__(p_instruments=p_instruments, p=p, eps=eps)
+        super().__init__(p_instruments=p_instruments, p=p, eps=eps, seed=seed, rng=rng)
 
         if not 0 <= max_shift <= 127:
             raise ValueError(
@@ -138,55 +143,39 @@ class PitchShift(BaseMidiTransform):
             return np.array([])
             
         if self.mode == 'up':
-            return np.random.randint(0, self.max_shift + 1, num_shifts)
+            return self.rng.integers(0, self.max_shift + 1, num_shifts)
         elif self.mode == 'down':
-            return np.random.randint(-self.max_shift, 1, num_shifts)
+            return self.rng.integers(-self.max_shift, 1, num_shifts)
         else:  # both
-            return np.random.randint(-self.max_shift, self.max_shift + 1, num_shifts)
+            return self.rng.integers(-self.max_shift, self.max_shift + 1, num_shifts)
 
-    def apply(self, midi_data):
-        """Apply the pitch shift transformation to the MIDI data.
+    def apply_to_instruments(self, note_table, instrument_ids):
+        """Apply the pitch shift transformation to selected instruments of a NoteTable.
         
-        For each non-drum instrument selected based on p_instruments, this method:
+        For each selected instrument, this method:
         1. Randomly selects a subset of notes based on p
         2. Generates random pitch shifts based on mode and max_shift
         3. Applies the shifts while clipping to valid MIDI note range [0, 127]
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to transform.
+            note_table (NoteTable): The notes to transform.
+            instrument_ids (list[int]): Instruments selected for modification.
             
         Returns:
-            pretty_midi.PrettyMIDI: The transformed MIDI data with shifted pitches.
+            NoteTable: The transformed notes with shifted pitches.
             
         Note:
             - Drum instruments are skipped by default
             - The transform maintains the original timing and velocity of all notes
             - Notes are shifted independently, allowing for complex harmonic variations
         """
-        modified_instruments = self._get_modified_instruments_list(midi_data)
-        for instrument in modified_instruments:
-            if not instrument.notes:
-                continue
+        # Select notes of all instruments, then generate and apply all shifts at once
+        notes_to_modify = self._sample_notes(note_table.instrument_groups(), instrument_ids)
+        if len(notes_to_modify) == 0:
+            return note_table
+
+        report(touched=len(notes_to_modify))
+        shifts = self._generate_shifts(len(notes_to_modify))
+        note_table.pitch[notes_to_modify] = np.clip(note_table.pitch[notes_to_modify] + shifts, 0, 127)
                 
-            num_notes_to_shift = int(self.p * len(instrument.notes))
-            if num_notes_to_shift == 0:
-                logging.debug(
-                    "PitchShift can't be performed on 0 notes on given non-drum instrument. Skipping.",
-                )
-                continue
-
-            # Select notes to modify
-            notes_to_modify = random.sample(instrument.notes, k=num_notes_to_shift)
-            
-            # Get current pitches
-            current_pitches = np.array([note.pitch for note in notes_to_modify])
-            
-            # Generate and apply shifts
-            shifts = self._generate_shifts(num_notes_to_shift)
-            new_pitches = np.clip(current_pitches + shifts, 0, 127)
-            
-            # Update notes with new pitches
-            for note, new_pitch in zip(notes_to_modify, new_pitches):
-                note.pitch = int(new_pitch)
-                
-        return midi_data
+        return note_table
@@ -12,10 +12,9 @@ global tempo.
    :class: transform-viz
 
 Note:
-    This transform operates on Mido MidiFile objects. If you have a PrettyMIDI object,
-    you must first convert it using MIDIOgre's converters:
-    >>> from midiogre.core.conversions import ConvertToMido
-    >>> midi_data = ConvertToMido()(pretty_midi_obj)
+    This transform operates on Mido MidiFile objects by rewriting their tempo events,
+    and on PrettyMIDI objects and NoteTables by rescaling the times of all events in
+    place with a `midiogre.core.TempoMap`, so no conversion to Mido is needed.
 
 Example:
     >>> from midiogre.augmentations import TempoShift
@@ -33,14 +32,21 @@ Example:
     >>> midi_data = ConvertToMido()('song.mid')  # Convert to Mido format
     >>> transformed = transform(midi_data)  # Apply transform
     >>> pretty_midi_obj = ConvertToPrettyMIDI()(transformed)  # Convert back if needed
+    >>>
+    >>> # Or shift the tempo of a PrettyMIDI object directly
+    >>> transformed = transform(pretty_midi.PrettyMIDI('song.mid'))
 """
 
 import logging
-import random
+from typing import Optional
 
 import numpy as np
-from mido import MetaMessage
+import pretty_midi
+from mido import MetaMessage, MidiFile
 
+from midiogre.core.note_table import NoteTable
+from midiogre.core.profiling import report
+from midiogre.core.tempo_map import TempoMap, tempo_to_seconds_per_tick
 from midiogre.core.transforms_interface import BaseMidiTransform
 
 VALID_MODES = ['both', 'up', 'down']
@@ -54,10 +60,13 @@ class TempoShift(BaseMidiTransform):
     in the file or replace them with a single global tempo.
     
     Note:
-        This transform operates on Mido MidiFile objects. If you have a PrettyMIDI object,
-        you must first convert it using MIDIOgre's converters:
-        >>> from midiogre.core.conversions import ConvertToMido
-        >>> midi_data = ConvertToMido()(pretty_midi_obj)
+        This transform operates on Mido MidiFile objects, PrettyMIDI objects and
+        NoteTables. PrettyMIDI objects keep their ticks while the times of notes,
+        control changes, pitch bends and meta events are rescaled to the new tempo
+        map, so that every event ends up at the same tick. Tempi are drawn for
+        pretty_midi's tempo map, which drops repeated tempi, so the shifts can
+        differ from those drawn for the same file in Mido.
+        NoteTables carry no tempo map and are assumed to be at 120 BPM.
     
     The tempo shift is applied with probability p, and when applied, generates
     random shifts based on the specified mode and maximum shift value. The final
@@ -82,6 +91,10 @@ class TempoShift(BaseMidiTransform):
             Default: True
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int, optional): Seed of the random generator of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from instead.
+            Default: None
             
     Raises:
         ValueError: If any of the following conditions are met:
@@ -106,7 +119,8 @@ class TempoShift(BaseMidiTransform):
     """
 
     def __init__(self, max_shift: float, mode: str = 'both', tempo_range: (float, float) = (30.0, 200.0),
-                 p: float = 0.2, respect_tempo_shifts: bool = True, eps: float = 1e-12):
+                 p: float = 0.2, respect_tempo_shifts: bool = True, eps: float = 1e-12,
+                 seed: Optional[int] = None, rng: Optional[np.random.Generator] = None):
         """Initialize the TempoShift transform.
         
         Args:
@@ -125,7 +139,7 @@ class TempoShift(BaseMidiTransform):
         Raises:
             ValueError: If parameters are invalid (see class docstring for details).
         """
-        super().__init__(p_instruments=1.0, p=p, eps=eps)
+        super().__init__(p_instruments=1.0, p=p, eps=eps, seed=seed, rng=rng)
 
         if mode not in VALID_MODES:
             raise ValueError(
@@ -178,11 +192,11 @@ class TempoShift(BaseMidiTransform):
             return np.array([])
             
         if self.mode == 'up':
-            return np.random.uniform(0, self.max_shift, num_shifts)
+            return self.rng.uniform(0, self.max_shift, num_shifts)
         elif self.mode == 'down':
-            return np.random.uniform(-self.max_shift, 0, num_shifts)
+            return self.rng.uniform(-self.max_shift, 0, num_shifts)
         else:  # both
-            return np.random.uniform(-self.max_shift, self.max_shift, num_shifts)
+            return self.rng.uniform(-self.max_shift, self.max_shift, num_shifts)
 
     def _convert_tempo_to_bpm(self, tempo_microseconds_per_beat: int) -> float:
         """Convert tempo from microseconds per beat to BPM.
@@ -212,7 +226,97 @@ class TempoShift(BaseMidiTransform):
         """
         return int(round(6e7 / bpm))
 
+    def _shift_tempo_map(self, tempo_map: TempoMap) -> TempoMap:
+        """Draw new tempi for a tempo map.
+
+        Tempi are shifted, clipped and rounded to whole microseconds per beat exactly
+        as `_apply_mido` does for `set_tempo` events.
+
+        Args:
+            tempo_map (TempoMap): The current tempo map.
+
+        Returns:
+            TempoMap: The new tempo map, with the same segment ticks.
+        """
+        should_change = self.rng.random() < self.p
+        ticks, seconds_per_tick = tempo_map.ticks, tempo_map.seconds_per_tick
+        if not self.respect_tempo_shifts:
+            ticks, seconds_per_tick = ticks[:1], seconds_per_tick[:1]
+        if not should_change:
+            return TempoMap(ticks, seconds_per_tick, tempo_map.resolution)
+
+        bpms = 60.0 / (seconds_per_tick * tempo_map.resolution)
+        new_bpms = np.clip(bpms + self._generate_shifts(len(ticks)), self.tempo_range[0], self.tempo_range[1])
+        new_tempi = np.round(6e7 / new_bpms)
+        return TempoMap(ticks, tempo_to_seconds_per_tick(new_tempi, tempo_map.resolution), tempo_map.resolution)
+
+    def _apply_pretty_midi(self, midi_data: pretty_midi.PrettyMIDI) -> pretty_midi.PrettyMIDI:
+        """Shift the tempo of a PrettyMIDI object in place."""
+        old_map = TempoMap.from_pretty_midi(midi_data)
+        new_map = self._shift_tempo_map(old_map)
+        if new_map.to_tick_scales() == old_map.to_tick_scales():
+            return midi_data
+
+        events = [note for instrument in midi_data.instruments for note in instrument.notes]
+        report(touched=len(events))
+        timed_events = [event for instrument in midi_data.instruments
+                        for event in instrument.control_changes + instrument.pitch_bends]
+        timed_events += midi_data.time_signature_changes + midi_data.key_signature_changes + \
+            midi_data.lyrics + midi_data.text_events
+
+        # Convert all times in one vectorized pass, then write them back
+        times = np.concatenate([
+            np.fromiter((note.start for note in events), dtype=np.float64, count=len(events)),
+            np.fromiter((note.end for note in events), dtype=np.float64, count=len(events)),
+            np.fromiter((event.time for event in timed_events), dtype=np.float64, count=len(timed_events)),
+        ])
+        times = new_map.ticks_to_seconds(old_map.seconds_to_ticks(times)).tolist()
+        for note, start, end in zip(events, times[:len(events)], times[len(events):2 * len(events)]):
+            note.start = start
+            note.end = end
+        for event, time in zip(timed_events, times[2 * len(events):]):
+            event.time = time
+
+        midi_data._tick_scales = new_map.to_tick_scales()
+        # pretty_midi converts times to ticks, e.g. in `write`, with a tick-to-time
+        # table of its own, which is recomputed from the new map if it has one
+        tick_to_time = getattr(midi_data, '_PrettyMIDI__tick_to_time', None)
+        if tick_to_time is not None:
+            midi_data._PrettyMIDI__tick_to_time = new_map.ticks_to_seconds(np.arange(len(tick_to_time)))
+        return midi_data
+
+    def _apply_note_table(self, note_table: NoteTable) -> NoteTable:
+        """Shift the tempo of a NoteTable, assuming it is at 120 BPM."""
+        # pretty_midi's default resolution; shifted tempi do not depend on it
+        old_map = TempoMap.from_tempo_events([], [], resolution=220)
+        new_map = self._shift_tempo_map(old_map)
+        if new_map.to_tick_scales() == old_map.to_tick_scales():
+            # Converting back and forth could still change times by rounding
+            return note_table
+
+        report(touched=len(note_table))
+        note_table.ensure_writable()
+        for times in (note_table.start, note_table.end, note_table.control_changes['time'],
+                      note_table.pitch_bends['time']):
+            times[:] = new_map.ticks_to_seconds(old_map.seconds_to_ticks(times))
+        return note_table
+
     def apply(self, midi_data):
+        """Shift the tempo of a Mido MidiFile, a PrettyMIDI object or a NoteTable.
+
+        Args:
+            midi_data: The MIDI data to transform.
+
+        Returns:
+            The transformed MIDI data, of the same type as the input.
+        """
+        if isinstance(midi_data, pretty_midi.PrettyMIDI):
+            return self._apply_pretty_midi(midi_data)
+        if isinstance(midi_data, NoteTable):
+            return self._apply_note_table(midi_data)
+        return self._apply_mido(midi_data)
+
+    def _apply_mido(self, midi_data: MidiFile) -> MidiFile:
         """Apply the tempo shift transformation to the MIDI data.
         
         This method handles several cases:
@@ -230,10 +334,12 @@ class TempoShift(BaseMidiTransform):
         Note:
             - If no tempo events are found, a default tempo of 120 BPM is used.
             - Only tempo events in the first track are processed.
-            - When respect_tempo_shifts is True, all tempo events maintain their
-              relative timing but get new tempo values.
+            - When respect_tempo_shifts is True, all tempo events keep their
+              position and tick but get new tempo values.
             - When respect_tempo_shifts is False, all tempo events are replaced
-              with a single tempo event at the start.
+              with a single tempo event at the start, and all other events keep
+              their absolute ticks.
+            - The track is rewritten in a single pass, in O(number of events).
             - The transform is applied with probability self.p. If not applied,
               the original tempo(s) are preserved.
         """
@@ -241,64 +347,58 @@ class TempoShift(BaseMidiTransform):
             logging.warning("Empty MIDI file provided")
             return midi_data
 
-        # Find all tempo events in first track
-        tempo_events = []
-        tempo_events_idx = []
-        for idx, event in enumerate(midi_data.tracks[0]):
-            if event.type == 'set_tempo':
-                tempo_events.append(event)
-                tempo_events_idx.append(idx)
+        track = midi_data.tracks[0]
+        tempo_idx = [idx for idx, event in enumerate(track) if event.type == 'set_tempo']
 
         # Handle case with no tempo events
-        if not tempo_events:
+        if not tempo_idx:
             logging.warning("No tempo metadata found in MIDI file; assuming a default value of 120 BPM.")
             default_bpm = 120.0
-            should_change = np.random.random() < self.p
+            should_change = self.rng.random() < self.p
             
             if should_change:
+                report()
                 shifts = self._generate_shifts(1)
                 new_bpm = np.clip(default_bpm + shifts[0], self.tempo_range[0], self.tempo_range[1])
                 new_tempo = self._convert_bpm_to_tempo(new_bpm)
             else:
                 new_tempo = self._convert_bpm_to_tempo(default_bpm)
                 
-            midi_data.tracks[0].insert(0, MetaMessage(type="set_tempo", tempo=new_tempo, time=0))
+            track.insert(0, MetaMessage(type="set_tempo", tempo=new_tempo, time=0))
             return midi_data
 
-        # Remove existing tempo events (in reverse order to maintain indices)
-        for idx in reversed(tempo_events_idx):
-            midi_data.tracks[0].pop(idx)
-
         # Determine if we should apply changes
-        should_change = np.random.random() < self.p
+        should_change = self.rng.random() < self.p
+        if not self.respect_tempo_shifts:
+            tempo_idx = tempo_idx[:1]
+
+        tempi = np.array([track[idx].tempo for idx in tempo_idx])
+        if should_change:
+            report()
+            new_bpms = np.clip(6e7 / tempi + self._generate_shifts(len(tempi)),
+                               self.tempo_range[0], self.tempo_range[1])
+            tempi = np.round(6e7 / new_bpms).astype(np.int64)
 
         if self.respect_tempo_shifts:
-            # Process all tempo events while maintaining timing
-            if should_change:
-                shifts = self._generate_shifts(len(tempo_events))
-                for i, event in enumerate(tempo_events):
-                    current_bpm = self._convert_tempo_to_bpm(event.tempo)
-                    new_bpm = np.clip(current_bpm + shifts[i], self.tempo_range[0], self.tempo_range[1])
-                    new_tempo = self._convert_bpm_to_tempo(new_bpm)
-                    midi_data.tracks[0].append(
-                        MetaMessage(type="set_tempo", tempo=new_tempo, time=event.time)
-                    )
-            else:
-                # Keep original tempos
-                for event in tempo_events:
-                    midi_data.tracks[0].append(
-                        MetaMessage(type="set_tempo", tempo=event.tempo, time=event.time)
-                    )
-        else:
-            # Use only first tempo event and place at start
-            current_bpm = self._convert_tempo_to_bpm(tempo_events[0].tempo)
-            if should_change:
-                shifts = self._generate_shifts(1)
-                new_bpm = np.clip(current_bpm + shifts[0], self.tempo_range[0], self.tempo_range[1])
-                new_tempo = self._convert_bpm_to_tempo(new_bpm)
+            # Tempo events are updated where they are, so no delta time changes
+            for idx, tempo in zip(tempo_idx, tempi.tolist()):
+                track[idx].tempo = tempo
+            return midi_data
+
+        # Use only the first tempo, placed at the start. All other events keep their
+        # absolute ticks, so the delta times of removed tempo events are carried over
+        # to the events following them.
+        events = [MetaMessage(type="set_tempo", tempo=int(tempi[0]), time=0)]
+        carried_ticks = 0
+        for event in track:
+            if event.type == 'set_tempo':
+                carried_ticks += event.time
             else:
-                new_tempo = tempo_events[0].tempo
-                
-            midi_data.tracks[0].insert(0, MetaMessage(type="set_tempo", tempo=new_tempo, time=0))
+                if carried_ticks:
+                    event.time += carried_ticks
+                    carried_ticks = 0
+                events.append(event)
+        track[:] = events
 
         return midi_data
+
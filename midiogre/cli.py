@@ -0,0 +1,300 @@
+"""Command line interface.
+
+`midiogre augment` augments a whole corpus offline, in parallel worker processes
+(see `midiogre.parallel.augment_corpus`), and writes every augmented copy as a
+MIDI file or as a piano roll saved with `np.save`.
+
+- Memory use is bounded: only a fixed number of files is in flight at any time.
+- Runs are resumable: output files are written atomically, and input files whose
+  copies all exist already are skipped.
+- Files that fail to load or augment are recorded in `quarantine.tsv` in the
+  output directory, together with their error, and are skipped by later runs.
+
+The pipeline is a JSON list of transforms, given inline or as a path to a JSON
+file. Each transform is either the name of a class in `midiogre.augmentations` or
+`midiogre.core.conversions`, or an object holding that name under "name" and the
+constructor arguments under all other keys.
+
+Example:
+    $ midiogre augment 'lakh/**/*.mid' out/ --copies 8 --workers 64 \\
+        --pipeline '[{"name": "PitchShift", "max_shift": 3, "p": 0.8}, {"name": "NoteDelete", "p": 0.1}]'
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import mido
+import numpy as np
+
+import midiogre.augmentations
+import midiogre.core.conversions
+from midiogre.core.compositions import Compose
+from midiogre.core.conversions import BaseConversion, ConvertToPrettyMIDI, ToPRollNumpy
+from midiogre.core.corpus import find_midi_files
+from midiogre.core.note_table import NoteTable
+from midiogre.parallel import augment_corpus
+
+OUTPUT_FORMATS = {'midi': '.mid', 'roll': '.npy'}
+QUARANTINE_FILE = 'quarantine.tsv'
+PROGRESS_INTERVAL = 1.0  # seconds
+
+
+def build_pipeline(spec: str) -> Compose:
+    """Build a Compose pipeline from a JSON specification.
+
+    Args:
+        spec (str): A JSON list of transforms, or the path to a JSON file holding
+            one. Each transform is a class name or an object with a "name" key and
+            constructor arguments.
+
+    Returns:
+        Compose: The pipeline.
+
+    Raises:
+        ValueError: If the specification is malformed or names an unknown transform.
+
+    Example:
+        >>> build_pipeline('["NoteDelete", {"name": "PitchShift", "max_shift": 2}]')
+    """
+    if os.path.isfile(spec):
+        spec = Path(spec).read_text()
+    try:
+        items = json.loads(spec)
+    except json.JSONDecodeError as error:
+        raise ValueError(f"Pipeline is not valid JSON: {error}")
+    if not isinstance(items, list):
+        raise ValueError(f"Pipeline must be a JSON list, got {type(items).__name__}")
+
+    transforms = []
+    for item in items:
+        kwargs = {'name': item} if isinstance(item, str) else dict(item)
+        name = kwargs.pop('name', None)
+        transform_class = getattr(midiogre.augmentations, name, None) if isinstance(name, str) else None
+        if transform_class is None and isinstance(name, str) and name.startswith('Convert'):
+            transform_class = getattr(midiogre.core.conversions, name, None)
+        if not isinstance(transform_class, type):
+            raise ValueError(f"Unknown transform in pipeline: {name}")
+        transforms.append(transform_class(**kwargs))
+    return Compose(transforms)
+
+
+def resolve_inputs(input_spec: str) -> tuple:
+    """List the MIDI files given by a directory, file or glob pattern.
+
+    Returns:
+        tuple: The sorted file paths and the directory that output paths are made
+            relative to.
+    """
+    if os.path.exists(input_spec):
+        paths = find_midi_files(input_spec)
+        root = input_spec if os.path.isdir(input_spec) else os.path.dirname(input_spec)
+    else:
+        paths = sorted(path for path in glob.glob(input_spec, recursive=True) if os.path.isfile(path))
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else '.'
+    return paths, os.path.abspath(root or '.')
+
+
+class _Encoder:
+    """Encode an augmented variant into the bytes or array written to disk.
+
+    Runs in the worker processes, so that the parent process only writes results.
+    MIDI files are returned as uint8 arrays, which reach the parent through shared
+    memory like piano rolls.
+    """
+
+    def __init__(self, output_format: str, fs: int):
+        self.output_format = output_format
+        self.to_roll = ToPRollNumpy(fs=fs)
+
+    def __call__(self, midi_data):
+        if isinstance(midi_data, mido.MidiFile):
+            midi_data = ConvertToPrettyMIDI()(midi_data)
+        if self.output_format == 'roll':
+            return self.to_roll(midi_data)
+
+        if isinstance(midi_data, NoteTable):
+            midi_data = midi_data.to_pretty_midi()
+        midi_file = io.BytesIO()
+        midi_data.write(midi_file)
+        return np.frombuffer(midi_file.getvalue(), dtype=np.uint8)
+
+
+def _get_loader(pipeline: Compose):
+    """Parse files with pretty_midi, unless the pipeline starts by converting them itself."""
+    if len(pipeline) and isinstance(pipeline.transforms[0], BaseConversion):
+        return str
+    return ConvertToPrettyMIDI()
+
+
+def _output_paths(midi_path: str, root: str, out_dir: Path, copies: int, output_format: str) -> list:
+    relative = Path(os.path.relpath(os.path.abspath(midi_path), root))
+    stem = out_dir / relative.parent / relative.stem
+    num_digits = len(str(max(copies - 1, 0)))
+    return [Path(f'{stem}_{copy_idx:0{num_digits}d}{OUTPUT_FORMATS[output_format]}') for copy_idx in range(copies)]
+
+
+def _write_atomic(path: Path, data: np.ndarray, output_format: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            if output_format == 'roll':
+                np.save(temp_file, data)
+            else:
+                temp_file.write(data.tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _read_quarantine(out_dir: Path) -> list:
+    quarantine_path = out_dir / QUARANTINE_FILE
+    if not quarantine_path.is_file():
+        return []
+    return [line for line in quarantine_path.read_text().splitlines() if line]
+
+
+def _rewrite_quarantine(out_dir: Path, retried: set, failures: list):
+    """Replace the quarantine lines of the retried files by the failures of this run."""
+    lines = [line for line in _read_quarantine(out_dir) if line.split('\t', 1)[0] not in retried] + failures
+    quarantine_path = out_dir / QUARANTINE_FILE
+    temp_path = quarantine_path.with_suffix('.tmp')
+    temp_path.write_text(''.join(line + '\n' for line in lines))
+    os.replace(temp_path, quarantine_path)
+
+
+def augment(args: argparse.Namespace) -> int:
+    """Run the `augment` command.
+
+    Returns:
+        int: The exit status, 1 if any file was quarantined in this run and 0
+            otherwise.
+    """
+    out_dir = Path(args.output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths, root = resolve_inputs(args.input)
+    quarantined = set() if args.retry_quarantined else {line.split('\t', 1)[0] for line in _read_quarantine(out_dir)}
+
+    todo = [path for path in paths if path not in quarantined and not all(
+        output_path.is_file() for output_path in _output_paths(path, root, out_dir, args.copies, args.format))]
+    num_skipped = len(paths) - len(todo)
+
+    def report(num_done, num_failed, final=False):
+        if args.quiet:
+            return
+        elapsed = time.monotonic() - start_time
+        rate = num_done / elapsed if elapsed > 0 else 0.0
+        eta = f', ETA {(len(todo) - num_done) / rate:.0f}s' if rate > 0 and not final else ''
+        print(f"{num_done}/{len(todo)} files, {num_failed} quarantined, {rate:.1f} files/s{eta}",
+              file=sys.stderr, flush=True)
+
+    if not args.quiet:
+        print(f"Augmenting {len(todo)} files ({num_skipped} done or quarantined before)", file=sys.stderr)
+
+    start_time = last_report = time.monotonic()
+    num_done = num_failed = 0
+    results = augment_corpus(todo, args.pipeline, workers=args.workers, copies=args.copies,
+                             loader=_get_loader(args.pipeline), conversion=_Encoder(args.format, args.fs),
+                             seed=args.seed, max_pending=args.max_pending, skip_errors=True)
+    # Retried files are rewritten at the end, so that they are listed only if they fail again
+    failures = []
+    quarantine = contextlib.nullcontext() if args.retry_quarantined else open(out_dir / QUARANTINE_FILE, 'a')
+    with quarantine as quarantine_file:
+        for result in results:
+            if result.error is not None:
+                failures.append(f"{result.path}\t{' '.join(result.error.split())}")
+                if quarantine_file is not None:
+                    quarantine_file.write(failures[-1] + '\n')
+                    quarantine_file.flush()
+                num_failed += 1
+            else:
+                output_paths = _output_paths(result.path, root, out_dir, args.copies, args.format)
+                for output_path, data in zip(output_paths, result.variants):
+                    _write_atomic(output_path, data, args.format)
+            num_done += 1
+
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                report(num_done, num_failed)
+                last_report = time.monotonic()
+    if args.retry_quarantined:
+        _rewrite_quarantine(out_dir, set(todo), failures)
+    report(num_done, num_failed, final=True)
+    return 1 if num_failed else 0
+
+
+def _pipeline_type(spec: str) -> Compose:
+    try:
+        return build_pipeline(spec)
+    except (ValueError, TypeError) as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def _non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be non-negative, got {number}")
+    return number
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be positive, got {number}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser of the `midiogre` command."""
+    parser = argparse.ArgumentParser(prog='midiogre', description="The On-the-fly MIDI Data Augmentation Library")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    augment_parser = commands.add_parser('augment', help="Augment a corpus of MIDI files offline",
+                                         description="Write augmented copies of every MIDI file of a corpus.")
+    augment_parser.add_argument('input', help="Directory (searched recursively), MIDI file or glob pattern")
+    augment_parser.add_argument('output_dir', help="Directory to write augmented files to")
+    augment_parser.add_argument('--pipeline', type=_pipeline_type, required=True,
+                                help="JSON list of transforms, or a path to a JSON file holding one")
+    augment_parser.add_argument('--copies', type=_non_negative_int, default=1,
+                                help="Augmented copies per file (default: 1)")
+    augment_parser.add_argument('--workers', type=_non_negative_int, default=None,
+                                help="Worker processes, 0 to run in this process (default: one per CPU)")
+    augment_parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='midi',
+                                help="Write MIDI files or piano rolls as .npy files (default: midi)")
+    augment_parser.add_argument('--fs', type=int, default=100, help="Piano roll sampling frequency (default: 100)")
+    augment_parser.add_argument('--seed', type=int, default=None, help="Seed of all augmentations")
+    augment_parser.add_argument('--max-pending', type=_positive_int, default=None,
+                                help="Files in flight at once, bounding memory use (default: 4 per worker)")
+    augment_parser.add_argument('--retry-quarantined', action='store_true',
+                                help=f"Retry files listed in {QUARANTINE_FILE} by earlier runs, which then "
+                                     "lists only those that fail again")
+    augment_parser.add_argument('--quiet', action='store_true', help="Do not report progress")
+    augment_parser.set_defaults(func=augment)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the `midiogre` command.
+
+    Args:
+        argv (sequence of str, optional): Command line arguments.
+            Default: None (use sys.argv)
+
+    Returns:
+        int: The exit status.
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1,7 @@
+from .cache import MidiCache
+from .cloning import clone
 from .compositions import Compose
-from .conversions import ToPRollNumpy, ToPRollTensor
+from .conversions import ConvertToNoteTable, ToPRollNumpy, ToPRollTensor
+from .corpus import CorpusCache, ShardedCorpus
+from .note_table import NoteTable
+from .tempo_map import TempoMap
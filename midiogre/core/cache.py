@@ -0,0 +1,196 @@
+"""In-process cache of parsed MIDI files.
+
+Parsing a MIDI file with mido or pretty_midi is usually the slowest step of loading
+small to medium files, and multi-epoch training parses the same files once per
+epoch. A `MidiCache` keeps parsed objects in memory, keyed by file path,
+modification time and size, so edited files are re-parsed automatically. Cached
+objects are never handed out directly: every lookup returns a fast clone (see
+`midiogre.core.clone`), so in-place transforms cannot corrupt the cached copy.
+
+Example:
+    >>> from midiogre.core.cache import MidiCache
+    >>> from midiogre.core.conversions import ConvertToPrettyMIDI
+    >>>
+    >>> converter = ConvertToPrettyMIDI(cache=MidiCache(max_bytes=512 * 2 ** 20))
+    >>> midi_data = converter('song.mid')  # Parsed from disk
+    >>> midi_data = converter('song.mid')  # Cloned from memory
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import mido
+import numpy as np
+import pretty_midi
+
+from midiogre.core.cloning import clone
+from midiogre.core.note_table import NoteTable
+
+VALID_POLICIES = ['lru', 'lfu']
+
+
+def _list_nbytes(items: list) -> int:
+    """Approximate the memory used by a list of small objects of the same type."""
+    if not items:
+        return sys.getsizeof(items)
+    sample = items[0]
+    item_nbytes = sys.getsizeof(sample)
+    if hasattr(sample, '__dict__'):
+        item_nbytes += sys.getsizeof(vars(sample)) + sum(sys.getsizeof(value) for value in vars(sample).values())
+    return sys.getsizeof(items) + len(items) * item_nbytes
+
+
+def _estimate_nbytes(midi_data) -> int:
+    """Approximate the memory used by a parsed MIDI object.
+
+    Args:
+        midi_data: A PrettyMIDI, Mido MidiFile or NoteTable object.
+
+    Returns:
+        int: Estimated size in bytes.
+    """
+    if isinstance(midi_data, NoteTable):
+        return sum(array.nbytes for array in (midi_data.pitch, midi_data.velocity, midi_data.start, midi_data.end,
+                                              midi_data.instrument, midi_data.control_changes,
+                                              midi_data.pitch_bends))
+    if isinstance(midi_data, pretty_midi.PrettyMIDI):
+        return sys.getsizeof(midi_data) + sum(
+            _list_nbytes(instrument.notes) + _list_nbytes(instrument.control_changes)
+            + _list_nbytes(instrument.pitch_bends)
+            for instrument in midi_data.instruments
+        ) + sum(_list_nbytes(value) for value in vars(midi_data).values() if isinstance(value, list)) + sum(
+            # e.g. the tick-to-time table, one float per tick of the file
+            value.nbytes for value in vars(midi_data).values() if isinstance(value, np.ndarray)
+        )
+    if isinstance(midi_data, mido.MidiFile):
+        return sys.getsizeof(midi_data) + sum(_list_nbytes(track) for track in midi_data.tracks)
+    return sys.getsizeof(midi_data)
+
+
+class MidiCache:
+    """Memory-bounded cache of parsed MIDI objects.
+
+    Entries are keyed by the kind of parsed object together with the absolute file
+    path, its modification time and its size, so a file that changes on disk is
+    parsed again on its next lookup. When the estimated size of all entries exceeds
+    `max_bytes`, entries are evicted according to `policy`.
+
+    The cache is thread-safe. When pickled, e.g. to be sent to DataLoader worker
+    processes, only its configuration is kept, so every process fills its own cache.
+
+    Args:
+        max_bytes (int): Memory budget for all cached objects, in bytes. Objects
+            larger than the budget are never cached.
+            Default: 256 MiB
+        policy (str): Eviction policy. One of:
+            - 'lru': Evict the least recently used entry
+            - 'lfu': Evict the least frequently used entry, breaking ties by recency
+            Default: 'lru'
+
+    Raises:
+        ValueError: If max_bytes is negative or policy is not one of 'lru', 'lfu'.
+
+    Example:
+        >>> cache = MidiCache(max_bytes=64 * 2 ** 20, policy='lfu')
+        >>> midi_data = cache.get('song.mid', pretty_midi.PrettyMIDI)
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20, policy: str = 'lru'):
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be non-negative, got {max_bytes}")
+
+        if policy not in VALID_POLICIES:
+            raise ValueError(f"Policy must be one of {VALID_POLICIES}, got {policy}")
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (midi_data, nbytes, use_count)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'max_bytes': self.max_bytes, 'policy': self.policy}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        """Return the number of cached objects."""
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated size of all cached objects in bytes."""
+        return self._nbytes
+
+    @staticmethod
+    def _make_key(path: str, kind: str) -> tuple:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return kind, path, stat.st_mtime_ns, stat.st_size
+
+    def _evict(self, new_key: tuple):
+        """Evict entries other than `new_key` until the cache fits into its budget.
+
+        Requires the lock.
+        """
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            candidates = (key for key in self._entries if key != new_key)
+            if self.policy == 'lru':
+                key = next(candidates)
+            else:
+                # Entries are ordered by recency, so min() breaks ties by recency
+                key = min(candidates, key=lambda entry_key: self._entries[entry_key][2])
+            self._nbytes -= self._entries.pop(key)[1]
+
+    def get(self, path: str, loader, kind: str = None):
+        """Get a clone of the parsed file, parsing it with `loader` on a cache miss.
+
+        Args:
+            path (str): Path to the MIDI file.
+            loader (callable): Function that parses the file given its path,
+                e.g. `pretty_midi.PrettyMIDI`.
+            kind (str, optional): Name distinguishing objects parsed by different
+                loaders from the same file.
+                Default: None (the loader's qualified name)
+
+        Returns:
+            A clone of the parsed object, safe to modify.
+        """
+        key = self._make_key(path, kind or getattr(loader, '__qualname__', repr(loader)))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries[key] = (entry[0], entry[1], entry[2] + 1)
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+
+        # Cached objects are never modified, so they can be cloned without the lock
+        if entry is not None:
+            return clone(entry[0])
+
+        # Parse outside the lock so that other threads are not blocked
+        midi_data = loader(path)
+        nbytes = _estimate_nbytes(midi_data)
+        if nbytes <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (midi_data, nbytes, 1)
+                    self._nbytes += nbytes
+                    self._evict(key)
+            midi_data = clone(midi_data)
+        return midi_data
+
+    def clear(self):
+        """Remove all cached objects and reset the hit and miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self.hits = 0
+            self.misses = 0
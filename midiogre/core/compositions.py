@@ -15,10 +15,49 @@ Example:
     >>> 
     >>> # Apply transforms to MIDI data
     >>> transformed_midi = transform(midi_data)
+    >>>
+    >>> # Or to a whole batch, drawing random values for all files at once
+    >>> transformed_batch = transform.apply_batch([midi_a, midi_b, midi_c])
+    >>>
+    >>> # Or create several differently augmented variants of the same piece
+    >>> variants = transform.expand(midi_data, k=4)
+    >>>
+    >>> # Profile the wall time, hits and note counts of every transform
+    >>> transform = Compose([PitchShift(max_shift=2, p=0.5)], profile=True)
+    >>> transform(midi_data)
+    >>> transform.stats()
+    >>>
+    >>> # Record a timeline of every transform, viewable in chrome://tracing
+    >>> tracing.enable_tracing('trace/')
+    >>>
+    >>> # Or augment and convert the files of a batch concurrently in threads
+    >>> piano_rolls = transform.apply_threaded([midi_a, midi_b, midi_c], conversion=ToPRollNumpy())
+    >>>
+    >>> # Give every transform its own random stream derived from one seed
+    >>> transform.reseed(42)
+    >>>
+    >>> # Or make the augmentation of a sample depend only on (seed, epoch, index)
+    >>> transform.reseed_sample(42, epoch=3, index=1017)
+    >>>
+    >>> # Or only within a context, keeping the generators of the calling thread
+    >>> with transform.sample_rng(42, epoch=3, index=1017):
+    ...     augmented = transform(midi_data)
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
 from pretty_midi import PrettyMIDI
 
+from midiogre.core.cloning import clone
+from midiogre.core.note_table import NoteTable
+from midiogre.core.profiling import Profiler
+from midiogre.core.tracing import is_tracing, span
+from midiogre.core.transforms_interface import BaseMidiTransform, apply_transforms_to_batch
+
 
 class Compose:
     """A class for composing multiple MIDI transforms into a single transform.
@@ -32,6 +71,14 @@ class Compose:
         transforms (list or tuple): A sequence of MIDI transforms to be applied
             in order. Each transform should be a callable that takes a PrettyMIDI
             object as input and returns a transformed PrettyMIDI object.
+        copy (bool, optional): If True, the input is never modified: transforms are
+            applied to a copy (see `midiogre.core.clone`). Useful to keep a parsed
+            original across epochs.
+            Default: False
+        profile (bool, optional): If True, the wall time, hits and skips and the
+            notes touched, added and deleted of every transform are recorded (see
+            `stats`).
+            Default: False
             
     Raises:
         TypeError: If transforms is not a list or tuple.
@@ -48,11 +95,13 @@ class Compose:
         >>> transformed_midi = transform(midi_data)
     """
 
-    def __init__(self, transforms: list or tuple):
+    def __init__(self, transforms: list or tuple, copy: bool = False, profile: bool = False):
         """
         Compose several MIDIOgre transforms together.
 
         :param transforms: list of MIDIOgre transforms to be performed in the given order
+        :param copy: whether to apply the transforms to a copy of the input instead of the input itself
+        :param profile: whether to record timings and counters of every transform
         """
         if not (isinstance(transforms, list) or isinstance(transforms, tuple)):
             raise TypeError(
@@ -60,6 +109,8 @@ class Compose:
             )
 
         self.transforms = transforms
+        self.copy = copy
+        self.profiler = Profiler() if profile else None
 
     def __len__(self):
         """Return the number of transforms in the composition.
@@ -69,6 +120,135 @@ class Compose:
         """
         return len(self.transforms)
 
+    def _transform_names(self) -> list:
+        """Names of the transforms in the stats, e.g. '0:PitchShift'."""
+        return [f"{position}:{type(transform).__name__}" for position, transform in enumerate(self.transforms)]
+
+    def _instrumented_names(self) -> Optional[list]:
+        """Names of the transforms if they are profiled or traced, otherwise None."""
+        return self._transform_names() if self.profiler is not None or is_tracing() else None
+
+    def _measure(self, position: int, name: str):
+        """Context in which the transform at a position is profiled and traced, if enabled."""
+        transform = self.transforms[position]
+        if self.profiler is None and not is_tracing():
+            return nullcontext()
+        stack = ExitStack()
+        if self.profiler is not None:
+            stack.enter_context(self.profiler.measure(name, isinstance(transform, BaseMidiTransform)))
+        stack.enter_context(span(name, getattr(transform, 'trace_category', 'transform')))
+        return stack
+
+    def stats(self) -> dict:
+        """Get the timings and counters of every transform, if profiling.
+
+        Returns:
+            dict: For every transform, named by its position and class, e.g.
+                '0:PitchShift', its call count, hits and skips, notes touched, added
+                and deleted, and total, mean, min, max and percentile wall times (see
+                `midiogre.core.profiling.Profiler.stats`). Empty if the composition
+                was not created with profile=True.
+
+        Example:
+            >>> transform = Compose([NoteAdd(...), TempoShift(max_shift=10)], profile=True)
+            >>> for midi_data in corpus:
+            ...     transform(midi_data)
+            >>> {name: stats['p99'] for name, stats in transform.stats().items()}
+        """
+        return self.profiler.stats() if self.profiler is not None else {}
+
+    def export_stats(self, path: Optional[str] = None) -> str:
+        """Export the stats of every transform as JSON.
+
+        Args:
+            path (str, optional): If given, the JSON is also written to this file.
+                Default: None
+
+        Returns:
+            str: The stats as JSON.
+        """
+        return (self.profiler or Profiler()).to_json(path)
+
+    def reset_stats(self):
+        """Discard the stats recorded so far."""
+        if self.profiler is not None:
+            self.profiler.reset()
+
+    def reseed(self, seed: Optional[Union[int, np.random.SeedSequence]] = None):
+        """Reseed every transform with an independent child stream of one seed.
+
+        Transforms without a `reseed` method, e.g. conversions, are skipped, and
+        nested compositions spawn further child streams for their own transforms.
+
+        Args:
+            seed (int or np.random.SeedSequence, optional): Root seed.
+                Default: None (seed every transform from OS entropy)
+
+        Example:
+            >>> transform = Compose([PitchShift(max_shift=2), NoteDelete(p=0.1)])
+            >>> transform.reseed(42)  # the same augmentations on every run
+        """
+        reseedable = [transform for transform in self.transforms if hasattr(transform, 'reseed')]
+        if seed is None:
+            for transform in reseedable:
+                transform.reseed()
+            return
+
+        seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        for transform, child in zip(reseedable, seed_sequence.spawn(len(reseedable))):
+            transform.reseed(child)
+
+    def reseed_sample(self, seed: int, epoch: int, index: int, stream: Sequence[int] = ()):
+        """Draw the random values of one sample from counter-based generators.
+
+        Every transform is reseeded with `reseed_sample`, with its position in the
+        composition appended to `stream`, so each transform draws from its own
+        stream and the result depends only on the seed, the epoch and the index
+        (see `midiogre.core.transforms_interface.counter_rng`).
+
+        Args:
+            seed (int): Global seed, non-negative.
+            epoch (int): Epoch of the sample, non-negative.
+            index (int): Index of the sample, non-negative.
+            stream (Sequence[int], optional): Stream of this composition when nested
+                in another one.
+                Default: ()
+
+        Example:
+            >>> transform.reseed_sample(42, epoch=3, index=1017)
+            >>> augmented = transform(midi_data)  # the same on any worker
+        """
+        for position, transform in enumerate(self.transforms):
+            if hasattr(transform, 'reseed_sample'):
+                transform.reseed_sample(seed, epoch, index, stream=(*stream, position))
+
+    @contextmanager
+    def sample_rng(self, seed: int, epoch: int, index: int, stream: Sequence[int] = ()):
+        """Context in which the calling thread draws the random values of one sample.
+
+        Like `reseed_sample`, but every transform draws from its previous generator
+        again when the context exits.
+
+        Args:
+            seed (int): Global seed, non-negative.
+            epoch (int): Epoch of the sample, non-negative.
+            index (int): Index of the sample, non-negative.
+            stream (Sequence[int], optional): Stream of this composition when nested
+                in another one.
+                Default: ()
+
+        Example:
+            >>> with transform.sample_rng(42, epoch=3, index=1017):
+            ...     augmented = transform(midi_data)
+        """
+        with ExitStack() as stack:
+            for position, transform in enumerate(self.transforms):
+                if hasattr(transform, 'sample_rng'):
+                    stack.enter_context(transform.sample_rng(seed, epoch, index, stream=(*stream, position)))
+                elif hasattr(transform, 'reseed_sample'):
+                    transform.reseed_sample(seed, epoch, index, stream=(*stream, position))
+            yield self
+
     def __call__(self, midi_data: PrettyMIDI):
         """Apply all transforms sequentially to the MIDI data.
         
@@ -79,6 +259,170 @@ class Compose:
             PrettyMIDI: The transformed MIDI data after applying all transforms
             in sequence.
         """
-        for transform in self.transforms:
-            midi_data = transform(midi_data)
+        if self.copy:
+            # Leading note-level transforms then write into a note-free copy
+            return self.expand(midi_data, 1)[0]
+
+        names = self._instrumented_names()
+        if names is None:
+            for transform in self.transforms:
+                midi_data = transform(midi_data)
+            return midi_data
+
+        for position, (transform, name) in enumerate(zip(self.transforms, names)):
+            with self._measure(position, name):
+                midi_data = transform(midi_data)
         return midi_data
+
+    def apply_batch(self, batch: list) -> list:
+        """Apply all transforms sequentially to a list of MIDI data objects.
+
+        Consecutive note-level transforms that support batching (see
+        `BaseMidiTransform.supports_batching`) run on a single NoteTable merged from
+        the whole batch, which is converted once and split back only when the run
+        ends. Other transforms use their own `apply_batch` if they have one and are
+        otherwise applied to each object in turn.
+
+        Args:
+            batch (list): The MIDI data objects to transform.
+
+        Returns:
+            list: The transformed MIDI data, in input order. Inputs are modified in
+                place unless the composition was created with copy=True.
+        """
+        batch = [clone(midi_data) for midi_data in batch] if self.copy else list(batch)
+        return self._apply_batch(batch, 0)
+
+    def _apply_batch(self, batch: list, first: int) -> list:
+        """Apply the transforms from position `first` on to a list of MIDI data objects."""
+        names = self._instrumented_names()
+        run_start = None
+        for position in range(first, len(self.transforms)):
+            transform = self.transforms[position]
+            if isinstance(transform, BaseMidiTransform) and transform.supports_batching():
+                if run_start is None:
+                    run_start = position
+                continue
+
+            if run_start is not None:
+                batch = self._apply_batchable_run(batch, run_start, position, names)
+                run_start = None
+
+            with self._measure(position, names[position] if names else None):
+                if hasattr(transform, 'apply_batch'):
+                    batch = transform.apply_batch(batch)
+                else:
+                    batch = [transform(midi_data) for midi_data in batch]
+
+        if run_start is not None:
+            batch = self._apply_batchable_run(batch, run_start, len(self.transforms), names)
+        return batch
+
+    def _apply_batchable_run(self, batch: list, start: int, stop: int, names: Optional[list]) -> list:
+        """Apply consecutive batchable transforms to a batch merged into one NoteTable."""
+        return apply_transforms_to_batch(self.transforms[start:stop], batch, self.profiler,
+                                         names[start:stop] if names else None)
+
+    def expand(self, midi_data, k: int) -> list:
+        """Create k independently augmented variants of the same MIDI data.
+
+        The input is converted to a NoteTable only once. Leading note-level transforms
+        that support batching run on k copies of that table with a single batched
+        call, so all k sets of random parameters are drawn in one vectorized pass.
+        The remaining transforms are applied with `apply_batch`. The input itself is
+        never modified.
+
+        Args:
+            midi_data: The MIDI data to augment. A PrettyMIDI object, a NoteTable or
+                any other input accepted by the first transform (e.g. a file path).
+            k (int): Number of variants to create.
+
+        Returns:
+            list: k augmented variants, of the same type as the input for PrettyMIDI
+                and NoteTable inputs.
+
+        Raises:
+            ValueError: If k is negative.
+
+        Example:
+            >>> transform = Compose([PitchShift(max_shift=2, p=0.5)])
+            >>> anchor, positive = transform.expand(midi_data, k=2)
+        """
+        if k < 0:
+            raise ValueError(f"Number of variants must be non-negative, got {k}")
+
+        num_leading = 0
+        for transform in self.transforms:
+            if not (isinstance(transform, BaseMidiTransform) and transform.supports_batching()):
+                break
+            num_leading += 1
+
+        if isinstance(midi_data, (NoteTable, PrettyMIDI)) and num_leading > 0:
+            base = midi_data if isinstance(midi_data, NoteTable) else NoteTable.from_pretty_midi(midi_data)
+            batch = self._apply_batchable_run([base.copy() for _ in range(k)], 0, num_leading,
+                                              self._instrumented_names())
+            if isinstance(midi_data, PrettyMIDI):
+                batch = [note_table.to_pretty_midi(clone(midi_data, notes=False)) for note_table in batch]
+        elif isinstance(midi_data, str):
+            # File paths are parsed by the first transform, once per variant
+            batch = [midi_data] * k
+        else:
+            batch = [clone(midi_data) for _ in range(k)]
+
+        # Inputs of the remaining transforms are already copies
+        return self._apply_batch(batch, num_leading)
+
+    def apply_threaded(self, batch: Iterable, num_threads: Optional[int] = None,
+                       conversion: Optional[Callable] = None, seed: Optional[int] = None, epoch: int = 0) -> list:
+        """Augment, and optionally convert, the inputs of a batch concurrently in threads.
+
+        Every input is augmented with `__call__` and converted with `conversion`, e.g.
+        to a piano roll, in a thread pool. Most of the work runs in NumPy kernels
+        that release the GIL, and unlike DataLoader worker processes, threads share
+        the transforms and inputs without pickling or copying them. Transforms
+        keep their random state per thread (see `BaseMidiTransform.rng`).
+
+        Args:
+            batch (iterable): The MIDI data objects to transform.
+            num_threads (int, optional): Number of threads. With 1 and no seed,
+                inputs are processed in the calling thread.
+                Default: None (one per CPU, at most one per input)
+            conversion (callable, optional): Conversion applied to every augmented
+                input, e.g. `ToPRollNumpy`.
+                Default: None
+            seed (int, optional): If given, the augmentation of every input depends
+                only on the seed, the epoch and its position in the batch, not on
+                the number of threads (see `reseed_sample`).
+                Default: None (draw from the thread-local generators)
+            epoch (int, optional): Epoch mixed into the seed of every input.
+                Default: 0
+
+        Returns:
+            list: The transformed (and converted) inputs, in input order. Inputs are
+                modified in place unless the composition was created with copy=True.
+
+        Raises:
+            ValueError: If num_threads is not positive.
+
+        Example:
+            >>> transform = Compose([PitchShift(max_shift=2, p=0.5), NoteDelete(p=0.1)])
+            >>> rolls = transform.apply_threaded(note_tables, num_threads=8, conversion=ToPRollTensor())
+        """
+        batch = list(batch)
+        if num_threads is None:
+            num_threads = min(os.cpu_count() or 1, max(len(batch), 1))
+        if num_threads < 1:
+            raise ValueError(f"Number of threads must be positive, got {num_threads}")
+
+        def process(index, midi_data):
+            if seed is not None:
+                self.reseed_sample(seed, epoch, index)
+            midi_data = self(midi_data)
+            return conversion(midi_data) if conversion is not None else midi_data
+
+        if num_threads == 1 and seed is None:
+            return [process(index, midi_data) for index, midi_data in enumerate(batch)]
+        # Seeded inputs are processed in pool threads, so that the per-sample
+        # generators never replace those of the calling thread
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            return list(executor.map(process, range(len(batch)), batch))
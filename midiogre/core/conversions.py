@@ -8,6 +8,7 @@ that operate on different MIDI formats.
 The module supports conversions between:
 - Mido MidiFile objects
 - PrettyMIDI objects
+- Columnar NoteTable objects
 - Piano roll representations (NumPy arrays and PyTorch tensors)
 
 Primary Use Case - Augmentation Pipeline:
@@ -36,6 +37,10 @@ Other Use Cases:
     >>> # Create piano roll representation
     >>> from midiogre.core.conversions import ToPRollTensor
     >>> piano_roll = ToPRollTensor()(pretty_midi_obj)
+    >>> 
+    >>> # Convert once to a NoteTable so note-level transforms skip per-note objects
+    >>> from midiogre.core.conversions import ConvertToNoteTable
+    >>> note_table = ConvertToNoteTable()('song.mid')
 
 Note:
     When composing transforms, the converters handle format compatibility automatically.
@@ -47,12 +52,21 @@ Note:
 
 import logging
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 import mido
-import torch
+import numpy as np
 import pretty_midi
 
+from midiogre.core.cache import MidiCache
+from midiogre.core.corpus import CorpusCache, arrays_to_note_table, arrays_to_pretty_midi
+from midiogre.core.note_table import NoteTable
+from midiogre.core.piano_roll import PIANO_ROLL_DTYPES, get_piano_roll
+from midiogre.core.smf import parse_smf
+from midiogre.core.tracing import span
+
+VALID_PARSERS = ['pretty_midi', 'native']
+
 
 class BaseConversion:
     """Base class for all MIDI format conversions.
@@ -65,6 +79,9 @@ class BaseConversion:
     the actual conversion logic should be implemented in the apply method.
     """
 
+    # Category of the spans of the conversion in traces (see `midiogre.core.tracing`)
+    trace_category = 'conversion'
+
     def __init__(self):
         """Initialize the conversion."""
         pass
@@ -85,7 +102,7 @@ class BaseConversion:
         """
         raise NotImplementedError
 
-    def __call__(self, midi_data: Union[str, pretty_midi.PrettyMIDI, mido.MidiFile]):
+    def __call__(self, midi_data: Union[str, pretty_midi.PrettyMIDI, mido.MidiFile, NoteTable]):
         """Convert the MIDI data.
         
         Args:
@@ -93,6 +110,7 @@ class BaseConversion:
                 - A file path string
                 - A PrettyMIDI object
                 - A Mido MidiFile object
+                - A NoteTable object
                 
         Returns:
             The converted MIDI data.
@@ -107,6 +125,17 @@ class BaseConversion:
 
         return self.apply(midi_data)
 
+    def apply_batch(self, batch: list) -> list:
+        """Convert a list of MIDI data objects or file paths.
+
+        Args:
+            batch (list): The MIDI data to convert (see `__call__`).
+
+        Returns:
+            list: The converted MIDI data, in input order.
+        """
+        return [self(midi_data) for midi_data in batch]
+
 
 class ConvertToMido(BaseConversion):
     """Convert MIDI data to a Mido MidiFile object.
@@ -114,17 +143,25 @@ class ConvertToMido(BaseConversion):
     This converter is particularly useful when working with transforms that
     require Mido objects, such as TempoShift.
     
+    Args:
+        cache (MidiCache, optional): Cache of parsed files. If given, each file is
+            parsed once and later calls return a clone of the cached object.
+            Default: None (parse the file on every call)
+    
     Example:
         >>> converter = ConvertToMido()
         >>> # Convert from file
         >>> mido_obj = converter('song.mid')
         >>> # Convert from PrettyMIDI
         >>> mido_obj = converter(pretty_midi_obj)
+        >>> # Parse every file only once across epochs
+        >>> converter = ConvertToMido(cache=MidiCache())
     """
 
-    def __init__(self):
+    def __init__(self, cache: MidiCache = None):
         """Initialize the Mido converter."""
         super().__init__()
+        self.cache = cache
 
     def apply(self, path_to_midi: str):
         """Convert MIDI data to a Mido MidiFile object.
@@ -140,6 +177,13 @@ class ConvertToMido(BaseConversion):
             tracks, they may not be interpreted correctly as this violates the MIDI
             type 0/1 specification.
         """
+        if self.cache is not None:
+            return self.cache.get(path_to_midi, self._load, kind='mido')
+        return self._load(path_to_midi)
+
+    @staticmethod
+    def _load(path_to_midi: str) -> mido.MidiFile:
+        """Parse a MIDI file with Mido, warning about misplaced meta events."""
         midi_data = mido.MidiFile(path_to_midi)
 
         # Borrowed from pretty-midi
@@ -158,8 +202,25 @@ class ConvertToPrettyMIDI(BaseConversion):
     """Convert MIDI data to a PrettyMIDI object.
     
     This converter is useful when working with most MIDIOgre transforms, as they
-    typically operate on PrettyMIDI objects. It can convert from either a file path
-    or a Mido MidiFile object.
+    typically operate on PrettyMIDI objects. It can convert from a file path, a
+    Mido MidiFile object or a NoteTable.
+    
+    Args:
+        cache (MidiCache, optional): Cache of parsed files. If given, each file is
+            parsed once and later calls return a clone of the cached object.
+            Default: None (parse the file on every call)
+        corpus_cache (CorpusCache, optional): On-disk cache of preprocessed files.
+            If given, files are read from their cached note arrays instead of being
+            parsed, and their cache entries are created or refreshed as needed.
+            Default: None
+        parser (str, optional): How files are parsed. One of:
+            - 'pretty_midi': With `pretty_midi.PrettyMIDI`
+            - 'native': With `midiogre.core.smf.parse_smf`, which is several times
+              faster and yields the same notes, controls, tempo map and meta events
+            Default: 'pretty_midi'
+    
+    Raises:
+        ValueError: If parser is not one of 'pretty_midi', 'native'.
     
     Example:
         >>> converter = ConvertToPrettyMIDI()
@@ -167,28 +228,138 @@ class ConvertToPrettyMIDI(BaseConversion):
         >>> pretty_midi_obj = converter('song.mid')
         >>> # Convert from Mido
         >>> pretty_midi_obj = converter(mido_obj)
+        >>> # Parse every file only once across epochs
+        >>> converter = ConvertToPrettyMIDI(cache=MidiCache(max_bytes=512 * 2 ** 20))
     """
 
-    def __init__(self):
+    def __init__(self, cache: MidiCache = None, corpus_cache: CorpusCache = None, parser: str = 'pretty_midi'):
         """Initialize the PrettyMIDI converter."""
         super().__init__()
+        if parser not in VALID_PARSERS:
+            raise ValueError(f"Parser must be one of {VALID_PARSERS}, got {parser}")
+
+        self.cache = cache
+        self.corpus_cache = corpus_cache
+        self.parser = parser
 
-    def apply(self, midi_data: Union[str, mido.MidiFile]):
+    def apply(self, midi_data: Union[str, mido.MidiFile, NoteTable]):
         """Convert MIDI data to a PrettyMIDI object.
         
         Args:
             midi_data: The MIDI data to convert. Can be:
                 - A file path string
                 - A Mido MidiFile object
+                - A NoteTable object
                 
         Returns:
             pretty_midi.PrettyMIDI: The converted MIDI data.
         """
         if isinstance(midi_data, str):
-            return pretty_midi.PrettyMIDI(midi_file=midi_data)
+            if self.corpus_cache is not None:
+                loader = self.corpus_cache.load_pretty_midi
+            else:
+                loader = pretty_midi.PrettyMIDI if self.parser == 'pretty_midi' else self._load_native
+            if self.cache is not None:
+                # Files read differently yield different objects, which must not share entries
+                source = f'corpus_cache:{self.corpus_cache.parser}' if self.corpus_cache is not None else self.parser
+                return self.cache.get(midi_data, loader, kind=f'pretty_midi:{source}')
+            return loader(midi_data)
+
+        if isinstance(midi_data, NoteTable):
+            return midi_data.to_pretty_midi()
 
         return pretty_midi.PrettyMIDI(mido_object=midi_data)
 
+    @staticmethod
+    def _load_native(path_to_midi: str) -> pretty_midi.PrettyMIDI:
+        """Parse a MIDI file into a PrettyMIDI object with the native parser."""
+        return arrays_to_pretty_midi(parse_smf(path_to_midi))
+
+
+class ConvertToNoteTable(BaseConversion):
+    """Convert MIDI data to a columnar NoteTable.
+    
+    All built-in note-level transforms operate natively on NoteTables. Converting
+    once at the start of a pipeline avoids converting to and from
+    `pretty_midi.Note` objects inside every transform.
+    
+    Args:
+        cache (MidiCache, optional): Cache of converted files. If given, each file
+            is parsed and converted once and later calls return a copy of the
+            cached table.
+            Default: None (parse the file on every call)
+        corpus_cache (CorpusCache, optional): On-disk cache of preprocessed files.
+            If given, notes are read from the cached note arrays instead of parsing
+            the file, and cache entries are created or refreshed as needed.
+            Default: None
+        parser (str, optional): How files are parsed. One of:
+            - 'pretty_midi': With `pretty_midi.PrettyMIDI`
+            - 'native': With `midiogre.core.smf.parse_smf`, which reads note arrays
+              straight from the file's bytes without creating per-event objects
+            Default: 'pretty_midi'
+    
+    Raises:
+        ValueError: If parser is not one of 'pretty_midi', 'native'.
+    
+    Example:
+        >>> converter = ConvertToNoteTable()
+        >>> # Convert from file
+        >>> note_table = converter('song.mid')
+        >>> # Convert from PrettyMIDI
+        >>> note_table = converter(pretty_midi_obj)
+    """
+
+    def __init__(self, cache: MidiCache = None, corpus_cache: CorpusCache = None, parser: str = 'pretty_midi'):
+        """Initialize the NoteTable converter."""
+        super().__init__()
+        if parser not in VALID_PARSERS:
+            raise ValueError(f"Parser must be one of {VALID_PARSERS}, got {parser}")
+
+        self.cache = cache
+        self.corpus_cache = corpus_cache
+        self.parser = parser
+
+    def apply(self, midi_data: Union[str, pretty_midi.PrettyMIDI, mido.MidiFile, NoteTable]):
+        """Convert MIDI data to a NoteTable.
+        
+        Args:
+            midi_data: The MIDI data to convert. Can be:
+                - A file path string
+                - A PrettyMIDI object
+                - A Mido MidiFile object
+                - A NoteTable object (returned unchanged)
+                
+        Returns:
+            NoteTable: The notes of the MIDI data in columnar form.
+        """
+        if isinstance(midi_data, NoteTable):
+            return midi_data
+
+        if isinstance(midi_data, str):
+            if self.corpus_cache is not None:
+                loader = self.corpus_cache.load_note_table
+            else:
+                loader = self._load if self.parser == 'pretty_midi' else self._load_native
+            if self.cache is not None:
+                source = f'corpus_cache:{self.corpus_cache.parser}' if self.corpus_cache is not None else self.parser
+                return self.cache.get(midi_data, loader, kind=f'note_table:{source}')
+            return loader(midi_data)
+
+        if not isinstance(midi_data, pretty_midi.PrettyMIDI):
+            midi_data = ConvertToPrettyMIDI().apply(midi_data)
+
+        return NoteTable.from_pretty_midi(midi_data)
+
+    @staticmethod
+    def _load(path_to_midi: str) -> NoteTable:
+        """Parse a MIDI file into a NoteTable."""
+        return NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI(midi_file=path_to_midi))
+
+    @staticmethod
+    def _load_native(path_to_midi: str) -> NoteTable:
+        """Parse a MIDI file into a NoteTable with the native parser."""
+        return arrays_to_note_table(parse_smf(path_to_midi))
+
 
 class ToPRollNumpy(BaseConversion):
     """Convert MIDI data to a piano roll NumPy array.
@@ -197,8 +368,13 @@ class ToPRollNumpy(BaseConversion):
     2D NumPy array of shape (128, time_steps). The array values represent note
     velocities at each time step.
     
+    The roll is rasterized directly from note arrays (see `midiogre.core.piano_roll`)
+    and matches the output of `pretty_midi.PrettyMIDI.get_piano_roll`. Passing a
+    NoteTable skips the conversion from PrettyMIDI entirely.
+    
     Args:
-        binarize (bool, optional): Whether to binarize the piano roll.
+        binarize (bool, optional): Whether to binarize the piano roll, i.e. set
+            every sounding note to 1 instead of its velocity.
             Default: False
         fs (int, optional): Sampling frequency in Hz.
             Default: 100
@@ -207,13 +383,23 @@ class ToPRollNumpy(BaseConversion):
         pedal_threshold (int, optional): Threshold above which the sustain pedal
             is activated.
             Default: 64
+        dtype (str or np.dtype, optional): Data type of the roll: 'bool',
+            'uint8', 'float16', 'float32' or 'float64'. Integer rolls hold rounded
+            velocities saturated at 255, and boolean rolls are binarized.
+            Default: 'float64'
+            
+    Raises:
+        ValueError: If the data type is not supported.
             
     Example:
         >>> converter = ToPRollNumpy(fs=200)  # 200 Hz sampling
         >>> piano_roll = converter(pretty_midi_obj)  # Shape: (128, time_steps)
+        >>>
+        >>> # One byte per cell instead of eight
+        >>> piano_roll = ToPRollNumpy(binarize=True, dtype='uint8')(pretty_midi_obj)
     """
 
-    def __init__(self, binarize=False, fs=100, times=None, pedal_threshold=64):
+    def __init__(self, binarize=False, fs=100, times=None, pedal_threshold=64, dtype='float64'):
         """Initialize the piano roll converter.
         
         Args:
@@ -221,27 +407,59 @@ class ToPRollNumpy(BaseConversion):
             fs (int, optional): Sampling frequency in Hz.
             times (array-like, optional): Times at which to sample.
             pedal_threshold (int, optional): Sustain pedal threshold.
+            dtype (str or np.dtype, optional): Data type of the roll.
         """
         super().__init__()
         self.binarize = binarize
         self.fs = fs
         self.times = times
         self.pedal_threshold = pedal_threshold
+        self.dtype = np.dtype(dtype)
+        if self.dtype.name not in PIANO_ROLL_DTYPES:
+            raise ValueError(f"Unsupported piano roll dtype {dtype}, expected one of {PIANO_ROLL_DTYPES}")
 
-    def apply(self, midi_data):
+    def __call__(self, midi_data, out=None):
+        """Convert the MIDI data, optionally into a preallocated roll.
+
+        Args:
+            midi_data (pretty_midi.PrettyMIDI or NoteTable): The MIDI data to convert.
+            out (optional): Roll of shape (128, width) to write into (see `apply`).
+                Default: None
+
+        Returns:
+            The piano roll, or `out`.
+        """
+        if out is None:
+            return super().__call__(midi_data)
+        return self.apply(midi_data, out=out)
+
+    def apply(self, midi_data, out: Optional[np.ndarray] = None):
         """Convert MIDI data to a piano roll NumPy array.
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to convert.
+            midi_data (pretty_midi.PrettyMIDI or NoteTable): The MIDI data to convert.
+            out (np.ndarray, optional): Array of shape (128, width) and of the
+                converter's data type to write the roll into, e.g. a row of a
+                preallocated batch. The roll is truncated or zero-padded to its
+                width.
+                Default: None
             
         Returns:
-            np.ndarray: Piano roll array of shape (128, time_steps).
+            np.ndarray: Piano roll array of shape (128, time_steps), or `out`.
+
+        Raises:
+            ValueError: If `out` does not have 128 rows or is of another data type.
             
         Note:
             For more details on the piano roll format, see:
             https://craffel.github.io/pretty-midi/#pretty_midi.PrettyMIDI.get_piano_roll
         """
-        return midi_data.get_piano_roll(fs=self.fs, times=self.times, pedal_threshold=self.pedal_threshold)
+        if not isinstance(midi_data, NoteTable):
+            midi_data = NoteTable.from_pretty_midi(midi_data)
+
+        with span('get_piano_roll', 'rasterize', notes=len(midi_data)):
+            return get_piano_roll(midi_data, fs=self.fs, times=self.times, pedal_threshold=self.pedal_threshold,
+                                  dtype=self.dtype, binarize=self.binarize, out=out)
 
 
 class ToPRollTensor(ToPRollNumpy):
@@ -252,10 +470,13 @@ class ToPRollTensor(ToPRollNumpy):
     velocities at each time step.
     
     This class inherits from ToPRollNumpy and adds PyTorch-specific functionality,
-    such as device placement.
+    such as device placement. The roll is rasterized in its final data type and
+    wrapped with `torch.from_numpy`, so CPU tensors share its memory instead of
+    being copied.
     
     Args:
-        binarize (bool, optional): Whether to binarize the piano roll.
+        binarize (bool, optional): Whether to binarize the piano roll, i.e. set
+            every sounding note to 1 instead of its velocity.
             Default: False
         device (str, optional): PyTorch device to place the tensor on.
             Default: 'cpu'
@@ -266,13 +487,26 @@ class ToPRollTensor(ToPRollNumpy):
         pedal_threshold (int, optional): Threshold above which the sustain pedal
             is activated.
             Default: 64
+        dtype (str or torch.dtype, optional): Data type of the tensor: bool,
+            uint8, float16, float32 or float64. Integer rolls hold rounded
+            velocities saturated at 255, and boolean rolls are binarized.
+            Default: 'float32'
+            
+    Raises:
+        ValueError: If the data type is not supported.
             
     Example:
         >>> converter = ToPRollTensor(fs=200, device='cuda')
         >>> piano_roll = converter(pretty_midi_obj)  # Shape: (128, time_steps)
+        >>>
+        >>> # Write rolls straight into a preallocated batch
+        >>> batch = torch.zeros(len(midi_files), 128, 1000, dtype=torch.bool)
+        >>> converter = ToPRollTensor(dtype=torch.bool)
+        >>> for row, midi_data in zip(batch, midi_files):
+        ...     converter(midi_data, out=row)
     """
 
-    def __init__(self, binarize=False, device='cpu', fs=100, times=None, pedal_threshold=64):
+    def __init__(self, binarize=False, device='cpu', fs=100, times=None, pedal_threshold=64, dtype='float32'):
         """Initialize the piano roll tensor converter.
         
         Args:
@@ -281,21 +515,45 @@ class ToPRollTensor(ToPRollNumpy):
             fs (int, optional): Sampling frequency in Hz.
             times (array-like, optional): Times at which to sample.
             pedal_threshold (int, optional): Sustain pedal threshold.
+            dtype (str or torch.dtype, optional): Data type of the tensor.
         """
         self.device = device
-        super().__init__(binarize=binarize, fs=fs, times=times, pedal_threshold=pedal_threshold)
+        # torch dtypes are given by name, so that torch is only imported to convert
+        if not isinstance(dtype, (str, np.dtype, type)):
+            dtype = str(dtype).replace('torch.', '')
+        super().__init__(binarize=binarize, fs=fs, times=times, pedal_threshold=pedal_threshold, dtype=dtype)
 
-    def apply(self, midi_data):
+    def apply(self, midi_data, out=None):
         """Convert MIDI data to a piano roll PyTorch tensor.
         
         Args:
-            midi_data (pretty_midi.PrettyMIDI): The MIDI data to convert.
+            midi_data (pretty_midi.PrettyMIDI or NoteTable): The MIDI data to convert.
+            out (torch.Tensor, optional): Tensor of shape (128, width) and of the
+                converter's data type to write the roll into, e.g. a row of a
+                preallocated batch, on any device. The roll is truncated or
+                zero-padded to its width.
+                Default: None
             
         Returns:
-            torch.Tensor: Piano roll tensor of shape (128, time_steps).
+            torch.Tensor: Piano roll tensor of shape (128, time_steps), or `out`.
+
+        Raises:
+            ValueError: If `out` does not have 128 rows or is of another data type.
             
         Note:
             For more details on the piano roll format, see:
             https://craffel.github.io/pretty-midi/#pretty_midi.PrettyMIDI.get_piano_roll
         """
-        return torch.Tensor(super().apply(midi_data=midi_data)).to(self.device)
+        import torch  # deferred, so that importing midiogre does not import torch
+
+        if out is None:
+            return torch.from_numpy(super().apply(midi_data)).to(self.device)
+
+        if str(out.dtype).replace('torch.', '') != self.dtype.name:
+            raise ValueError(f"Expected out to be a tensor of {self.dtype}, got {out.dtype}")
+        if out.device.type == 'cpu':
+            # Rasterize straight into the memory of the tensor
+            super().apply(midi_data, out=out.detach().numpy())
+        else:
+            out.copy_(torch.from_numpy(super().apply(midi_data, out=np.empty(tuple(out.shape), self.dtype))))
+        return out
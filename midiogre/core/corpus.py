@@ -0,0 +1,524 @@
+"""Preprocessed on-disk MIDI corpora.
+
+Parsing a MIDI file means decoding every SMF event with mido and building
+pretty_midi's tick-to-time table, while loading a handful of numpy arrays is orders
+of magnitude cheaper. A `CorpusCache` stores the note arrays of each file, together
+with its tempo map and meta events, in an uncompressed `.npz` file. Entries record
+the modification time and size of their source file and are rebuilt automatically
+when it changes.
+
+For very large corpora, `write_sharded_corpus` packs the notes of all files into a
+few large memory-mapped shards instead, and `ShardedCorpus` hands out zero-copy
+per-file views of them.
+
+Example:
+    >>> from midiogre.core.corpus import CorpusCache
+    >>> from midiogre.core.conversions import ConvertToPrettyMIDI
+    >>>
+    >>> corpus_cache = CorpusCache('cache/')
+    >>> corpus_cache.build('midi_dir/')  # Optional preprocessing step
+    >>> converter = ConvertToPrettyMIDI(corpus_cache=corpus_cache)
+    >>> midi_data = converter('midi_dir/song.mid')  # Read from cache/
+    >>>
+    >>> from midiogre.core.corpus import ShardedCorpus, write_sharded_corpus
+    >>> write_sharded_corpus('midi_dir/', 'shards/')
+    >>> corpus = ShardedCorpus('shards/')
+    >>> note_table = corpus[0]  # Zero-copy views into shards/
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Iterable, Union
+
+import numpy as np
+import pretty_midi
+
+from midiogre.core.note_table import (CONTROL_CHANGE_DTYPE, INSTRUMENT_DTYPE, PITCH_BEND_DTYPE, PITCH_DTYPE,
+                                      TIME_DTYPE, VELOCITY_DTYPE, NoteTable)
+from midiogre.core.smf import parse_smf
+
+CACHE_FORMAT_VERSION = 1
+MIDI_SUFFIXES = ('.mid', '.midi')
+
+
+def find_midi_files(midi_paths: Union[str, os.PathLike, Iterable]) -> list:
+    """List MIDI files given a directory, a single file or an iterable of files.
+
+    Args:
+        midi_paths: A directory, searched recursively for `.mid` and `.midi` files,
+            a single file path, or an iterable of file paths.
+
+    Returns:
+        list[str]: Sorted file paths.
+    """
+    if isinstance(midi_paths, (str, os.PathLike)):
+        midi_paths = Path(midi_paths)
+        if midi_paths.is_dir():
+            return sorted(str(path) for path in midi_paths.rglob('*')
+                          if path.suffix.lower() in MIDI_SUFFIXES and path.is_file())
+        return [str(midi_paths)]
+    return [str(path) for path in midi_paths]
+
+
+def _source_signature(midi_path: str) -> tuple:
+    stat = os.stat(midi_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _texts_to_arrays(events: list) -> tuple:
+    """Split pretty_midi Lyric or Text events into text and time arrays."""
+    return np.array([event.text for event in events], dtype=str), \
+        np.array([event.time for event in events], dtype=np.float64)
+
+
+def pretty_midi_to_arrays(midi_data: pretty_midi.PrettyMIDI) -> dict:
+    """Flatten a PrettyMIDI object into a dictionary of numpy arrays.
+
+    The notes are stored as in `NoteTable`, together with the tempo map and meta
+    events needed to rebuild an equivalent PrettyMIDI object with `arrays_to_pretty_midi`.
+
+    Args:
+        midi_data (pretty_midi.PrettyMIDI): The MIDI data to flatten.
+
+    Returns:
+        dict[str, np.ndarray]: Arrays that can be stored with `np.savez`.
+    """
+    note_table = NoteTable.from_pretty_midi(midi_data)
+    lyrics_text, lyrics_time = _texts_to_arrays(midi_data.lyrics)
+    text_events_text, text_events_time = _texts_to_arrays(midi_data.text_events)
+    return {
+        'pitch': note_table.pitch,
+        'velocity': note_table.velocity,
+        'start': note_table.start,
+        'end': note_table.end,
+        'instrument': note_table.instrument,
+        'programs': note_table.programs,
+        'is_drum': note_table.is_drum,
+        'names': np.array(note_table.names, dtype=str),
+        'control_changes': note_table.control_changes,
+        'pitch_bends': note_table.pitch_bends,
+        'resolution': np.array(midi_data.resolution),
+        'tick_scales': np.array(midi_data._tick_scales, dtype=np.float64).reshape(-1, 2),
+        'max_tick': np.array(len(midi_data._PrettyMIDI__tick_to_time) - 1),
+        'time_signatures': np.array(
+            [(ts.numerator, ts.denominator, ts.time) for ts in midi_data.time_signature_changes],
+            dtype=np.float64
+        ).reshape(-1, 3),
+        'key_signatures': np.array(
+            [(ks.key_number, ks.time) for ks in midi_data.key_signature_changes], dtype=np.float64
+        ).reshape(-1, 2),
+        'lyrics_text': lyrics_text,
+        'lyrics_time': lyrics_time,
+        'text_events_text': text_events_text,
+        'text_events_time': text_events_time,
+    }
+
+
+def arrays_to_note_table(arrays) -> NoteTable:
+    """Build a NoteTable from arrays created by `pretty_midi_to_arrays`.
+
+    Args:
+        arrays (Mapping[str, np.ndarray]): The stored arrays.
+
+    Returns:
+        NoteTable: The notes of the stored MIDI data.
+    """
+    return NoteTable(
+        pitch=arrays['pitch'],
+        velocity=arrays['velocity'],
+        start=arrays['start'],
+        end=arrays['end'],
+        instrument=arrays['instrument'],
+        programs=arrays['programs'],
+        is_drum=arrays['is_drum'],
+        names=arrays['names'].tolist(),
+        control_changes=arrays['control_changes'],
+        pitch_bends=arrays['pitch_bends'],
+    )
+
+
+def arrays_to_pretty_midi(arrays) -> pretty_midi.PrettyMIDI:
+    """Build a PrettyMIDI object from arrays created by `pretty_midi_to_arrays`.
+
+    Args:
+        arrays (Mapping[str, np.ndarray]): The stored arrays.
+
+    Returns:
+        pretty_midi.PrettyMIDI: MIDI data equivalent to the flattened object,
+            including its tempo map, so tick and time conversions are unchanged.
+    """
+    midi_data = arrays_to_note_table(arrays).to_pretty_midi()
+    midi_data.resolution = int(arrays['resolution'])
+    midi_data._tick_scales = [(int(tick), float(scale)) for tick, scale in arrays['tick_scales']]
+    midi_data._update_tick_to_time(int(arrays['max_tick']))
+    midi_data.time_signature_changes = [
+        pretty_midi.TimeSignature(int(numerator), int(denominator), time)
+        for numerator, denominator, time in arrays['time_signatures'].tolist()
+    ]
+    midi_data.key_signature_changes = [
+        pretty_midi.KeySignature(int(key_number), time) for key_number, time in arrays['key_signatures'].tolist()
+    ]
+    midi_data.lyrics = [
+        pretty_midi.Lyric(text, time)
+        for text, time in zip(arrays['lyrics_text'].tolist(), arrays['lyrics_time'].tolist())
+    ]
+    midi_data.text_events = [
+        pretty_midi.Text(text, time)
+        for text, time in zip(arrays['text_events_text'].tolist(), arrays['text_events_time'].tolist())
+    ]
+    return midi_data
+
+
+class CorpusCache:
+    """Directory of preprocessed MIDI files stored as numpy arrays.
+
+    Each source file is cached in its own `.npz` file, named after a hash of its
+    absolute path. An entry is valid as long as the source file keeps the
+    modification time and size recorded when the entry was written; stale or
+    missing entries are rebuilt on access, so calling `build` beforehand is
+    optional.
+
+    Args:
+        cache_dir (str or os.PathLike): Directory holding the cache entries. It is
+            created if it does not exist.
+        parser (str, optional): How files are parsed when entries are written. One of:
+            - 'pretty_midi': With `pretty_midi.PrettyMIDI`
+            - 'native': With `midiogre.core.smf.parse_smf`, which is several times
+              faster and yields the same arrays
+            Default: 'pretty_midi'
+
+    Raises:
+        ValueError: If parser is not one of 'pretty_midi', 'native'.
+
+    Example:
+        >>> corpus_cache = CorpusCache('cache/')
+        >>> note_table = corpus_cache.load_note_table('song.mid')
+        >>> midi_data = corpus_cache.load_pretty_midi('song.mid')
+    """
+
+    def __init__(self, cache_dir: Union[str, os.PathLike], parser: str = 'pretty_midi'):
+        if parser not in ('pretty_midi', 'native'):
+            raise ValueError(f"Parser must be one of ['pretty_midi', 'native'], got {parser}")
+
+        self.cache_dir = Path(cache_dir)
+        self.parser = parser
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def entry_path(self, midi_path: str) -> Path:
+        """Get the path of the cache entry of a MIDI file.
+
+        Args:
+            midi_path (str): Path to the MIDI file.
+
+        Returns:
+            Path: Path of the `.npz` entry, whether or not it exists.
+        """
+        digest = hashlib.sha1(os.path.abspath(midi_path).encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{digest}.npz'
+
+    def _read_entry(self, midi_path: str):
+        """Read a valid cache entry, or return None if it is missing or stale."""
+        entry_path = self.entry_path(midi_path)
+        if not entry_path.is_file():
+            return None
+        try:
+            with np.load(entry_path) as entry:
+                arrays = dict(entry)
+            if int(arrays.get('version', -1)) != CACHE_FORMAT_VERSION or \
+                    (int(arrays['source_mtime_ns']), int(arrays['source_size'])) != _source_signature(midi_path):
+                return None
+        except (OSError, ValueError, zipfile.BadZipFile, KeyError):
+            # Truncated, unreadable or incomplete entries are rebuilt
+            return None
+        return arrays
+
+    def _write_entry(self, midi_path: str) -> dict:
+        """Parse a MIDI file and write its cache entry atomically."""
+        source_mtime_ns, source_size = _source_signature(midi_path)
+        if self.parser == 'native':
+            arrays = parse_smf(midi_path)
+        else:
+            arrays = pretty_midi_to_arrays(pretty_midi.PrettyMIDI(midi_file=midi_path))
+        arrays['version'] = np.array(CACHE_FORMAT_VERSION)
+        arrays['source_mtime_ns'] = np.array(source_mtime_ns)
+        arrays['source_size'] = np.array(source_size)
+
+        # Write to a temporary file first so that readers never see partial entries
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                np.savez(temp_file, **arrays)
+            os.replace(temp_path, self.entry_path(midi_path))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return arrays
+
+    def load_arrays(self, midi_path: str) -> dict:
+        """Get the arrays of a MIDI file, parsing it only if its entry is stale.
+
+        Args:
+            midi_path (str): Path to the MIDI file.
+
+        Returns:
+            dict[str, np.ndarray]: Arrays as created by `pretty_midi_to_arrays`.
+        """
+        arrays = self._read_entry(midi_path)
+        if arrays is None:
+            arrays = self._write_entry(midi_path)
+        return arrays
+
+    def load_note_table(self, midi_path: str) -> NoteTable:
+        """Load the notes of a MIDI file from the cache.
+
+        Args:
+            midi_path (str): Path to the MIDI file.
+
+        Returns:
+            NoteTable: The notes of the file.
+        """
+        return arrays_to_note_table(self.load_arrays(midi_path))
+
+    def load_pretty_midi(self, midi_path: str) -> pretty_midi.PrettyMIDI:
+        """Load a MIDI file from the cache as a PrettyMIDI object.
+
+        Args:
+            midi_path (str): Path to the MIDI file.
+
+        Returns:
+            pretty_midi.PrettyMIDI: The MIDI data, including its tempo map.
+        """
+        return arrays_to_pretty_midi(self.load_arrays(midi_path))
+
+    def build(self, midi_paths: Union[str, os.PathLike, Iterable], skip_errors: bool = True) -> list:
+        """Create or refresh the cache entries of many MIDI files.
+
+        Args:
+            midi_paths: A directory (searched recursively), a single file or an
+                iterable of files.
+            skip_errors (bool, optional): If True, files that cannot be parsed are
+                skipped instead of raising.
+                Default: True
+
+        Returns:
+            list[str]: Paths of the files that could not be parsed.
+        """
+        failed = []
+        for midi_path in find_midi_files(midi_paths):
+            if self._read_entry(midi_path) is not None:
+                continue
+            try:
+                self._write_entry(midi_path)
+            except Exception:
+                if not skip_errors:
+                    raise
+                failed.append(midi_path)
+        return failed
+
+
+SHARD_COLUMNS = {
+    # name: (dtype, level) where level is the index that slices the column
+    'pitch': (PITCH_DTYPE, 'note'),
+    'velocity': (VELOCITY_DTYPE, 'note'),
+    'start': (TIME_DTYPE, 'note'),
+    'end': (TIME_DTYPE, 'note'),
+    'instrument': (INSTRUMENT_DTYPE, 'note'),
+    'programs': (np.int16, 'instrument'),
+    'is_drum': (bool, 'instrument'),
+    'control_changes': (CONTROL_CHANGE_DTYPE, 'control_change'),
+    'pitch_bends': (PITCH_BEND_DTYPE, 'pitch_bend'),
+}
+SHARD_LEVELS = ('note', 'instrument', 'control_change', 'pitch_bend')
+# Separates instrument names in the index; numpy strips trailing NUL characters
+NAME_SEPARATOR = '\x1f'
+
+
+class _ShardWriter:
+    """Accumulate the arrays of many files and write them out as shards."""
+
+    def __init__(self, out_dir: Path, max_notes_per_shard: int):
+        self.out_dir = out_dir
+        self.max_notes_per_shard = max_notes_per_shard
+        self.num_shards = 0
+        self.index = {'path': [], 'shard': [], 'names': []}
+        for level in SHARD_LEVELS:
+            self.index[f'{level}_offset'] = []
+            self.index[f'{level}_count'] = []
+        self._reset()
+
+    def _reset(self):
+        self._columns = {name: [] for name in SHARD_COLUMNS}
+        self._sizes = dict.fromkeys(SHARD_LEVELS, 0)
+
+    def add(self, midi_path: str, note_table: NoteTable):
+        counts = {
+            'note': len(note_table),
+            'instrument': note_table.num_instruments,
+            'control_change': len(note_table.control_changes),
+            'pitch_bend': len(note_table.pitch_bends),
+        }
+        if self._sizes['note'] and self._sizes['note'] + counts['note'] > self.max_notes_per_shard:
+            self.flush()
+
+        for name in SHARD_COLUMNS:
+            self._columns[name].append(getattr(note_table, name))
+        for level in SHARD_LEVELS:
+            self.index[f'{level}_offset'].append(self._sizes[level])
+            self.index[f'{level}_count'].append(counts[level])
+            self._sizes[level] += counts[level]
+        self.index['path'].append(midi_path)
+        self.index['shard'].append(self.num_shards)
+        self.index['names'].append(NAME_SEPARATOR.join(note_table.names))
+
+    def flush(self):
+        if not self.index['shard'] or self.index['shard'][-1] != self.num_shards:
+            return
+        shard_dir = self.out_dir / f'shard-{self.num_shards:05d}'
+        shard_dir.mkdir(exist_ok=True)
+        for name, (dtype, _) in SHARD_COLUMNS.items():
+            np.save(shard_dir / f'{name}.npy', np.concatenate(self._columns[name]).astype(dtype, copy=False))
+        self.num_shards += 1
+        self._reset()
+
+    def close(self):
+        self.flush()
+        index = {name: np.array(values, dtype=np.int64) for name, values in self.index.items()
+                 if name not in ('path', 'names')}
+        index['path'] = np.array(self.index['path'], dtype=str)
+        index['names'] = np.array(self.index['names'], dtype=str)
+        index['version'] = np.array(CACHE_FORMAT_VERSION)
+        np.savez(self.out_dir / 'index.npz', **index)
+
+
+def write_sharded_corpus(midi_paths: Union[str, os.PathLike, Iterable], out_dir: Union[str, os.PathLike],
+                         max_notes_per_shard: int = 2 ** 24, corpus_cache: CorpusCache = None,
+                         skip_errors: bool = True) -> list:
+    """Pack the notes of many MIDI files into memory-mappable shards.
+
+    Every column of the notes of all files (see `NoteTable`) is concatenated into
+    one `.npy` file per shard, and `index.npz` records the slice of each file in its
+    shard. Files are processed one at a time, so memory use is bounded by the
+    size of a single shard. Read the result with `ShardedCorpus`.
+
+    Args:
+        midi_paths: A directory (searched recursively), a single file or an
+            iterable of files.
+        out_dir (str or os.PathLike): Directory to write the shards to. It is
+            created if it does not exist.
+        max_notes_per_shard (int, optional): Notes after which a new shard is
+            started. A file is never split across shards.
+            Default: 2 ** 24
+        corpus_cache (CorpusCache, optional): If given, notes are read through this
+            cache instead of parsing every file.
+            Default: None
+        skip_errors (bool, optional): If True, files that cannot be parsed are
+            skipped instead of raising.
+            Default: True
+
+    Returns:
+        list[str]: Paths of the files that could not be parsed.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    writer = _ShardWriter(out_dir, max_notes_per_shard)
+
+    failed = []
+    for midi_path in find_midi_files(midi_paths):
+        try:
+            if corpus_cache is not None:
+                note_table = corpus_cache.load_note_table(midi_path)
+            else:
+                note_table = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI(midi_file=midi_path))
+        except Exception:
+            if not skip_errors:
+                raise
+            failed.append(midi_path)
+            continue
+        writer.add(midi_path, note_table)
+
+    writer.close()
+    return failed
+
+
+class ShardedCorpus:
+    """Read-only view of a corpus written by `write_sharded_corpus`.
+
+    Shards are memory-mapped on first access, so loading an item reads only the
+    pages it touches, reads are sequential within a shard, and all processes
+    reading the same shards share them through the operating system's page cache.
+    Items are NoteTables whose arrays are zero-copy, read-only views into the
+    shards; transforms copy them on their first in-place modification (see
+    `NoteTable.ensure_writable`), so the shards on disk are never modified.
+
+    When pickled, e.g. to be sent to DataLoader worker processes, only the corpus
+    location is kept and every process maps the shards itself.
+
+    Args:
+        root (str or os.PathLike): Directory written by `write_sharded_corpus`.
+
+    Raises:
+        ValueError: If the directory does not hold a corpus in a supported format.
+
+    Example:
+        >>> write_sharded_corpus('lakh/', 'lakh_shards/')
+        >>> corpus = ShardedCorpus('lakh_shards/')
+        >>> note_table = transform(corpus[0])
+    """
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        self.root = Path(root)
+        with np.load(self.root / 'index.npz') as index:
+            self._index = dict(index)
+        if int(self._index.get('version', -1)) != CACHE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported sharded corpus format in {self.root}")
+        self.paths = self._index['path'].tolist()
+        self._shards = {}
+
+    def __getstate__(self):
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'])
+
+    def __len__(self):
+        """Return the number of files in the corpus."""
+        return len(self.paths)
+
+    @property
+    def num_notes(self) -> int:
+        """Total number of notes in the corpus."""
+        return int(self._index['note_count'].sum())
+
+    def _get_shard(self, shard_idx: int) -> dict:
+        shard = self._shards.get(shard_idx)
+        if shard is None:
+            shard_dir = self.root / f'shard-{shard_idx:05d}'
+            shard = {name: np.load(shard_dir / f'{name}.npy', mmap_mode='r') for name in SHARD_COLUMNS}
+            self._shards[shard_idx] = shard
+        return shard
+
+    def __getitem__(self, idx: int) -> NoteTable:
+        """Get the notes of a file as zero-copy views into its shard.
+
+        Args:
+            idx (int): Index of the file, in the order of `paths`.
+
+        Returns:
+            NoteTable: The notes of the file, backed by read-only arrays.
+        """
+        if not -len(self) <= idx < len(self):
+            raise IndexError(f"Index {idx} out of range for corpus of {len(self)} files")
+        idx = idx % len(self)
+
+        shard = self._get_shard(int(self._index['shard'][idx]))
+        views = {}
+        for name, (_, level) in SHARD_COLUMNS.items():
+            offset = int(self._index[f'{level}_offset'][idx])
+            views[name] = shard[name][offset:offset + int(self._index[f'{level}_count'][idx])]
+
+        names = str(self._index['names'][idx])
+        num_instruments = len(views['programs'])
+        return NoteTable(names=names.split(NAME_SEPARATOR) if num_instruments else [], **views)
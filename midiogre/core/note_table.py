@@ -0,0 +1,481 @@
+"""Columnar note storage for MIDI data.
+
+This module provides `NoteTable`, a struct-of-arrays representation of every note
+in a MIDI file. Instead of one `pretty_midi.Note` object per note, a NoteTable keeps
+contiguous NumPy arrays of pitches, velocities, onset/offset times and instrument
+indices, so that augmentations can be expressed as a handful of vectorized NumPy
+operations over the whole file.
+
+All built-in note-level augmentations accept a NoteTable directly. Converting once at
+the start of a pipeline avoids rebuilding `pretty_midi.Note` objects after every
+transform.
+
+Example:
+    >>> from midiogre.augmentations import PitchShift, NoteDelete
+    >>> from midiogre.core import Compose, NoteTable
+    >>> import pretty_midi
+    >>>
+    >>> midi_data = pretty_midi.PrettyMIDI('song.mid')
+    >>> note_table = NoteTable.from_pretty_midi(midi_data)
+    >>>
+    >>> transform = Compose([
+    ...     PitchShift(max_shift=2, p=0.5),
+    ...     NoteDelete(p=0.1)
+    ... ])
+    >>> note_table = transform(note_table)
+    >>>
+    >>> # Write the augmented notes back into a PrettyMIDI object if needed
+    >>> augmented = note_table.to_pretty_midi()
+"""
+
+import numpy as np
+import pretty_midi
+
+PITCH_DTYPE = np.int16
+VELOCITY_DTYPE = np.int16
+TIME_DTYPE = np.float64
+INSTRUMENT_DTYPE = np.int32
+
+CONTROL_CHANGE_DTYPE = np.dtype([
+    ('instrument', INSTRUMENT_DTYPE),
+    ('number', np.int16),
+    ('value', np.int16),
+    ('time', TIME_DTYPE),
+])
+PITCH_BEND_DTYPE = np.dtype([
+    ('instrument', INSTRUMENT_DTYPE),
+    ('pitch', np.int32),
+    ('time', TIME_DTYPE),
+])
+
+
+class NoteTable:
+    """Struct-of-arrays store holding all notes of a MIDI file.
+
+    Each note occupies one row across the per-note arrays. The instrument a note
+    belongs to is stored as an index into the per-instrument metadata arrays
+    (programs, drum flags and names), mirroring the order of
+    `pretty_midi.PrettyMIDI.instruments`.
+
+    Within an instrument, notes keep the relative order they were added in. This
+    matches the list order of `instrument.notes` when converting back and forth.
+
+    Control changes and pitch bends are far less numerous than notes and are never
+    edited by the note-level transforms, so they are kept as compact structured
+    arrays (see `CONTROL_CHANGE_DTYPE` and `PITCH_BEND_DTYPE`) rather than as
+    separate columns. They are needed to render piano rolls faithfully (sustain
+    pedal, pitch bends and instrument end times).
+
+    Args:
+        pitch (array-like): MIDI note numbers. Shape: (num_notes,)
+        velocity (array-like): MIDI note velocities. Shape: (num_notes,)
+        start (array-like): Note onset times in seconds. Shape: (num_notes,)
+        end (array-like): Note offset times in seconds. Shape: (num_notes,)
+        instrument (array-like): Index of the instrument owning each note.
+            Shape: (num_notes,)
+        programs (array-like, optional): MIDI program of each instrument.
+            Default: one program-0 instrument per distinct index in `instrument`
+        is_drum (array-like, optional): Drum flag of each instrument.
+            Default: all False
+        names (list[str], optional): Name of each instrument.
+            Default: empty names
+        control_changes (np.ndarray, optional): Structured array of control
+            changes with dtype `CONTROL_CHANGE_DTYPE`, in per-instrument list order.
+            Default: no control changes
+        pitch_bends (np.ndarray, optional): Structured array of pitch bends with
+            dtype `PITCH_BEND_DTYPE`, in per-instrument list order.
+            Default: no pitch bends
+
+    Raises:
+        ValueError: If the per-note or per-instrument arrays have mismatched lengths,
+            or if a note references an instrument that does not exist.
+    """
+
+    def __init__(self, pitch, velocity, start, end, instrument, programs=None, is_drum=None, names=None,
+                 control_changes=None, pitch_bends=None):
+        self.pitch = np.asarray(pitch, dtype=PITCH_DTYPE)
+        self.velocity = np.asarray(velocity, dtype=VELOCITY_DTYPE)
+        self.start = np.asarray(start, dtype=TIME_DTYPE)
+        self.end = np.asarray(end, dtype=TIME_DTYPE)
+        self.instrument = np.asarray(instrument, dtype=INSTRUMENT_DTYPE)
+
+        num_notes = len(self.pitch)
+        if not (len(self.velocity) == len(self.start) == len(self.end) == len(self.instrument) == num_notes):
+            raise ValueError(
+                "All per-note arrays of a NoteTable must have the same length."
+            )
+
+        if programs is None:
+            num_instruments = int(self.instrument.max()) + 1 if num_notes else 0
+            programs = np.zeros(num_instruments, dtype=np.int16)
+        self.programs = np.asarray(programs, dtype=np.int16)
+
+        num_instruments = len(self.programs)
+        self.is_drum = np.zeros(num_instruments, dtype=bool) if is_drum is None else np.asarray(is_drum, dtype=bool)
+        self.names = [''] * num_instruments if names is None else list(names)
+
+        if not len(self.is_drum) == len(self.names) == num_instruments:
+            raise ValueError(
+                "All per-instrument arrays of a NoteTable must have the same length."
+            )
+
+        if num_notes and (self.instrument.min() < 0 or self.instrument.max() >= num_instruments):
+            raise ValueError(
+                f"Note instrument indices must be in range [0, {num_instruments}), "
+                f"got [{self.instrument.min()}, {self.instrument.max()}]"
+            )
+
+        self.control_changes = np.zeros(0, dtype=CONTROL_CHANGE_DTYPE) if control_changes is None \
+            else np.asarray(control_changes, dtype=CONTROL_CHANGE_DTYPE)
+        self.pitch_bends = np.zeros(0, dtype=PITCH_BEND_DTYPE) if pitch_bends is None \
+            else np.asarray(pitch_bends, dtype=PITCH_BEND_DTYPE)
+
+    @classmethod
+    def from_pretty_midi(cls, midi_data):
+        """Build a NoteTable from the instruments of a PrettyMIDI object.
+
+        Args:
+            midi_data (pretty_midi.PrettyMIDI): The MIDI data to read notes from.
+
+        Returns:
+            NoteTable: A table holding every note of every instrument in `midi_data`.
+        """
+        instruments = midi_data.instruments
+        notes = [note for instrument in instruments for note in instrument.notes]
+        num_notes = len(notes)
+
+        # Read each attribute straight into an array, without per-note temporaries
+        pitch = np.fromiter((note.pitch for note in notes), dtype=PITCH_DTYPE, count=num_notes)
+        velocity = np.fromiter((note.velocity for note in notes), dtype=VELOCITY_DTYPE, count=num_notes)
+        start = np.fromiter((note.start for note in notes), dtype=TIME_DTYPE, count=num_notes)
+        end = np.fromiter((note.end for note in notes), dtype=TIME_DTYPE, count=num_notes)
+        instrument = np.repeat(
+            np.arange(len(instruments), dtype=INSTRUMENT_DTYPE),
+            [len(instrument.notes) for instrument in instruments]
+        )
+
+        control_changes = np.array([
+            (instrument_idx, cc.number, cc.value, cc.time)
+            for instrument_idx, instrument in enumerate(instruments)
+            for cc in instrument.control_changes
+        ], dtype=CONTROL_CHANGE_DTYPE)
+        pitch_bends = np.array([
+            (instrument_idx, bend.pitch, bend.time)
+            for instrument_idx, instrument in enumerate(instruments)
+            for bend in instrument.pitch_bends
+        ], dtype=PITCH_BEND_DTYPE)
+
+        return cls(
+            pitch=pitch,
+            velocity=velocity,
+            start=start,
+            end=end,
+            instrument=instrument,
+            programs=[instrument.program for instrument in instruments],
+            is_drum=[instrument.is_drum for instrument in instruments],
+            names=[instrument.name for instrument in instruments],
+            control_changes=control_changes,
+            pitch_bends=pitch_bends,
+        )
+
+    @classmethod
+    def concatenate(cls, note_tables: list):
+        """Merge several tables into one, keeping their instruments separate.
+
+        Instrument indices of each table are offset by the number of instruments
+        in the tables before it, so every input instrument stays a distinct
+        instrument of the merged table. Use `split` to undo the merge.
+
+        Args:
+            note_tables (list[NoteTable]): Tables to merge.
+
+        Returns:
+            NoteTable: A single table holding the notes of all inputs, in input order.
+        """
+        instrument_offsets = np.cumsum([0] + [table.num_instruments for table in note_tables])[:-1]
+
+        def offset_events(events, offset):
+            events = events.copy()
+            events['instrument'] += offset
+            return events
+
+        return cls(
+            pitch=np.concatenate([table.pitch for table in note_tables] or [[]]),
+            velocity=np.concatenate([table.velocity for table in note_tables] or [[]]),
+            start=np.concatenate([table.start for table in note_tables] or [[]]),
+            end=np.concatenate([table.end for table in note_tables] or [[]]),
+            instrument=np.concatenate(
+                [table.instrument + offset for table, offset in zip(note_tables, instrument_offsets)] or [[]]
+            ),
+            programs=np.concatenate([table.programs for table in note_tables] or [[]]),
+            is_drum=np.concatenate([table.is_drum for table in note_tables] or [[]]),
+            names=[name for table in note_tables for name in table.names],
+            control_changes=np.concatenate(
+                [offset_events(table.control_changes, offset) for table, offset in zip(note_tables, instrument_offsets)]
+                or [np.zeros(0, dtype=CONTROL_CHANGE_DTYPE)]
+            ),
+            pitch_bends=np.concatenate(
+                [offset_events(table.pitch_bends, offset) for table, offset in zip(note_tables, instrument_offsets)]
+                or [np.zeros(0, dtype=PITCH_BEND_DTYPE)]
+            ),
+        )
+
+    def split(self, instrument_counts) -> list:
+        """Split a merged table back into separate tables.
+
+        This is the inverse of `concatenate`: the first `instrument_counts[0]`
+        instruments form the first table, the next `instrument_counts[1]` the second
+        and so on. Notes keep their relative order within each output table.
+
+        Args:
+            instrument_counts (list[int]): Number of instruments of each output table.
+                Must sum to `num_instruments`.
+
+        Returns:
+            list[NoteTable]: One table per entry of `instrument_counts`.
+
+        Raises:
+            ValueError: If `instrument_counts` does not sum to `num_instruments`.
+        """
+        instrument_counts = np.asarray(instrument_counts, dtype=np.int64)
+        if instrument_counts.sum() != self.num_instruments:
+            raise ValueError(
+                f"Instrument counts must sum to {self.num_instruments}, got {instrument_counts.sum()}"
+            )
+
+        num_tables = len(instrument_counts)
+        instrument_offsets = np.concatenate([[0], np.cumsum(instrument_counts)])
+        table_of_instrument = np.repeat(np.arange(num_tables), instrument_counts)
+
+        def split_rows(owner_instrument):
+            """Order rows by output table and return the order and split points."""
+            owner_table = table_of_instrument[owner_instrument]
+            order = np.argsort(owner_table, kind='stable')
+            boundaries = np.cumsum(np.bincount(owner_table, minlength=num_tables))[:-1]
+            return order, boundaries
+
+        note_order, note_boundaries = split_rows(self.instrument)
+        columns = [
+            np.split(column[note_order], note_boundaries)
+            for column in (self.pitch, self.velocity, self.start, self.end, self.instrument)
+        ]
+        cc_order, cc_boundaries = split_rows(self.control_changes['instrument'])
+        control_changes = np.split(self.control_changes[cc_order], cc_boundaries)
+        bend_order, bend_boundaries = split_rows(self.pitch_bends['instrument'])
+        pitch_bends = np.split(self.pitch_bends[bend_order], bend_boundaries)
+
+        note_tables = []
+        for table_idx in range(num_tables):
+            first, last = instrument_offsets[table_idx], instrument_offsets[table_idx + 1]
+            pitch, velocity, start, end, instrument = (column[table_idx] for column in columns)
+            table_control_changes = control_changes[table_idx].copy()
+            table_control_changes['instrument'] -= first
+            table_pitch_bends = pitch_bends[table_idx].copy()
+            table_pitch_bends['instrument'] -= first
+            note_tables.append(NoteTable(
+                pitch=pitch,
+                velocity=velocity,
+                start=start,
+                end=end,
+                instrument=instrument - first,
+                programs=self.programs[first:last],
+                is_drum=self.is_drum[first:last],
+                names=self.names[first:last],
+                control_changes=table_control_changes,
+                pitch_bends=table_pitch_bends,
+            ))
+        return note_tables
+
+    @property
+    def num_instruments(self) -> int:
+        """int: Number of instruments described by the table."""
+        return len(self.programs)
+
+    def __len__(self):
+        """Return the number of notes in the table.
+
+        Returns:
+            int: Number of notes across all instruments.
+        """
+        return len(self.pitch)
+
+    def __repr__(self):
+        return f"NoteTable(num_notes={len(self)}, num_instruments={self.num_instruments})"
+
+    def instrument_indices(self, instrument_idx: int) -> np.ndarray:
+        """Get the row indices of all notes belonging to an instrument.
+
+        Args:
+            instrument_idx (int): Index of the instrument.
+
+        Returns:
+            np.ndarray: Row indices in table order. Shape: (num_instrument_notes,)
+        """
+        return np.flatnonzero(self.instrument == instrument_idx)
+
+    def instrument_groups(self) -> list:
+        """Get the row indices of the notes of every instrument at once.
+
+        Equivalent to calling `instrument_indices` for each instrument, but with a
+        single sort instead of one scan of the table per instrument.
+
+        Returns:
+            list[np.ndarray]: Row indices in table order, one array per instrument.
+        """
+        order = np.argsort(self.instrument, kind='stable')
+        boundaries = np.cumsum(np.bincount(self.instrument, minlength=self.num_instruments))[:-1]
+        return np.split(order, boundaries) if self.num_instruments else []
+
+    def ensure_writable(self):
+        """Copy every read-only array so that the table can be modified in place.
+
+        Tables can hold read-only views, e.g. zero-copy slices of a memory-mapped
+        `ShardedCorpus`. Only those arrays are copied; writable arrays are kept.
+
+        Returns:
+            NoteTable: The table itself.
+        """
+        for name in ('pitch', 'velocity', 'start', 'end', 'instrument', 'programs', 'is_drum',
+                     'control_changes', 'pitch_bends'):
+            array = getattr(self, name)
+            if not array.flags.writeable:
+                setattr(self, name, array.copy())
+        return self
+
+    def copy(self):
+        """Return a deep copy of the table.
+
+        Returns:
+            NoteTable: A table with its own copies of every array.
+        """
+        return NoteTable(
+            pitch=self.pitch.copy(),
+            velocity=self.velocity.copy(),
+            start=self.start.copy(),
+            end=self.end.copy(),
+            instrument=self.instrument.copy(),
+            programs=self.programs.copy(),
+            is_drum=self.is_drum.copy(),
+            names=self.names,
+            control_changes=self.control_changes.copy(),
+            pitch_bends=self.pitch_bends.copy(),
+        )
+
+    def end_times(self) -> np.ndarray:
+        """Get the time of the last event of each instrument.
+
+        Mirrors `pretty_midi.Instrument.get_end_time`: the latest note offset,
+        control change or pitch bend of each instrument, or 0 if it has no events.
+
+        Returns:
+            np.ndarray: End time of each instrument in seconds. Shape: (num_instruments,)
+        """
+        end_times = np.zeros(self.num_instruments, dtype=TIME_DTYPE)
+        np.maximum.at(end_times, self.instrument, self.end)
+        np.maximum.at(end_times, self.control_changes['instrument'], self.control_changes['time'])
+        np.maximum.at(end_times, self.pitch_bends['instrument'], self.pitch_bends['time'])
+        return end_times
+
+    def filter(self, keep_mask: np.ndarray):
+        """Keep only the notes selected by a boolean mask, in place.
+
+        Args:
+            keep_mask (np.ndarray): Boolean mask over the notes. Shape: (num_notes,)
+
+        Returns:
+            NoteTable: self, for chaining.
+        """
+        self.pitch = self.pitch[keep_mask]
+        self.velocity = self.velocity[keep_mask]
+        self.start = self.start[keep_mask]
+        self.end = self.end[keep_mask]
+        self.instrument = self.instrument[keep_mask]
+        return self
+
+    def append(self, pitch, velocity, start, end, instrument):
+        """Append new notes to the end of the table, in place.
+
+        Args:
+            pitch (array-like): MIDI note numbers of the new notes.
+            velocity (array-like): MIDI velocities of the new notes.
+            start (array-like): Onset times of the new notes in seconds.
+            end (array-like): Offset times of the new notes in seconds.
+            instrument (array-like): Instrument index of each new note.
+
+        Returns:
+            NoteTable: self, for chaining.
+        """
+        self.pitch = np.concatenate([self.pitch, np.asarray(pitch, dtype=PITCH_DTYPE)])
+        self.velocity = np.concatenate([self.velocity, np.asarray(velocity, dtype=VELOCITY_DTYPE)])
+        self.start = np.concatenate([self.start, np.asarray(start, dtype=TIME_DTYPE)])
+        self.end = np.concatenate([self.end, np.asarray(end, dtype=TIME_DTYPE)])
+        self.instrument = np.concatenate([self.instrument, np.asarray(instrument, dtype=INSTRUMENT_DTYPE)])
+        return self
+
+    def to_pretty_midi(self, midi_data=None):
+        """Write the notes of the table into a PrettyMIDI object.
+
+        Args:
+            midi_data (pretty_midi.PrettyMIDI, optional): Object whose instruments'
+                note lists should be replaced by the table contents. Its instruments
+                must be the ones the table was built from. If None, a new PrettyMIDI
+                object is created with one instrument per table instrument.
+                Default: None
+
+        Returns:
+            pretty_midi.PrettyMIDI: The object holding the table's notes.
+
+        Note:
+            Existing Note objects are updated in place and reused positionally;
+            extra Note objects are only allocated when the table holds more notes
+            than the instrument. Control changes and pitch bends are only written
+            when a new PrettyMIDI object is created. That object uses pretty_midi's
+            default tempo; event times are preserved in seconds.
+        """
+        if midi_data is None:
+            midi_data = pretty_midi.PrettyMIDI()
+            midi_data.instruments = [
+                pretty_midi.Instrument(program=int(program), is_drum=bool(is_drum), name=name)
+                for program, is_drum, name in zip(self.programs, self.is_drum, self.names)
+            ]
+            for instrument_idx, number, value, time in self.control_changes.tolist():
+                midi_data.instruments[instrument_idx].control_changes.append(
+                    pretty_midi.ControlChange(number=number, value=value, time=time)
+                )
+            for instrument_idx, pitch, time in self.pitch_bends.tolist():
+                midi_data.instruments[instrument_idx].pitch_bends.append(
+                    pretty_midi.PitchBend(pitch=pitch, time=time)
+                )
+        elif len(midi_data.instruments) != self.num_instruments:
+            raise ValueError(
+                f"NoteTable has {self.num_instruments} instruments but the MIDI data has "
+                f"{len(midi_data.instruments)}."
+            )
+
+        # Group notes by instrument while keeping their relative order
+        order = np.argsort(self.instrument, kind='stable')
+        counts = np.bincount(self.instrument, minlength=self.num_instruments)
+        boundaries = np.cumsum(counts)[:-1] if self.num_instruments else []
+
+        pitches = np.split(self.pitch[order], boundaries)
+        velocities = np.split(self.velocity[order], boundaries)
+        starts = np.split(self.start[order], boundaries)
+        ends = np.split(self.end[order], boundaries)
+
+        for instrument, p, v, s, e in zip(midi_data.instruments, pitches, velocities, starts, ends):
+            # Reuse existing Note objects where possible instead of reallocating them
+            notes = instrument.notes[:len(p)]
+            for note, pitch, velocity, start, end in zip(notes, p.tolist(), v.tolist(), s.tolist(), e.tolist()):
+                note.pitch = pitch
+                note.velocity = velocity
+                note.start = start
+                note.end = end
+            notes.extend(
+                pretty_midi.Note(velocity=velocity, pitch=pitch, start=start, end=end)
+                for pitch, velocity, start, end in zip(
+                    p[len(notes):].tolist(), v[len(notes):].tolist(), s[len(notes):].tolist(), e[len(notes):].tolist()
+                )
+            )
+            instrument.notes = notes
+
+        return midi_data
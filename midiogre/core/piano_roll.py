@@ -0,0 +1,325 @@
+"""Vectorized piano roll rasterization.
+
+This module renders piano rolls directly from the columnar arrays of a `NoteTable`.
+It produces the same output as `pretty_midi.PrettyMIDI.get_piano_roll`, including
+sustain pedal elongation, pitch bends and resampling at arbitrary `times`, but
+without walking every note in Python or allocating a full-size roll per instrument.
+
+Note velocities are written with a difference array: each note adds its velocity at
+its onset column and subtracts it at its offset column, and an in-place cumulative
+sum along the time axis turns these edges into the final roll. Only instruments that
+actually use the sustain pedal or pitch bends are rendered separately, since those
+effects apply to a single instrument's roll.
+
+Example:
+    >>> from midiogre.core import NoteTable
+    >>> from midiogre.core.piano_roll import get_piano_roll
+    >>> import pretty_midi
+    >>>
+    >>> note_table = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI('song.mid'))
+    >>> piano_roll = get_piano_roll(note_table, fs=100)  # Shape: (128, time_steps)
+"""
+
+from typing import Optional
+
+import numpy as np
+from pretty_midi import pitch_bend_to_semitones
+
+from midiogre.core.note_table import NoteTable
+
+NUM_PITCHES = 128
+CC_SUSTAIN_PEDAL = 64
+# Data types a piano roll can be returned in
+PIANO_ROLL_DTYPES = ('bool', 'uint8', 'float16', 'float32', 'float64')
+
+
+def _rasterize_notes(pitch: np.ndarray, velocity: np.ndarray, start_idx: np.ndarray, end_idx: np.ndarray,
+                     width: int) -> np.ndarray:
+    """Render notes into a new piano roll using a difference array.
+
+    Args:
+        pitch (np.ndarray): MIDI note numbers. Shape: (num_notes,)
+        velocity (np.ndarray): Note velocities. Shape: (num_notes,)
+        start_idx (np.ndarray): First column of each note. Shape: (num_notes,)
+        end_idx (np.ndarray): Column after the last column of each note.
+            Shape: (num_notes,)
+        width (int): Number of columns of the roll. Notes are clipped to it.
+
+    Returns:
+        np.ndarray: Piano roll with summed velocities. Shape: (128, width)
+    """
+    start_idx = np.clip(start_idx, 0, width)
+    end_idx = np.clip(end_idx, 0, width)
+    sounding = end_idx > start_idx
+    row_offsets = pitch[sounding].astype(np.int64) * width
+    velocity = velocity[sounding].astype(np.float64)
+    start_idx = start_idx[sounding]
+    end_idx = end_idx[sounding]
+
+    # Notes running to the last column never need to be switched off
+    switched_off = end_idx < width
+    edges = np.bincount(
+        np.concatenate([row_offsets + start_idx, row_offsets[switched_off] + end_idx[switched_off]]),
+        weights=np.concatenate([velocity, -velocity[switched_off]]),
+        minlength=NUM_PITCHES * width
+    ).astype(np.float64, copy=False).reshape(NUM_PITCHES, width)
+    return np.cumsum(edges, axis=1, out=edges)
+
+
+def _apply_sustain_pedal(piano_roll: np.ndarray, control_changes: np.ndarray, fs: float, pedal_threshold: int):
+    """Elongate notes held by the sustain pedal, in place.
+
+    While the pedal is down, each pitch retains the maximum velocity reached so far,
+    exactly as in `pretty_midi.Instrument.get_piano_roll`.
+
+    Args:
+        piano_roll (np.ndarray): Roll of a single instrument. Shape: (128, width)
+        control_changes (np.ndarray): Control changes of that instrument in list order.
+        fs (float): Sampling frequency in Hz.
+        pedal_threshold (int): CC64 values below this are pedal-off.
+    """
+    pedal_events = control_changes[control_changes['number'] == CC_SUSTAIN_PEDAL]
+    time_pedal_on = 0
+    is_pedal_on = False
+    for value, time in zip(pedal_events['value'].tolist(), pedal_events['time'].tolist()):
+        time_now = int(time * fs)
+        is_current_pedal_on = value >= pedal_threshold
+        if not is_pedal_on and is_current_pedal_on:
+            time_pedal_on = time_now
+            is_pedal_on = True
+        elif is_pedal_on and not is_current_pedal_on:
+            segment = piano_roll[:, time_pedal_on:time_now]
+            piano_roll[:, time_pedal_on:time_now] = np.maximum.accumulate(segment, axis=1)
+            is_pedal_on = False
+
+
+def _apply_pitch_bends(piano_roll: np.ndarray, pitch_bends: np.ndarray, fs: float, end_time: float):
+    """Shift the piano roll of a single instrument by its pitch bends, in place.
+
+    Each bend holds until the next one (or `end_time`). Bent columns are shifted
+    by the integer part of the bend and linearly interpolated by its fractional part,
+    exactly as in `pretty_midi.Instrument.get_piano_roll`.
+
+    Args:
+        piano_roll (np.ndarray): Roll of a single instrument. Shape: (128, width)
+        pitch_bends (np.ndarray): Pitch bends of that instrument.
+        fs (float): Sampling frequency in Hz.
+        end_time (float): End time of the instrument in seconds.
+    """
+    pitch_bends = pitch_bends[np.argsort(pitch_bends['time'], kind='stable')]
+    bend_starts = pitch_bends['time'].tolist()
+    bend_ends = bend_starts[1:] + [end_time]
+
+    for bend_pitch, bend_start, bend_end in zip(pitch_bends['pitch'].tolist(), bend_starts, bend_ends):
+        if abs(bend_pitch) < 1:
+            continue
+        semitones = pitch_bend_to_semitones(bend_pitch)
+        bend_int = int(np.sign(semitones) * np.floor(np.abs(semitones)))
+        bend_decimal = np.abs(semitones - bend_int)
+
+        columns = slice(int(bend_start * fs), int(bend_end * fs))
+        segment = piano_roll[:, columns]
+        if bend_pitch >= 0:
+            bent = np.zeros_like(segment)
+            if bend_int != 0:
+                bent[bend_int:] = segment[:-bend_int]
+            else:
+                bent[:] = segment
+            bent[1:] = (1 - bend_decimal) * bent[1:] + bend_decimal * bent[:-1]
+        else:
+            bent = np.zeros_like(segment)
+            if bend_int != 0:
+                bent[:bend_int] = segment[-bend_int:]
+            else:
+                bent[:] = segment
+            bent[:-1] = (1 - bend_decimal) * bent[:-1] + bend_decimal * bent[1:]
+        piano_roll[:, columns] = bent
+
+
+def _render_instruments(note_table: NoteTable, instrument_ids: np.ndarray, width: int, widths: np.ndarray,
+                        end_times: np.ndarray, fs: float, pedal_threshold) -> np.ndarray:
+    """Render the summed piano roll of a set of non-drum instruments.
+
+    Args:
+        note_table (NoteTable): The notes to render.
+        instrument_ids (np.ndarray): Instruments to include.
+        width (int): Number of columns of the returned roll.
+        widths (np.ndarray): Native width of every instrument's roll.
+        end_times (np.ndarray): End time of every instrument in seconds.
+        fs (float): Sampling frequency in Hz.
+        pedal_threshold (int or None): Sustain pedal threshold, or None to ignore CC64.
+
+    Returns:
+        np.ndarray: Summed piano roll. Shape: (128, width)
+    """
+    control_changes = note_table.control_changes
+    pitch_bends = note_table.pitch_bends
+
+    # Instruments whose roll needs per-instrument post-processing
+    needs_own_roll = np.zeros(note_table.num_instruments, dtype=bool)
+    if pedal_threshold is not None:
+        needs_own_roll[control_changes['instrument'][control_changes['number'] == CC_SUSTAIN_PEDAL]] = True
+    needs_own_roll[pitch_bends['instrument'][np.abs(pitch_bends['pitch']) >= 1]] = True
+
+    selected = np.zeros(note_table.num_instruments, dtype=bool)
+    selected[instrument_ids] = True
+
+    start_idx = (note_table.start * fs).astype(np.int64)
+    end_idx = (note_table.end * fs).astype(np.int64)
+
+    # All plain instruments are rendered together in a single pass
+    plain_notes = (selected & ~needs_own_roll)[note_table.instrument]
+    piano_roll = _rasterize_notes(note_table.pitch[plain_notes], note_table.velocity[plain_notes],
+                                  start_idx[plain_notes], end_idx[plain_notes], width)
+
+    for instrument_idx in np.flatnonzero(selected & needs_own_roll):
+        notes = note_table.instrument == instrument_idx
+        instrument_roll = _rasterize_notes(note_table.pitch[notes], note_table.velocity[notes],
+                                           start_idx[notes], end_idx[notes], int(widths[instrument_idx]))
+        if pedal_threshold is not None:
+            _apply_sustain_pedal(instrument_roll,
+                                 control_changes[control_changes['instrument'] == instrument_idx],
+                                 fs, pedal_threshold)
+        _apply_pitch_bends(instrument_roll, pitch_bends[pitch_bends['instrument'] == instrument_idx],
+                           fs, end_times[instrument_idx])
+        overlap = min(width, instrument_roll.shape[1])
+        piano_roll[:, :overlap] += instrument_roll[:, :overlap]
+
+    return piano_roll
+
+
+def _resample(piano_roll: np.ndarray, column_starts: np.ndarray, column_ends: np.ndarray) -> np.ndarray:
+    """Average piano roll columns over [start, end) intervals.
+
+    Args:
+        piano_roll (np.ndarray): Roll to resample. Shape: (128, width)
+        column_starts (np.ndarray): First column of each interval.
+        column_ends (np.ndarray): Column after the last column of each interval.
+
+    Returns:
+        np.ndarray: Resampled roll with zeros for intervals starting past the end.
+            Shape: (128, len(column_starts))
+    """
+    width = piano_roll.shape[1]
+    resampled = np.zeros((NUM_PITCHES, len(column_starts)))
+    in_range = column_starts < width
+    starts = column_starts[in_range]
+    ends = np.minimum(column_ends[in_range], width)
+
+    prefix_sums = np.zeros((NUM_PITCHES, width + 1))
+    np.cumsum(piano_roll, axis=1, out=prefix_sums[:, 1:])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resampled[:, in_range] = (prefix_sums[:, ends] - prefix_sums[:, starts]) / (ends - starts)
+    resampled[:, np.flatnonzero(in_range)[ends <= starts]] = np.nan
+    return resampled
+
+
+def _convert(piano_roll: np.ndarray, dtype: np.dtype, binarize: bool, out: Optional[np.ndarray]) -> np.ndarray:
+    """Convert a float64 roll to its final data type, in place where possible.
+
+    Binarized rolls hold 1 wherever a note sounds. Integer rolls hold rounded
+    velocities, saturated to the largest value of the type. If `out` is given, the
+    roll is truncated or zero-padded to its width and written into it.
+    """
+    if out is None:
+        if dtype == np.float64 and not binarize:
+            return piano_roll
+        out = np.empty(piano_roll.shape, dtype=dtype)
+
+    width = min(piano_roll.shape[1], out.shape[1])
+    source = piano_roll[:, :width]
+    target = out[:, :width]
+    if binarize or dtype == np.bool_:
+        np.greater(source, 0, out=target)
+    elif dtype.kind == 'u':
+        # The roll was allocated by get_piano_roll, so it can be rounded in place
+        np.minimum(np.rint(source, out=source), np.iinfo(dtype).max, out=target, casting='unsafe')
+    else:
+        np.copyto(target, source, casting='unsafe')
+    out[:, width:] = 0
+    return out
+
+
+def get_piano_roll(note_table: NoteTable, fs: float = 100, times=None, pedal_threshold=64, dtype=np.float64,
+                   binarize: bool = False, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Compute the piano roll of a NoteTable, flattened across instruments.
+
+    Produces the same output as `pretty_midi.PrettyMIDI.get_piano_roll` for the
+    MIDI data the table was built from.
+
+    Args:
+        note_table (NoteTable): The notes to render.
+        fs (float, optional): Sampling frequency of the columns in Hz.
+            Default: 100
+        times (array-like, optional): Times of the start of each column in seconds.
+            Each column is the mean of the roll up to the next time, and the last
+            column is left at zero. If None, columns are spaced 1/fs apart from 0.
+            Default: None
+        pedal_threshold (int, optional): CC64 values below this threshold are
+            treated as pedal-off; sustained notes are elongated while the pedal is
+            on. If None, CC64 messages are ignored.
+            Default: 64
+        dtype (np.dtype, optional): Data type of the roll, one of
+            PIANO_ROLL_DTYPES. Integer rolls hold rounded velocities, saturated to
+            the largest value of the type, and boolean rolls are binarized.
+            Default: np.float64
+        binarize (bool, optional): Whether to set every sounding note to 1
+            instead of its velocity.
+            Default: False
+        out (np.ndarray, optional): Array of shape (128, width) and type `dtype`
+            to write the roll into, e.g. a row of a preallocated batch. The roll
+            is truncated or zero-padded to its width.
+            Default: None
+
+    Returns:
+        np.ndarray: Piano roll of shape (128, time_steps) with summed velocities,
+            or `out`.
+
+    Raises:
+        ValueError: If the data type is not supported, or if `out` does not have
+            128 rows or is of another data type.
+
+    Note:
+        Drum instruments contribute no notes, but their duration still extends
+        the roll, as in pretty_midi.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.name not in PIANO_ROLL_DTYPES:
+        raise ValueError(f"Unsupported piano roll dtype {dtype}, expected one of {PIANO_ROLL_DTYPES}")
+    if out is not None and (out.ndim != 2 or out.shape[0] != NUM_PITCHES or out.dtype != dtype):
+        raise ValueError(f"Expected out to be a ({NUM_PITCHES}, width) array of {dtype}, "
+                         f"got a {out.shape} array of {out.dtype}")
+
+    has_notes = np.bincount(note_table.instrument, minlength=note_table.num_instruments) > 0
+    if not np.any(has_notes):
+        return _convert(np.zeros((NUM_PITCHES, 0)), dtype, binarize, out)
+
+    end_times = note_table.end_times()
+    if times is not None:
+        times = np.asarray(times)
+        end_times = np.maximum(end_times, times[-1])
+    widths = (fs * end_times).astype(np.int64)
+    pitched = np.flatnonzero(has_notes & ~note_table.is_drum)
+
+    if times is None:
+        piano_roll = _render_instruments(note_table, pitched, int(widths[has_notes].max()), widths,
+                                         end_times, fs, pedal_threshold)
+        return _convert(piano_roll, dtype, binarize, out)
+
+    column_starts = np.round(times[:-1] * fs).astype(np.int64)
+    column_ends = np.round(times[1:] * fs).astype(np.int64)
+    column_ends = np.where(column_ends == column_starts, column_starts + 1, column_ends)
+    last_column = int(column_ends.max()) if len(column_ends) else 0
+
+    # Columns are averaged over each instrument's own roll, so instruments whose
+    # roll ends before the last sampled column must be resampled separately
+    piano_roll = np.zeros((NUM_PITCHES, len(times)))
+    effective_widths = np.minimum(widths[pitched], last_column)
+    for width in np.unique(effective_widths):
+        group = pitched[effective_widths == width]
+        group_roll = _render_instruments(note_table, group, int(width), widths, end_times, fs, pedal_threshold)
+        piano_roll[:, :-1] += _resample(group_roll, column_starts, column_ends)
+    if dtype.kind == 'u':
+        # Columns over empty intervals are NaN, as in pretty_midi
+        np.nan_to_num(piano_roll, copy=False)
+    return _convert(piano_roll, dtype, binarize, out)
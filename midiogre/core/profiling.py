@@ -0,0 +1,247 @@
+"""Opt-in profiling of augmentation pipelines.
+
+A `Compose` created with `profile=True` times every call of each of its transforms
+and records, per transform:
+
+- call counts and the total, mean, minimum and maximum wall time,
+- a histogram of wall times over logarithmic buckets, with percentiles estimated
+  from it, so that rare slow calls are not hidden by the mean,
+- hits and skips: a call of a `BaseMidiTransform` is a hit if the transform
+  changed anything, and a skip if `p` or `p_instruments` left the input unchanged,
+- the number of notes touched, added and deleted.
+
+Transforms report what they changed with `report`, which does nothing unless the
+transform is being profiled. Stats are kept per process, and can be merged across
+processes with `Profiler.merge`.
+
+Example:
+    >>> from midiogre.augmentations import NoteAdd, TempoShift
+    >>> from midiogre.core import Compose, ToPRollNumpy
+    >>>
+    >>> transform = Compose([NoteAdd(...), TempoShift(max_shift=10), ToPRollNumpy()], profile=True)
+    >>> for midi_data in corpus:
+    ...     transform(midi_data)
+    >>> transform.stats()['0:NoteAdd']['p99']
+    >>> transform.export_stats('pipeline_stats.json')
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+# Upper edges of the time histogram buckets in seconds: 1 µs, 2 µs, 4 µs, ..., ~16.8 s,
+# followed by one bucket for longer calls
+BUCKET_EDGES = tuple(2.0 ** exponent * 1e-6 for exponent in range(25))
+
+_current = threading.local()
+
+
+def report(touched: int = 0, added: int = 0, deleted: int = 0):
+    """Report the changes made by the transform that is being applied.
+
+    Transforms call this when they change their input. The call counts as a hit,
+    and the notes are added to the counts of the transform. Outside of a profiled
+    `Compose`, this does nothing.
+
+    Args:
+        touched (int, optional): Number of notes that were modified.
+            Default: 0
+        added (int, optional): Number of notes that were added.
+            Default: 0
+        deleted (int, optional): Number of notes that were deleted.
+            Default: 0
+    """
+    counts = getattr(_current, 'counts', None)
+    if counts is not None:
+        counts[0] = True
+        counts[1] += touched
+        counts[2] += added
+        counts[3] += deleted
+
+
+class _TransformStats:
+    """Counters and time histogram of one transform."""
+
+    def __init__(self, tracks_hits: bool):
+        self.tracks_hits = tracks_hits
+        self.calls = 0
+        self.hits = 0
+        self.notes_touched = 0
+        self.notes_added = 0
+        self.notes_deleted = 0
+        self.total_time = 0.0
+        self.min_time = float('inf')
+        self.max_time = 0.0
+        self.histogram = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate a percentile of the call times from the histogram."""
+        if self.calls == 0:
+            return None
+        bucket = int(np.searchsorted(np.cumsum(self.histogram), q / 100 * self.calls))
+        upper_edge = BUCKET_EDGES[bucket] if bucket < len(BUCKET_EDGES) else self.max_time
+        return min(max(upper_edge, self.min_time), self.max_time)
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'hits': self.hits if self.tracks_hits else None,
+            'skips': self.calls - self.hits if self.tracks_hits else None,
+            'notes_touched': self.notes_touched,
+            'notes_added': self.notes_added,
+            'notes_deleted': self.notes_deleted,
+            'total_time': self.total_time,
+            'mean_time': self.total_time / self.calls if self.calls else None,
+            'min_time': self.min_time if self.calls else None,
+            'max_time': self.max_time if self.calls else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'histogram': self.histogram.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, stats: dict):
+        transform_stats = cls(tracks_hits=stats['hits'] is not None)
+        for name in ('calls', 'notes_touched', 'notes_added', 'notes_deleted', 'total_time'):
+            setattr(transform_stats, name, stats[name])
+        transform_stats.hits = stats['hits'] or 0
+        if stats['calls']:
+            transform_stats.min_time = stats['min_time']
+            transform_stats.max_time = stats['max_time']
+        transform_stats.histogram = np.array(stats['histogram'], dtype=np.int64)
+        return transform_stats
+
+
+class Profiler:
+    """Thread-safe collection of per-transform timings and counters.
+
+    Example:
+        >>> profiler = Profiler()
+        >>> with profiler.measure('0:PitchShift'):
+        ...     transform(midi_data)
+        >>> profiler.stats()['0:PitchShift']['calls']
+        1
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'stats': self.stats()}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.merge(state['stats'])
+
+    @contextmanager
+    def measure(self, name: str, tracks_hits: bool = True):
+        """Time a block and record it, with the changes reported in it, under a name.
+
+        Args:
+            name (str): Name of the transform.
+            tracks_hits (bool, optional): Whether the transform reports its changes
+                with `report`, i.e. whether hits and skips are counted.
+                Default: True
+        """
+        previous = getattr(_current, 'counts', None)
+        counts = _current.counts = [False, 0, 0, 0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.counts = previous
+            self.record(name, elapsed, *counts, tracks_hits=tracks_hits)
+
+    def record(self, name: str, elapsed: float, hit: bool = False, touched: int = 0, added: int = 0,
+               deleted: int = 0, tracks_hits: bool = True):
+        """Record one call of a transform.
+
+        Args:
+            name (str): Name of the transform.
+            elapsed (float): Wall time of the call in seconds.
+            hit (bool, optional): Whether the call changed its input.
+                Default: False
+            touched (int, optional): Number of notes modified by the call.
+                Default: 0
+            added (int, optional): Number of notes added by the call.
+                Default: 0
+            deleted (int, optional): Number of notes deleted by the call.
+                Default: 0
+            tracks_hits (bool, optional): Whether hits and skips are counted.
+                Default: True
+        """
+        bucket = int(np.searchsorted(BUCKET_EDGES, elapsed))
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _TransformStats(tracks_hits)
+            stats.calls += 1
+            stats.hits += bool(hit)
+            stats.notes_touched += touched
+            stats.notes_added += added
+            stats.notes_deleted += deleted
+            stats.total_time += elapsed
+            stats.min_time = min(stats.min_time, elapsed)
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.histogram[bucket] += 1
+
+    def merge(self, stats: dict):
+        """Add stats collected elsewhere, e.g. in a worker process.
+
+        Args:
+            stats (dict): The result of `stats()` of another profiler.
+        """
+        with self._lock:
+            for name, other in stats.items():
+                other = _TransformStats.from_dict(other)
+                mine = self._stats.get(name)
+                if mine is None:
+                    self._stats[name] = other
+                    continue
+                for counter in ('calls', 'hits', 'notes_touched', 'notes_added', 'notes_deleted', 'total_time'):
+                    setattr(mine, counter, getattr(mine, counter) + getattr(other, counter))
+                mine.min_time = min(mine.min_time, other.min_time)
+                mine.max_time = max(mine.max_time, other.max_time)
+                mine.histogram += other.histogram
+
+    def reset(self):
+        """Discard all recorded stats."""
+        with self._lock:
+            self._stats = {}
+
+    def stats(self) -> dict:
+        """Get the stats of every transform.
+
+        Returns:
+            dict: For every transform name, its 'calls', 'hits' and 'skips' (None if
+                the transform does not report its changes), 'notes_touched',
+                'notes_added' and 'notes_deleted', its 'total_time', 'mean_time',
+                'min_time' and 'max_time' and the 'p50', 'p90' and 'p99' estimated
+                from its 'histogram' of call times (in seconds, over the buckets of
+                `BUCKET_EDGES` plus one for longer calls).
+        """
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Export the stats as JSON.
+
+        Args:
+            path (str, optional): If given, the JSON is also written to this file.
+                Default: None
+
+        Returns:
+            str: The stats and the bucket edges of the histograms, as JSON.
+        """
+        data = json.dumps({'bucket_edges': list(BUCKET_EDGES), 'transforms': self.stats()}, indent=2)
+        if path is not None:
+            with open(path, 'w') as json_file:
+                json_file.write(data)
+        return data
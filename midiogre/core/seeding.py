@@ -0,0 +1,85 @@
+"""Seeding of transforms and of the global random generators.
+
+These helpers are used by the datasets of `midiogre.data` and by
+`midiogre.parallel.augment_corpus` to seed a pipeline once per worker process or
+once per sample. In worker processes, they also seed the global `np.random` and
+`random` generators, which custom transforms may draw from. In the calling process,
+the global generators and the generators of the transform are left as they were.
+
+Example:
+    >>> from midiogre.core.seeding import seed_sample
+    >>>
+    >>> with seed_sample(transform, seed=42, epoch=3, index=1017):
+    ...     augmented = transform(midi_data)  # the same in any process
+"""
+
+import random
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def seed_global_rngs(seed_sequence: np.random.SeedSequence):
+    """Seed the global `np.random` and `random` generators from a seed sequence.
+
+    Args:
+        seed_sequence (np.random.SeedSequence): Source of the seeds.
+    """
+    state = seed_sequence.generate_state(4)
+    np.random.seed(state)
+    random.seed(int.from_bytes(state.tobytes(), 'little'))
+
+
+def seed_transform(transform: Optional[Callable], seed_sequence: np.random.SeedSequence,
+                   global_rngs: bool = True):
+    """Seed a transform and the global generators from a seed sequence.
+
+    The transform is reseeded with its `reseed` method, if it has one, e.g. a
+    `Compose` pipeline. The global `np.random` and `random` generators are seeded
+    as well, for transforms that draw from them.
+
+    Args:
+        transform (callable, optional): The transform to seed.
+        seed_sequence (np.random.SeedSequence): Source of the seeds.
+        global_rngs (bool, optional): Whether to seed the global generators.
+            Default: True
+    """
+    if global_rngs:
+        seed_global_rngs(seed_sequence)
+    if hasattr(transform, 'reseed'):
+        transform.reseed(seed_sequence)
+
+
+@contextmanager
+def seed_sample(transform: Optional[Callable], seed: int, epoch: int, index: int, global_rngs: bool = False):
+    """Context in which a transform, and optionally the global generators, are seeded for one sample.
+
+    The transform draws from the counter-based generators of its `sample_rng`
+    context if it has one, so that its random values depend only on (seed, epoch,
+    index), and draws from its previous generators again when the context exits.
+    Transforms without it are reseeded like with `seed_transform`, which lasts.
+
+    Args:
+        transform (callable, optional): The transform to seed.
+        seed (int): Global seed, non-negative.
+        epoch (int): Epoch of the sample.
+        index (int): Index of the sample.
+        global_rngs (bool, optional): Whether to also seed the global generators
+            from the same three values, which is only done in worker processes,
+            as they are not restored.
+            Default: False
+
+    Example:
+        >>> with seed_sample(transform, 42, epoch=3, index=1017):
+        ...     augmented = transform(midi_data)
+    """
+    seed_sequence = np.random.SeedSequence([seed, epoch, index])
+    if global_rngs:
+        seed_global_rngs(seed_sequence)
+    if hasattr(transform, 'sample_rng'):
+        with transform.sample_rng(seed, epoch, index):
+            yield
+    else:
+        seed_transform(transform, seed_sequence, global_rngs=False)
+        yield
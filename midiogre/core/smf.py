@@ -0,0 +1,367 @@
+"""Native Standard MIDI File parser.
+
+Loading a file with pretty_midi first builds a `mido.MidiFile` with one Python
+message object per event, then walks all messages again to pair note events and
+collect meta events. `parse_smf` instead decodes the raw bytes of every track in a
+single pass, keeping only the events pretty_midi uses, and returns flat numpy
+arrays in the format of `midiogre.core.corpus.pretty_midi_to_arrays`.
+
+The notes, controls, tempo map and meta events are identical to those of
+`pretty_midi.PrettyMIDI(path)`: notes are paired, grouped into instruments by
+program, channel and track, and timed exactly as pretty_midi does.
+
+Example:
+    >>> from midiogre.core.smf import parse_smf
+    >>> from midiogre.core.corpus import arrays_to_note_table, arrays_to_pretty_midi
+    >>>
+    >>> arrays = parse_smf('song.mid')
+    >>> note_table = arrays_to_note_table(arrays)
+    >>> midi_data = arrays_to_pretty_midi(arrays)  # Same as pretty_midi.PrettyMIDI('song.mid')
+"""
+
+import os
+import struct
+import warnings
+from typing import BinaryIO, Union
+
+import numpy as np
+from pretty_midi.pretty_midi import MAX_TICK
+
+from midiogre.core.note_table import (CONTROL_CHANGE_DTYPE, INSTRUMENT_DTYPE, PITCH_BEND_DTYPE, PITCH_DTYPE,
+                                      TIME_DTYPE, VELOCITY_DTYPE)
+from midiogre.core.tempo_map import TempoMap
+
+DRUM_CHANNEL = 9
+
+# Number of data bytes following system common and real-time status bytes
+SYSTEM_MESSAGE_LENGTHS = {0xf1: 1, 0xf2: 2, 0xf3: 1, 0xf6: 0, 0xf8: 0, 0xfa: 0, 0xfb: 0, 0xfc: 0, 0xfe: 0}
+
+META_TEXT = 0x01
+META_TRACK_NAME = 0x03
+META_LYRICS = 0x05
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_KEY_SIGNATURE = 0x59
+
+
+def key_signature_to_key_number(sharps: int, minor: int) -> int:
+    """Convert the fields of a key signature event to a pretty_midi key number.
+
+    Args:
+        sharps (int): Number of sharps (positive) or flats (negative), in [-7, 7].
+        minor (int): 1 for minor keys, 0 for major keys.
+
+    Returns:
+        int: Key number, in [0, 12) for major and [12, 24) for minor keys.
+
+    Raises:
+        ValueError: If the event does not describe a valid key.
+    """
+    if not -7 <= sharps <= 7 or minor not in (0, 1):
+        raise ValueError(f"Could not decode key signature with {sharps} sharps and mode {minor}")
+    tonic = sharps * 7 % 12
+    return (tonic + 9) % 12 + 12 if minor else tonic
+
+
+class _Instrument:
+    """Events of one instrument while a file is parsed."""
+    __slots__ = ('program', 'is_drum', 'name', 'notes', 'control_changes', 'pitch_bends')
+
+    def __init__(self, program: int, is_drum: bool, name: str, control_changes: list, pitch_bends: list):
+        self.program = program
+        self.is_drum = is_drum
+        self.name = name
+        self.notes = []
+        self.control_changes = control_changes
+        self.pitch_bends = pitch_bends
+
+
+def _read_source(midi_file) -> bytes:
+    if isinstance(midi_file, (bytes, bytearray, memoryview)):
+        return bytes(midi_file)
+    if isinstance(midi_file, (str, os.PathLike)):
+        with open(midi_file, 'rb') as file:
+            return file.read()
+    return midi_file.read()
+
+
+def _read_track_chunks(data: bytes) -> tuple:
+    """Split a file into its resolution and the byte ranges of its tracks."""
+    if len(data) < 14 or data[:4] != b'MThd':
+        raise ValueError("MThd not found. Probably not a MIDI file")
+    header_size = struct.unpack('>L', data[4:8])[0]
+    _, num_tracks, resolution = struct.unpack('>hhh', data[8:14])
+
+    pos = 8 + header_size
+    tracks = []
+    while len(tracks) < num_tracks:
+        if pos + 8 > len(data):
+            raise ValueError(f"MIDI file ends after {len(tracks)} of {num_tracks} tracks")
+        chunk_type, chunk_size = struct.unpack('>4sL', data[pos:pos + 8])
+        pos += 8
+        if chunk_type == b'MTrk':
+            if pos + chunk_size > len(data):
+                raise ValueError(f"Track {len(tracks)} is truncated")
+            tracks.append((pos, pos + chunk_size))
+        # Chunks of unknown types are skipped, as the SMF specification requires
+        pos += chunk_size
+    return resolution, tracks
+
+
+def parse_smf(midi_file: Union[str, os.PathLike, bytes, BinaryIO], charset: str = 'latin1') -> dict:
+    """Parse a Standard MIDI File into note arrays and a meta event index.
+
+    Args:
+        midi_file (str, os.PathLike, bytes or file object): The MIDI file, its path
+            or its contents.
+        charset (str, optional): Encoding of track names, lyrics and text events.
+            Default: 'latin1' (as pretty_midi)
+
+    Returns:
+        dict[str, np.ndarray]: The arrays of `midiogre.core.corpus.pretty_midi_to_arrays`,
+            i.e. the notes, controls and pitch bends as in `NoteTable`, the
+            resolution, the tempo map as pretty_midi tick scales, and the time
+            signature, key signature, lyric and text events.
+
+    Raises:
+        ValueError: If the file is malformed or its largest tick suggests it is
+            corrupt.
+
+    Example:
+        >>> arrays = parse_smf('song.mid')
+        >>> arrays['pitch'][:4]
+        array([60, 64, 67, 72], dtype=int16)
+    """
+    data = _read_source(midi_file)
+    resolution, tracks = _read_track_chunks(data)
+
+    tempo_events = []  # (tick, microseconds per beat)
+    time_signatures = []  # (numerator, denominator, tick)
+    key_signatures = []  # (key number, tick)
+    lyrics = []  # (tick, text)
+    text_events = []
+    misplaced_meta = False
+    max_tick = 0
+
+    # Instruments are keyed by (program, channel, track). Control changes and pitch
+    # bends that precede the first note of a channel are kept by "straggler"
+    # instruments keyed by (channel, track), whose event lists are shared with the
+    # instruments created later, exactly as in pretty_midi
+    instruments = {}
+    stragglers = {}
+
+    def get_instrument(program, channel, track_idx, track_name, create):
+        instrument = instruments.get((program, channel, track_idx))
+        if instrument is not None:
+            return instrument
+        straggler = stragglers.get((channel, track_idx))
+        if not create and straggler is not None:
+            return straggler
+        if not create:
+            straggler = _Instrument(program, False, track_name, [], [])
+            stragglers[(channel, track_idx)] = straggler
+            return straggler
+        instrument = _Instrument(program, channel == DRUM_CHANNEL, track_name,
+                                 straggler.control_changes if straggler is not None else [],
+                                 straggler.pitch_bends if straggler is not None else [])
+        instruments[(program, channel, track_idx)] = instrument
+        return instrument
+
+    try:
+        for track_idx, (pos, end) in enumerate(tracks):
+            track_name = ''
+            programs = [0] * 16
+            open_notes = {}  # (channel, pitch) -> [(start tick, velocity), ...]
+            running_status = None
+            tick = 0
+
+            while pos < end:
+                byte = data[pos]
+                pos += 1
+                delta = byte & 0x7f
+                while byte & 0x80:
+                    byte = data[pos]
+                    pos += 1
+                    delta = (delta << 7) | (byte & 0x7f)
+                tick += delta
+
+                status = data[pos]
+                pos += 1
+                if status < 0x80:
+                    if running_status is None or running_status >= 0xf0:
+                        raise ValueError(f"Running status without a channel status in track {track_idx}")
+                    first_byte = status
+                    status = running_status
+                else:
+                    if status != 0xff:
+                        running_status = status
+                    first_byte = -1
+
+                kind = status & 0xf0
+                if kind < 0xf0:
+                    if first_byte < 0:
+                        first_byte = data[pos]
+                        pos += 1
+                    if kind == 0xc0 or kind == 0xd0:
+                        second_byte = 0
+                    else:
+                        second_byte = data[pos]
+                        pos += 1
+                    if (first_byte | second_byte) & 0x80:
+                        raise ValueError(f"Data byte must be in range 0..127 in track {track_idx}")
+
+                    channel = status & 0x0f
+                    if kind == 0x90 and second_byte > 0:
+                        key = (channel, first_byte)
+                        if key in open_notes:
+                            open_notes[key].append((tick, second_byte))
+                        else:
+                            open_notes[key] = [(tick, second_byte)]
+                    elif kind == 0x80 or kind == 0x90:
+                        started = open_notes.get((channel, first_byte))
+                        if started is None:
+                            continue
+                        # One note off closes every note started on an earlier tick
+                        to_close = [note for note in started if note[0] != tick]
+                        if to_close:
+                            instrument = get_instrument(programs[channel], channel, track_idx, track_name, True)
+                            for start_tick, velocity in to_close:
+                                instrument.notes.append((first_byte, velocity, start_tick, tick))
+                        if to_close and len(to_close) < len(started):
+                            open_notes[(channel, first_byte)] = [note for note in started if note[0] == tick]
+                        else:
+                            del open_notes[(channel, first_byte)]
+                    elif kind == 0xb0:
+                        get_instrument(programs[channel], channel, track_idx, track_name, False) \
+                            .control_changes.append((first_byte, second_byte, tick))
+                    elif kind == 0xe0:
+                        get_instrument(programs[channel], channel, track_idx, track_name, False) \
+                            .pitch_bends.append((((second_byte << 7) | first_byte) - 8192, tick))
+                    elif kind == 0xc0:
+                        programs[channel] = first_byte
+                    continue
+
+                if status == 0xff:
+                    meta_type = data[pos]
+                    pos += 1
+                else:
+                    meta_type = None
+                    if status not in (0xf0, 0xf7):
+                        if status not in SYSTEM_MESSAGE_LENGTHS:
+                            raise ValueError(f"Undefined status byte 0x{status:02x} in track {track_idx}")
+                        pos += SYSTEM_MESSAGE_LENGTHS[status]
+                        continue
+
+                # Meta and sysex events carry a variable-length payload
+                byte = data[pos]
+                pos += 1
+                length = byte & 0x7f
+                while byte & 0x80:
+                    byte = data[pos]
+                    pos += 1
+                    length = (length << 7) | (byte & 0x7f)
+                payload = data[pos:pos + length]
+                pos += length
+                if len(payload) < length:
+                    raise IndexError
+
+                if meta_type == META_TRACK_NAME:
+                    track_name = payload.decode(charset)
+                elif meta_type == META_LYRICS:
+                    lyrics.append((tick, payload.decode(charset)))
+                elif meta_type == META_TEXT:
+                    text_events.append((tick, payload.decode(charset)))
+                elif meta_type in (META_SET_TEMPO, META_TIME_SIGNATURE, META_KEY_SIGNATURE):
+                    if track_idx > 0:
+                        misplaced_meta = True
+                        continue
+                    if meta_type == META_SET_TEMPO:
+                        tempo_events.append((tick, int.from_bytes(payload[:3], 'big')))
+                    elif meta_type == META_TIME_SIGNATURE:
+                        time_signatures.append((payload[0], 2 ** payload[1], tick))
+                    else:
+                        sharps = payload[0] - 256 if payload[0] > 127 else payload[0]
+                        key_signatures.append((key_signature_to_key_number(sharps, payload[1]), tick))
+
+            if pos != end:
+                raise ValueError(f"Last event of track {track_idx} overruns the track")
+            max_tick = max(max_tick, tick)
+    except IndexError:
+        raise ValueError("MIDI file is truncated")
+
+    max_tick += 1
+    if max_tick > MAX_TICK:
+        raise ValueError(f"MIDI file has a largest tick of {max_tick}, it is likely corrupt")
+
+    if misplaced_meta:
+        warnings.warn(
+            "Tempo, Key or Time signature change events found on "
+            "non-zero tracks.  This is not a valid type 0 or type 1 "
+            "MIDI file.  Tempo, Key or Time Signature may be wrong.",
+            RuntimeWarning)
+
+    tempo_map = TempoMap.from_tempo_events([tick for tick, _ in tempo_events],
+                                           [tempo for _, tempo in tempo_events], resolution)
+    return _build_arrays(list(instruments.values()), tempo_map, max_tick, time_signatures,
+                         key_signatures, lyrics, text_events)
+
+
+def _build_arrays(instruments: list, tempo_map: TempoMap, max_tick: int, time_signatures: list,
+                  key_signatures: list, lyrics: list, text_events: list) -> dict:
+    """Convert the parsed events to arrays, converting all ticks to seconds at once."""
+    notes = [note for instrument in instruments for note in instrument.notes]
+    control_changes = [(instrument_idx,) + event for instrument_idx, instrument in enumerate(instruments)
+                       for event in instrument.control_changes]
+    pitch_bends = [(instrument_idx,) + event for instrument_idx, instrument in enumerate(instruments)
+                   for event in instrument.pitch_bends]
+
+    note_array = np.array(notes, dtype=np.int64).reshape(-1, 4)
+    control_change_array = np.zeros(len(control_changes), dtype=CONTROL_CHANGE_DTYPE)
+    pitch_bend_array = np.zeros(len(pitch_bends), dtype=PITCH_BEND_DTYPE)
+    if control_changes:
+        events = np.array(control_changes, dtype=np.int64)
+        for column, name in enumerate(('instrument', 'number', 'value')):
+            control_change_array[name] = events[:, column]
+        control_change_array['time'] = tempo_map.ticks_to_seconds(events[:, 3])
+    if pitch_bends:
+        events = np.array(pitch_bends, dtype=np.int64)
+        pitch_bend_array['instrument'] = events[:, 0]
+        pitch_bend_array['pitch'] = events[:, 1]
+        pitch_bend_array['time'] = tempo_map.ticks_to_seconds(events[:, 2])
+
+    # Lyrics and text events of all tracks are merged by time, stably by track
+    lyrics.sort(key=lambda event: event[0])
+    text_events.sort(key=lambda event: event[0])
+
+    def event_times(ticks):
+        return tempo_map.ticks_to_seconds(np.array(ticks, dtype=np.int64))
+
+    return {
+        'pitch': note_array[:, 0].astype(PITCH_DTYPE),
+        'velocity': note_array[:, 1].astype(VELOCITY_DTYPE),
+        'start': tempo_map.ticks_to_seconds(note_array[:, 2]).astype(TIME_DTYPE),
+        'end': tempo_map.ticks_to_seconds(note_array[:, 3]).astype(TIME_DTYPE),
+        'instrument': np.repeat(np.arange(len(instruments), dtype=INSTRUMENT_DTYPE),
+                                [len(instrument.notes) for instrument in instruments]),
+        'programs': np.array([instrument.program for instrument in instruments], dtype=np.int16),
+        'is_drum': np.array([instrument.is_drum for instrument in instruments], dtype=bool),
+        'names': np.array([instrument.name for instrument in instruments], dtype=str),
+        'control_changes': control_change_array,
+        'pitch_bends': pitch_bend_array,
+        'resolution': np.array(tempo_map.resolution),
+        'tick_scales': np.array(tempo_map.to_tick_scales(), dtype=np.float64).reshape(-1, 2),
+        'max_tick': np.array(max(max_tick, int(tempo_map.ticks[-1]))),
+        'time_signatures': np.column_stack([
+            np.array([(numerator, denominator) for numerator, denominator, _ in time_signatures],
+                     dtype=np.float64).reshape(-1, 2),
+            event_times([tick for _, _, tick in time_signatures]),
+        ]),
+        'key_signatures': np.column_stack([
+            np.array([key_number for key_number, _ in key_signatures], dtype=np.float64),
+            event_times([tick for _, tick in key_signatures]),
+        ]),
+        'lyrics_text': np.array([text for _, text in lyrics], dtype=str),
+        'lyrics_time': event_times([tick for tick, _ in lyrics]),
+        'text_events_text': np.array([text for _, text in text_events], dtype=str),
+        'text_events_time': event_times([tick for tick, _ in text_events]),
+    }
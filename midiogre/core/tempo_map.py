@@ -0,0 +1,194 @@
+"""Piecewise-linear tempo maps.
+
+MIDI events are timed in ticks, and the duration of a tick changes with every
+tempo event. pretty_midi converts ticks to seconds with a dense table holding the
+time of every tick up to the last event of a file, which grows with the length and
+resolution of the file rather than with its number of tempo changes. A `TempoMap`
+stores only one segment per tempo, i.e. its first tick, its start time and its
+seconds per tick, and converts arrays of ticks or seconds with one `searchsorted`
+and one affine map per element, in O(tempo changes) memory.
+
+Example:
+    >>> from midiogre.core import TempoMap
+    >>>
+    >>> # 120 BPM, then 60 BPM from beat 4 on
+    >>> tempo_map = TempoMap.from_tempo_events([0, 1920], [500000, 1000000], resolution=480)
+    >>> tempo_map.ticks_to_seconds([480, 1920, 2400])
+    array([0.5, 2. , 3. ])
+    >>> tempo_map.seconds_to_ticks([3.0])
+    array([2400.])
+"""
+
+from typing import Sequence
+
+import mido
+import numpy as np
+import pretty_midi
+
+DEFAULT_TEMPO = 500000  # microseconds per quarter note, i.e. 120 bpm
+
+
+def tempo_to_seconds_per_tick(tempo, resolution: int):
+    """Convert tempi in microseconds per beat to seconds per tick, as pretty_midi does.
+
+    Args:
+        tempo (float or np.ndarray): Tempi in microseconds per beat.
+        resolution (int): Ticks per beat.
+
+    Returns:
+        float or np.ndarray: Duration of a tick in seconds.
+    """
+    return 60.0 / ((6e7 / np.asarray(tempo, dtype=np.float64)) * resolution)
+
+
+class TempoMap:
+    """Segment-wise conversion between ticks and seconds.
+
+    Each segment starts at a tick and lasts until the next segment starts, with a
+    constant number of seconds per tick. Times are accumulated over segments in
+    the same order as pretty_midi, so converted times are bitwise identical to
+    pretty_midi's tick-to-time table.
+
+    Args:
+        ticks (Sequence[int]): First tick of every segment, sorted, starting at 0.
+        seconds_per_tick (Sequence[float]): Duration of a tick in every segment.
+        resolution (int): Ticks per beat.
+
+    Raises:
+        ValueError: If the arrays are empty or differ in length, if the first
+            segment does not start at tick 0, if ticks are not sorted or if a
+            duration is not positive.
+
+    Example:
+        >>> tempo_map = TempoMap.from_pretty_midi(midi_data)
+        >>> note_ticks = tempo_map.seconds_to_ticks(note_table.start)
+    """
+
+    def __init__(self, ticks: Sequence[int], seconds_per_tick: Sequence[float], resolution: int):
+        self.ticks = np.asarray(ticks, dtype=np.int64)
+        self.seconds_per_tick = np.asarray(seconds_per_tick, dtype=np.float64)
+        self.resolution = resolution
+
+        if len(self.ticks) == 0 or len(self.ticks) != len(self.seconds_per_tick):
+            raise ValueError(
+                f"A TempoMap needs one duration per segment and at least one segment, got "
+                f"{len(self.ticks)} ticks and {len(self.seconds_per_tick)} durations"
+            )
+        if self.ticks[0] != 0 or np.any(np.diff(self.ticks) < 0):
+            raise ValueError(f"Segment ticks must be sorted and start at 0, got {self.ticks[:5].tolist()}...")
+        if np.any(self.seconds_per_tick <= 0):
+            raise ValueError("Seconds per tick must be positive")
+
+        # Accumulated sequentially, in the same order as pretty_midi
+        self.start_times = np.concatenate([[0.0], np.cumsum(np.diff(self.ticks) * self.seconds_per_tick[:-1])])
+
+    @classmethod
+    def from_tempo_events(cls, ticks: Sequence[int], tempi: Sequence[float], resolution: int):
+        """Build a tempo map from `set_tempo` events, following pretty_midi's rules.
+
+        The map starts at 120 BPM. An event at tick 0 replaces the initial tempo,
+        and later events that repeat the current tempo are ignored.
+
+        Args:
+            ticks (Sequence[int]): Absolute ticks of the events, sorted.
+            tempi (Sequence[float]): Tempi of the events in microseconds per beat.
+            resolution (int): Ticks per beat.
+
+        Returns:
+            TempoMap: The tempo map.
+        """
+        segment_ticks = [0]
+        scales = [float(tempo_to_seconds_per_tick(DEFAULT_TEMPO, resolution))]
+        for tick, scale in zip(np.asarray(ticks).tolist(), tempo_to_seconds_per_tick(tempi, resolution).tolist()):
+            if tick == 0:
+                scales = [scale]
+            elif scale != scales[-1]:
+                segment_ticks.append(tick)
+                scales.append(scale)
+        return cls(segment_ticks, scales, resolution)
+
+    @classmethod
+    def from_tick_scales(cls, tick_scales: Sequence, resolution: int):
+        """Build a tempo map from pretty_midi's (tick, seconds per tick) pairs.
+
+        Args:
+            tick_scales (Sequence): The `_tick_scales` of a PrettyMIDI object.
+            resolution (int): Ticks per beat.
+
+        Returns:
+            TempoMap: The tempo map.
+        """
+        return cls([tick for tick, _ in tick_scales], [scale for _, scale in tick_scales], resolution)
+
+    @classmethod
+    def from_pretty_midi(cls, midi_data: pretty_midi.PrettyMIDI):
+        """Get the tempo map of a PrettyMIDI object.
+
+        Args:
+            midi_data (pretty_midi.PrettyMIDI): The MIDI data.
+
+        Returns:
+            TempoMap: The tempo map.
+        """
+        return cls.from_tick_scales(midi_data._tick_scales, midi_data.resolution)
+
+    @classmethod
+    def from_mido(cls, midi_data: mido.MidiFile):
+        """Build a tempo map from the `set_tempo` events of the first track of a Mido file.
+
+        Args:
+            midi_data (mido.MidiFile): The MIDI data.
+
+        Returns:
+            TempoMap: The tempo map.
+        """
+        ticks, tempi = [], []
+        tick = 0
+        for event in midi_data.tracks[0] if midi_data.tracks else []:
+            tick += event.time
+            if event.type == 'set_tempo':
+                ticks.append(tick)
+                tempi.append(event.tempo)
+        return cls.from_tempo_events(ticks, tempi, midi_data.ticks_per_beat)
+
+    def __len__(self):
+        """Return the number of segments."""
+        return len(self.ticks)
+
+    def __repr__(self):
+        return f"TempoMap(segments={len(self)}, resolution={self.resolution})"
+
+    @property
+    def tempi(self) -> np.ndarray:
+        """Tempo of every segment in beats per minute."""
+        return 60.0 / (self.seconds_per_tick * self.resolution)
+
+    def to_tick_scales(self) -> list:
+        """Get the map as pretty_midi's (tick, seconds per tick) pairs."""
+        return list(zip(self.ticks.tolist(), self.seconds_per_tick.tolist()))
+
+    def ticks_to_seconds(self, ticks) -> np.ndarray:
+        """Convert ticks to seconds.
+
+        Args:
+            ticks (array-like): Ticks, possibly fractional.
+
+        Returns:
+            np.ndarray: Times in seconds.
+        """
+        ticks = np.asarray(ticks)
+        segments = np.maximum(np.searchsorted(self.ticks, ticks, side='right') - 1, 0)
+        return self.start_times[segments] + self.seconds_per_tick[segments] * (ticks - self.ticks[segments])
+
+    def seconds_to_ticks(self, seconds) -> np.ndarray:
+        """Convert seconds to fractional ticks.
+
+        Args:
+            seconds (array-like): Times in seconds.
+
+        Returns:
+            np.ndarray: Ticks, not rounded.
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        segments = np.maximum(np.searchsorted(self.start_times, seconds, side='right') - 1, 0)
+        return self.ticks[segments] + (seconds - self.start_times[segments]) / self.seconds_per_tick[segments]
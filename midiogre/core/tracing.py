@@ -0,0 +1,212 @@
+"""Timeline tracing of augmentation pipelines in the Chrome trace-event format.
+
+With tracing enabled, midiogre records one span per file load, per transform of a
+`Compose`, per conversion and per piano roll rasterization, tagged with the
+process ID, the thread and the path of the file being processed. Every process
+appends its spans to its own file in a trace directory, and `merge_traces`
+combines them into a single JSON trace that can be opened in chrome://tracing or
+https://ui.perfetto.dev, e.g. to find stalls and stragglers among DataLoader
+workers.
+
+The trace directory is passed to worker processes through the environment
+variable `MIDIOGRE_TRACE_DIR`, so tracing must be enabled before the workers are
+started. Span times come from `time.perf_counter`, which is shared by all
+processes of a machine.
+
+Example:
+    >>> from midiogre.core import tracing
+    >>>
+    >>> tracing.enable_tracing('trace/')
+    >>> loader = DataLoader(MidiDataset('midi_dir/', transform, ToPRollTensor()), num_workers=16)
+    >>> for piano_roll in loader:
+    ...     ...
+    >>> tracing.merge_traces('trace/', 'pipeline_trace.json')
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+TRACE_DIR_ENV = 'MIDIOGRE_TRACE_DIR'
+FLUSH_THRESHOLD = 10000  # buffered events
+
+_trace_dir = os.environ.get(TRACE_DIR_ENV) or None
+_process_name = None
+_written_name = None
+_events = []
+_lock = threading.Lock()  # guards _events
+_write_lock = threading.Lock()  # serializes writes to the trace file
+_current = threading.local()
+
+
+def _clear_after_fork():
+    # Events buffered by the parent are written by the parent
+    global _events, _lock, _write_lock, _process_name, _written_name
+    _events = []
+    _lock = threading.Lock()
+    _write_lock = threading.Lock()
+    _process_name = _written_name = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_clear_after_fork)
+
+
+def enable_tracing(trace_dir: Union[str, os.PathLike]):
+    """Start recording spans in this process and in worker processes started later.
+
+    Args:
+        trace_dir (str or os.PathLike): Directory that every process writes its
+            spans to. Created if it does not exist.
+    """
+    global _trace_dir
+    Path(trace_dir).mkdir(parents=True, exist_ok=True)
+    _trace_dir = os.fspath(trace_dir)
+    os.environ[TRACE_DIR_ENV] = _trace_dir
+
+
+def disable_tracing():
+    """Write the spans recorded so far and stop recording."""
+    global _trace_dir
+    flush()
+    _trace_dir = None
+    os.environ.pop(TRACE_DIR_ENV, None)
+
+
+def is_tracing() -> bool:
+    """Check whether spans are recorded."""
+    return _trace_dir is not None
+
+
+def set_process_name(name: str):
+    """Set the name under which the spans of this process are shown, e.g. 'worker 3'."""
+    global _process_name
+    _process_name = name
+
+
+@contextmanager
+def span(name: str, category: str = 'transform', **args):
+    """Record the wall time of a block as a span, if tracing.
+
+    Args:
+        name (str): Name of the span, e.g. the name of a transform.
+        category (str, optional): Category of the span, e.g. 'load', 'transform',
+            'conversion' or 'rasterize'.
+            Default: 'transform'
+        **args: Additional values shown with the span. The path of the file being
+            processed (see `trace_file`) is added automatically.
+
+    Example:
+        >>> with span('PitchShift'):
+        ...     midi_data = transform(midi_data)
+    """
+    if _trace_dir is None:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        path = getattr(_current, 'path', None)
+        if path is not None:
+            args.setdefault('path', path)
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start / 1000, 'dur': (end - start) / 1000,
+                 'pid': os.getpid(), 'tid': threading.get_native_id(), 'args': args}
+        with _lock:
+            _events.append(event)
+            full = len(_events) >= FLUSH_THRESHOLD
+        if full:
+            flush()
+
+
+@contextmanager
+def trace_file(path):
+    """Tag all spans recorded in a block with the path of the file being processed.
+
+    The spans are written to the trace directory when the outermost block ends.
+
+    Args:
+        path: The file, e.g. a path or the index of a corpus item.
+    """
+    if _trace_dir is None:
+        yield
+        return
+
+    previous = getattr(_current, 'path', None)
+    _current.path = os.fspath(path) if isinstance(path, (str, os.PathLike)) else str(path)
+    try:
+        yield
+    finally:
+        _current.path = previous
+        if previous is None:
+            flush()
+
+
+def flush():
+    """Append the buffered spans of this process to its file in the trace directory."""
+    global _events, _written_name
+    if _trace_dir is None:
+        return
+    with _lock:
+        events, _events = _events, []
+    if not events:
+        return
+
+    # Spans recorded while the file is written go to the new buffer
+    with _write_lock:
+        name = _process_name or f'midiogre {os.getpid()}'
+        with open(Path(_trace_dir) / f'trace-{os.getpid()}.jsonl', 'a') as events_file:
+            if name != _written_name:
+                events_file.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0,
+                                              'args': {'name': name}}) + '\n')
+                _written_name = name
+            events_file.writelines(json.dumps(event) + '\n' for event in events)
+
+
+atexit.register(flush)
+
+
+def merge_traces(trace_dir: Union[str, os.PathLike], output_path: Optional[Union[str, os.PathLike]] = None) -> dict:
+    """Merge the spans written by all processes into one Chrome trace.
+
+    Args:
+        trace_dir (str or os.PathLike): The trace directory.
+        output_path (str or os.PathLike, optional): If given, the trace is written
+            to this JSON file.
+            Default: None
+
+    Returns:
+        dict: The trace, with the name of every process followed by all spans
+            sorted by start time under 'traceEvents'.
+    """
+    if _trace_dir is not None and Path(trace_dir).exists() and os.path.samefile(_trace_dir, trace_dir):
+        flush()
+
+    process_names = {}
+    events = []
+    for trace_path in sorted(Path(trace_dir).glob('trace-*.jsonl')):
+        with open(trace_path) as events_file:
+            for line in events_file:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event['ph'] == 'M':
+                    # The last name set in a process wins
+                    process_names[event['pid']] = event
+                else:
+                    events.append(event)
+    events.sort(key=lambda event: event['ts'])
+    events = list(process_names.values()) + events
+
+    trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+    if output_path is not None:
+        with open(output_path, 'w') as output_file:
+            json.dump(trace, output_file)
+    return trace
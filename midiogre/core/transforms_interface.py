@@ -3,6 +3,27 @@
 This module provides the base class for implementing MIDI data augmentation transforms.
 All transforms in MIDIOgre inherit from this class and must implement the `apply` method.
 
+Note-level transforms can instead implement `apply_table`, which operates on a
+columnar `NoteTable`. The default `apply` then handles both NoteTable and PrettyMIDI
+inputs, converting the latter to a NoteTable and writing the result back.
+
+Transforms that implement `apply_to_instruments` additionally support `apply_batch`:
+a whole list of MIDI objects is merged into a single NoteTable, so random values are
+drawn and applied once for the entire batch instead of once per file.
+
+Every transform draws its random values from its own `numpy.random.Generator`,
+`self.rng`, which can be seeded with the `seed` or `rng` arguments or replaced with
+`reseed`. Unseeded generators draw fresh entropy again in forked and unpickled copies
+of a transform, so that worker processes never repeat each other's augmentations.
+Random state is thread-local: threads sharing a transform draw from separate child
+streams of its generator.
+
+With `reseed_sample`, all random values of one sample instead come from a
+counter-based Philox generator keyed on a global seed, whose counter is set to the
+epoch and the index of the sample. Any process can then reproduce the augmentation
+of any sample without a shared random stream, e.g. to resume training, re-shard a
+corpus over a different number of workers or debug a single sample.
+
 Example:
     >>> class MyTransform(BaseMidiTransform):
     ...     def __init__(self, p_instruments=1.0, p=0.5):
@@ -11,10 +32,96 @@ Example:
     ...     def apply(self, midi_data):
     ...         # Implement your transform logic here
     ...         return midi_data
+    >>>
+    >>> class MyNoteTransform(BaseMidiTransform):
+    ...     def apply_to_instruments(self, note_table, instrument_ids):
+    ...         notes = np.isin(note_table.instrument, instrument_ids)
+    ...         note_table.velocity[notes] = 100
+    ...         return note_table
+    >>>
+    >>> batch = MyNoteTransform(p_instruments=1.0, p=1.0).apply_batch([midi_a, midi_b])
 """
 
 import logging
-import random
+import os
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from midiogre.core.note_table import NoteTable
+from midiogre.core.profiling import Profiler
+from midiogre.core.tracing import span
+
+# Transforms whose generator was seeded from OS entropy, reseeded in forked children
+_unseeded_transforms = weakref.WeakSet()
+_unseeded_lock = threading.Lock()
+
+
+def _reseed_unseeded_transforms():
+    global _unseeded_lock
+    # Locks held by other threads of the parent would never be released in the child
+    _unseeded_lock = threading.Lock()
+    for transform in list(_unseeded_transforms):
+        transform._rng_lock = threading.Lock()
+        transform.reseed()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_unseeded_transforms)
+
+
+@lru_cache(maxsize=1024)
+def _philox_key(seed: int, stream: tuple) -> np.ndarray:
+    return np.random.SeedSequence([seed, *stream]).generate_state(2, np.uint64)
+
+
+def counter_rng(seed: int, epoch: int, index: int, stream: Sequence[int] = (),
+                rng: Optional[np.random.Generator] = None) -> np.random.Generator:
+    """Get the counter-based generator of one sample.
+
+    The Philox key is derived from `seed` and `stream`, and the two high words of
+    its 256-bit counter are set to `epoch` and `index`, so every sample of every
+    epoch draws from its own block of 2**128 values of the same stream.
+
+    Args:
+        seed (int): Global seed, non-negative.
+        epoch (int): Epoch of the sample, non-negative.
+        index (int): Index of the sample, non-negative.
+        stream (Sequence[int], optional): Identifies the consumer of the random
+            values, e.g. the position of a transform in a pipeline.
+            Default: ()
+        rng (np.random.Generator, optional): A generator returned by an earlier
+            call, which is reset and returned instead of creating a new one.
+            Default: None
+
+    Returns:
+        np.random.Generator: The generator, positioned at the start of the sample.
+
+    Raises:
+        ValueError: If seed, epoch or index is negative.
+
+    Example:
+        >>> counter_rng(42, epoch=3, index=1017).integers(0, 12)
+    """
+    if seed < 0 or epoch < 0 or index < 0:
+        raise ValueError(f"Seed, epoch and index must be non-negative, got {seed}, {epoch} and {index}")
+
+    key = _philox_key(seed, tuple(stream))
+    if rng is None or not isinstance(rng.bit_generator, np.random.Philox):
+        rng = np.random.Generator(np.random.Philox(key=key))
+    rng.bit_generator.state = {
+        'bit_generator': 'Philox',
+        'state': {'counter': np.array([0, 0, epoch, index], dtype=np.uint64), 'key': key},
+        'buffer': np.zeros(4, dtype=np.uint64),
+        'buffer_pos': 4,
+        'has_uint32': 0,
+        'uinteger': 0,
+    }
+    return rng
 
 
 class BaseMidiTransform:
@@ -25,7 +132,8 @@ class BaseMidiTransform:
     - Instrument selection for multi-instrument MIDI files
     - Basic validation of transform parameters
     
-    All transforms should inherit from this class and implement the `apply` method.
+    All transforms should inherit from this class and implement either the `apply`
+    method or, for transforms that only edit notes, the `apply_table` method.
     
     Args:
         p_instruments (float): Probability of applying the transform to each instrument
@@ -36,11 +144,22 @@ class BaseMidiTransform:
             Default: 0.5
         eps (float, optional): Small epsilon value for numerical stability.
             Default: 1e-12
+        seed (int or np.random.SeedSequence, optional): Seed of the random generator
+            of the transform.
+            Default: None (seed from OS entropy)
+        rng (np.random.Generator, optional): Random generator to draw from, e.g.
+            one shared by several transforms. Takes precedence over seed.
+            Default: None
             
     Raises:
         ValueError: If p or p_instruments are not in range [0, 1]
     """
-    def __init__(self, p_instruments: float, p: float, eps: float = 1e-12):
+    # Category of the spans of the transform in traces (see `midiogre.core.tracing`)
+    trace_category = 'transform'
+
+    def __init__(self, p_instruments: float, p: float, eps: float = 1e-12,
+                 seed: Optional[Union[int, np.random.SeedSequence]] = None,
+                 rng: Optional[np.random.Generator] = None):
         if not 0 <= p <= 1:
             raise ValueError(
                 "Probability of applying a MIDI Transform must be >=0 and <=1."
@@ -54,6 +173,136 @@ class BaseMidiTransform:
         self.p = p
         self.p_instruments = p_instruments
         self.eps = eps
+        self.reseed(rng if rng is not None else seed)
+
+    @property
+    def rng(self) -> np.random.Generator:
+        """Random generator of the calling thread.
+
+        The thread that seeds the transform draws from the seeded generator itself.
+        Every other thread gets its own child stream of it, so transforms can be
+        shared by threads (see `Compose.apply_threaded`) without a shared random
+        state, also on free-threaded Python builds.
+        """
+        state = getattr(self._thread_state, 'rng', None)
+        if state is None or state[0] != self._generation:
+            with self._rng_lock:
+                # Children are spawned from a seed sequence, never drawn from the
+                # generator that the seeding thread draws from without the lock
+                child = np.random.default_rng(self._child_seeds.spawn(1)[0])
+                state = self._thread_state.rng = (self._generation, child)
+        return state[1]
+
+    @rng.setter
+    def rng(self, rng: np.random.Generator):
+        self._thread_state.rng = (self._generation, rng)
+
+    def reseed(self, seed: Optional[Union[int, np.random.SeedSequence, np.random.Generator]] = None):
+        """Replace the random generator of the transform, in all threads.
+
+        Args:
+            seed (int, np.random.SeedSequence or np.random.Generator, optional): Seed
+                of the new generator, or a generator to use as is.
+                Default: None (seed from OS entropy, and again in every forked or
+                unpickled copy of the transform)
+
+        Example:
+            >>> transform = PitchShift(max_shift=2)
+            >>> transform.reseed(42)
+        """
+        if isinstance(seed, np.random.Generator):
+            # Children are spawned from the seed sequence of the generator, like with
+            # `Generator.spawn`, so that the values it draws do not depend on them
+            rng, child_seeds = seed, getattr(seed.bit_generator, '_seed_seq', None)
+            if not isinstance(child_seeds, np.random.SeedSequence):
+                child_seeds = np.random.SeedSequence(seed.integers(0, 2 ** 63, size=4))
+        else:
+            child_seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+            rng = np.random.default_rng(child_seeds)
+
+        if not hasattr(self, '_rng_lock'):
+            self._thread_state = threading.local()
+            self._rng_lock = threading.Lock()
+            self._generation = 0
+        with self._rng_lock:
+            self._root_rng, self._child_seeds = rng, child_seeds
+            self._generation += 1
+            self._thread_state.rng = (self._generation, rng)
+            self._seeded = seed is not None
+            with _unseeded_lock:
+                if self._seeded:
+                    _unseeded_transforms.discard(self)
+                else:
+                    _unseeded_transforms.add(self)
+
+    def reseed_sample(self, seed: int, epoch: int, index: int, stream: Sequence[int] = ()):
+        """Draw the random values of one sample from a counter-based generator.
+
+        The calling thread then draws from `counter_rng(seed, epoch, index, stream)`,
+        so the augmentation of a sample depends only on these values, not on earlier
+        samples or on the process or thread that augments it. Other threads are not
+        affected.
+
+        Args:
+            seed (int): Global seed, non-negative.
+            epoch (int): Epoch of the sample, non-negative.
+            index (int): Index of the sample, non-negative.
+            stream (Sequence[int], optional): Stream of this transform, set by
+                `Compose.reseed_sample` so that transforms do not share values.
+                Default: ()
+
+        Example:
+            >>> transform = PitchShift(max_shift=2)
+            >>> transform.reseed_sample(42, epoch=3, index=1017)
+            >>> augmented = transform(midi_data)  # the same wherever it runs
+        """
+        # The Philox generator of the thread is reused, which is cheaper than creating one
+        rng = counter_rng(seed, epoch, index, stream, rng=getattr(self._thread_state, 'counter_rng', None))
+        self._thread_state.counter_rng = self.rng = rng
+
+    @contextmanager
+    def sample_rng(self, seed: int, epoch: int, index: int, stream: Sequence[int] = ()):
+        """Context in which the calling thread draws the random values of one sample.
+
+        Like `reseed_sample`, but the calling thread draws from its previous
+        generator again when the context exits.
+
+        Args:
+            seed (int): Global seed, non-negative.
+            epoch (int): Epoch of the sample, non-negative.
+            index (int): Index of the sample, non-negative.
+            stream (Sequence[int], optional): Stream of this transform (see
+                `reseed_sample`).
+                Default: ()
+
+        Example:
+            >>> with transform.sample_rng(42, epoch=3, index=1017):
+            ...     augmented = transform(midi_data)
+        """
+        previous = getattr(self._thread_state, 'rng', None)
+        self.reseed_sample(seed, epoch, index, stream)
+        try:
+            yield self
+        finally:
+            if previous is None:
+                del self._thread_state.rng
+            else:
+                self._thread_state.rng = previous
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_thread_state'], state['_rng_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._thread_state = threading.local()
+        self._rng_lock = threading.Lock()
+        if self._seeded:
+            self._thread_state.rng = (self._generation, self._root_rng)
+        else:
+            # Copies sent to worker processes would otherwise all share one random stream
+            self.reseed()
 
     def _get_modified_instruments_list(self, midi_data):
         """Get list of instruments to be modified based on p_instruments.
@@ -84,25 +333,203 @@ class BaseMidiTransform:
                 )
                 return midi_data
 
-            modified_instruments = random.sample(modified_instruments, k=num_modified_instruments)
+            modified_instruments = [modified_instruments[idx] for idx in self.rng.choice(
+                len(modified_instruments), size=num_modified_instruments, replace=False)]
 
         return modified_instruments
 
+    def _sample_instrument_ids(self, instrument_ids: list) -> list:
+        """Randomly select instruments to modify based on p_instruments.
+
+        Args:
+            instrument_ids (list[int]): Non-drum instruments of a single MIDI file.
+
+        Returns:
+            list[int]: The selected subset of `instrument_ids`.
+        """
+        if len(instrument_ids) == 0:
+            logging.warning("MIDI file only contains drum tracks.")
+        elif self.p_instruments < 1.0 and len(instrument_ids) > 1:
+            num_modified_instruments = int(self.p_instruments * len(instrument_ids))
+            if num_modified_instruments == 0:
+                logging.debug(
+                    "No instruments left to randomly modify in MIDI file. Skipping.",
+                )
+                return []
+
+            instrument_ids = [instrument_ids[idx] for idx in self.rng.choice(
+                len(instrument_ids), size=num_modified_instruments, replace=False)]
+
+        return instrument_ids
+
+    def _get_modified_instrument_ids(self, note_table: NoteTable, instrument_counts=None) -> list:
+        """Get indices of instruments to be modified based on p_instruments.
+
+        This is the NoteTable counterpart of `_get_modified_instruments_list`. Drum
+        instruments are filtered out and, if p_instruments < 1.0, a random subset
+        of the remaining instruments is selected.
+
+        Args:
+            note_table (NoteTable): The notes to transform.
+            instrument_counts (list[int], optional): If the table merges several MIDI
+                files (see `NoteTable.concatenate`), the number of instruments of each
+                file. Instruments are then selected separately for every file.
+                Default: None (the table holds a single file)
+
+        Returns:
+            list[int]: Indices of the instruments selected for modification.
+        """
+        if instrument_counts is None:
+            instrument_counts = [note_table.num_instruments]
+
+        modified_instrument_ids = []
+        first = 0
+        for num_instruments in instrument_counts:
+            # filtering out drum instruments (TODO: Evaluate whether this is needed)
+            candidate_ids = [first + idx for idx, is_drum in
+                             enumerate(note_table.is_drum[first:first + num_instruments].tolist()) if not is_drum]
+            modified_instrument_ids.extend(self._sample_instrument_ids(candidate_ids))
+            first += num_instruments
+
+        return modified_instrument_ids
+
+    def _sample_notes(self, instrument_groups: list, instrument_ids: list, num_selected=None) -> np.ndarray:
+        """Randomly select notes of every given instrument with a single draw.
+
+        Each note gets a uniform random key, and the notes with the smallest keys
+        within each instrument are selected. This is equivalent to sampling every
+        instrument separately, but needs one vectorized draw regardless of the
+        number of instruments.
+
+        Args:
+            instrument_groups (list[np.ndarray]): Row indices of the notes of every
+                instrument (see `NoteTable.instrument_groups`).
+            instrument_ids (list[int]): Instruments to select notes from.
+            num_selected (np.ndarray, optional): Number of notes to select from each
+                instrument in `instrument_ids`.
+                Default: None (int(p * number of notes) per instrument)
+
+        Returns:
+            np.ndarray: Row indices of the selected notes, grouped by instrument.
+        """
+        groups = [instrument_groups[idx] for idx in instrument_ids]
+        num_notes = np.array([len(group) for group in groups], dtype=np.int64)
+        if num_selected is None:
+            num_selected = (self.p * num_notes).astype(np.int64)
+            if np.any((num_selected == 0) & (num_notes > 0)):
+                logging.debug(
+                    f"{type(self).__name__} can't be performed on 0 notes on given non-drum instrument. Skipping.",
+                )
+        if not groups or np.sum(num_selected) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = np.concatenate(groups)
+        group_of_row = np.repeat(np.arange(len(groups)), num_notes)
+        group_starts = np.repeat(np.cumsum(num_notes) - num_notes, num_notes)
+
+        # Random keys in [0, 1) offset by the group index keep rows grouped by
+        # instrument and shuffled within each group after a single sort
+        order = np.argsort(group_of_row + self.rng.random(len(rows)))
+        rank = np.arange(len(rows)) - group_starts
+        return rows[order[rank < np.asarray(num_selected)[group_of_row]]]
+
+    def apply_to_instruments(self, note_table: NoteTable, instrument_ids: list) -> NoteTable:
+        """Apply the transform to the given instruments of a NoteTable, in place.
+
+        Note-level transforms implement this method to support batched application.
+        Instrument selection is done by the caller, so `instrument_ids` may belong to
+        several MIDI files merged into one table.
+
+        Args:
+            note_table (NoteTable): The notes to transform.
+            instrument_ids (list[int]): Instruments selected for modification.
+
+        Returns:
+            NoteTable: The transformed notes.
+
+        Raises:
+            NotImplementedError: If the child class does not implement this method.
+        """
+        raise NotImplementedError
+
+    def apply_table(self, note_table: NoteTable) -> NoteTable:
+        """Apply the transform to a columnar NoteTable, in place.
+
+        Note-level transforms implement either this method or `apply_to_instruments`.
+        By default, instruments are selected based on p_instruments and passed to
+        `apply_to_instruments`, so that it also runs on several MIDI files merged
+        into one table by `apply_batch`. PrettyMIDI input is converted to a
+        NoteTable and back by `apply`.
+
+        Args:
+            note_table (NoteTable): The notes to transform.
+
+        Returns:
+            NoteTable: The transformed notes.
+
+        Raises:
+            NotImplementedError: If the child class implements neither this method
+                nor `apply_to_instruments`.
+        """
+        return self.apply_to_instruments(note_table, self._get_modified_instrument_ids(note_table))
+
     def apply(self, midi_data):
         """Apply the transform to the MIDI data.
         
-        This method should be implemented by all transform classes.
+        By default, this converts PrettyMIDI input to a NoteTable, runs `apply_table`
+        and writes the resulting notes back into the same PrettyMIDI object. NoteTable
+        input is passed to `apply_table` directly, after copying any read-only arrays
+        (see `NoteTable.ensure_writable`). Transforms that do not operate on notes
+        should override this method.
         
         Args:
-            midi_data: A PrettyMIDI object containing the MIDI data to transform.
+            midi_data: A PrettyMIDI object or NoteTable containing the MIDI data to
+                transform.
             
         Returns:
-            The transformed PrettyMIDI object.
+            The transformed PrettyMIDI object or NoteTable.
             
         Raises:
-            NotImplementedError: If the child class does not implement this method.
+            NotImplementedError: If the child class implements none of this method,
+                `apply_table` and `apply_to_instruments`.
         """
-        raise NotImplementedError
+        if isinstance(midi_data, NoteTable):
+            return self.apply_table(midi_data.ensure_writable())
+
+        note_table = self.apply_table(NoteTable.from_pretty_midi(midi_data))
+        return note_table.to_pretty_midi(midi_data)
+
+    def supports_batching(self) -> bool:
+        """Check whether `apply_batch` can process the batch as one merged NoteTable.
+
+        Returns:
+            bool: True if the transform implements `apply_to_instruments` and does not
+                override `apply` or `apply_table`.
+        """
+        transform_type = type(self)
+        return (transform_type.apply_to_instruments is not BaseMidiTransform.apply_to_instruments
+                and transform_type.apply_table is BaseMidiTransform.apply_table
+                and transform_type.apply is BaseMidiTransform.apply)
+
+    def apply_batch(self, batch: list) -> list:
+        """Apply the transform to a list of MIDI objects in one call.
+
+        If the transform supports batching (see `supports_batching`), all inputs are
+        merged into a single NoteTable: instruments are selected separately for each
+        file, but random shifts are drawn for the whole batch at once and applied
+        with vectorized operations on the merged arrays. Otherwise, the transform is
+        applied to each input in turn.
+
+        Args:
+            batch (list): PrettyMIDI objects and/or NoteTables to transform.
+
+        Returns:
+            list: The transformed objects, in input order. PrettyMIDI inputs are
+                modified in place; NoteTable inputs are returned as new tables.
+        """
+        if not self.supports_batching():
+            return [self.apply(midi_data) for midi_data in batch]
+        return apply_transforms_to_batch([self], batch)
 
     def __call__(self, midi_data):
         """Apply the transform to the MIDI data.
@@ -116,3 +543,48 @@ class BaseMidiTransform:
             The transformed PrettyMIDI object.
         """
         return self.apply(midi_data)
+
+
+def apply_transforms_to_batch(transforms: list, batch: list, profiler: Optional[Profiler] = None,
+                              names: Optional[list] = None) -> list:
+    """Apply a sequence of batchable transforms to a list of MIDI objects.
+
+    The batch is merged into a single NoteTable once, every transform runs on the
+    merged table, and the result is split back into one output per input.
+
+    Args:
+        transforms (list[BaseMidiTransform]): Transforms for which `supports_batching`
+            is True, applied in order.
+        batch (list): PrettyMIDI objects and/or NoteTables to transform.
+        profiler (Profiler, optional): If given, every transform is profiled.
+            Default: None
+        names (list[str], optional): Names of the transforms in the profiler and
+            in traces.
+            Default: None (the class names)
+
+    Returns:
+        list: The transformed objects, in input order. PrettyMIDI inputs are modified
+            in place; NoteTable inputs are returned as new tables.
+    """
+    batch = list(batch)
+    if not batch:
+        return batch
+
+    note_tables = [midi_data if isinstance(midi_data, NoteTable) else NoteTable.from_pretty_midi(midi_data)
+                   for midi_data in batch]
+    instrument_counts = [note_table.num_instruments for note_table in note_tables]
+    merged = NoteTable.concatenate(note_tables)
+
+    if names is None:
+        names = [type(transform).__name__ for transform in transforms]
+    for transform, name in zip(transforms, names):
+        with profiler.measure(name) if profiler is not None else nullcontext(), \
+                span(name, transform.trace_category, batch_size=len(batch)):
+            merged = transform.apply_to_instruments(
+                merged, transform._get_modified_instrument_ids(merged, instrument_counts)
+            )
+
+    return [
+        note_table if isinstance(midi_data, NoteTable) else note_table.to_pretty_midi(midi_data)
+        for midi_data, note_table in zip(batch, merged.split(instrument_counts))
+    ]
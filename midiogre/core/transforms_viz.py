@@ -18,21 +18,28 @@ Example:
     >>> # Apply transform and visualize
     >>> transformed = transform(midi_data)
     >>> viz_transform(midi_data, transformed, 'Pitch Shift')
+
+Note:
+    matplotlib is only imported when a figure or colormap is created, so that
+    importing this module stays cheap.
 """
 
-import copy
+from __future__ import annotations
+
 import time
 from statistics import mean
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 
-import matplotlib
 import numpy as np
 import pretty_midi
-from matplotlib import pyplot as plt
 
 from midiogre.core.conversions import ConvertToMido, ConvertToPrettyMIDI
 from midiogre.augmentations import PitchShift, OnsetTimeShift, DurationShift, NoteDelete, NoteAdd, TempoShift
-from midiogre.core import ToPRollTensor, Compose
+from midiogre.core import ToPRollTensor, Compose, clone
+
+if TYPE_CHECKING:
+    import matplotlib
+    from matplotlib import pyplot as plt
 
 
 def load_midi(path: str) -> pretty_midi.PrettyMIDI:
@@ -81,6 +88,8 @@ def create_proll_cmap(cmap_name: str) -> matplotlib.colors.ListedColormap:
         matplotlib.colors.ListedColormap: A new colormap with alpha channel
         that varies from transparent to opaque.
     """
+    import matplotlib
+
     cmap = matplotlib.colormaps[cmap_name]
     alpha_cmap = cmap(np.arange(cmap.N))
     alpha_cmap[:, -1] = np.linspace(0, 1, cmap.N)
@@ -254,6 +263,8 @@ def viz_transform(original_midi_data: pretty_midi.PrettyMIDI,
         transform_name: Name of the transform for the plot title
         save_path: Optional path to save the visualization
     """
+    from matplotlib import pyplot as plt
+
     fig = plt.figure(figsize=(15, 6))
     
     # Create gridspec with space for colorbar
@@ -385,7 +396,7 @@ if __name__ == '__main__':
     
     # Example 1: Pitch Shift
     pitch_transform = Compose([PitchShift(max_shift=5, mode='both', p=1.0)])
-    transformed = pitch_transform(copy.deepcopy(midi_data))
+    transformed = pitch_transform(clone(midi_data))
     viz_transform(midi_data, transformed, 'Pitch Shift')
     
     # Example 2: Note Addition/Deletion
@@ -393,7 +404,7 @@ if __name__ == '__main__':
         NoteDelete(p=0.2),
         NoteAdd(note_num_range=(50, 80), p=0.3)
     ])
-    transformed = note_transform(copy.deepcopy(midi_data))
+    transformed = note_transform(clone(midi_data))
     viz_transform(midi_data, transformed, 'Note Modification')
     
     # Example 3: Time-based transforms
@@ -401,5 +412,5 @@ if __name__ == '__main__':
         OnsetTimeShift(max_shift=0.5, mode='both', p=1.0),
         DurationShift(max_shift=0.2, mode='both', p=1.0)
     ])
-    transformed = time_transform(copy.deepcopy(midi_data))
+    transformed = time_transform(clone(midi_data))
     viz_transform(midi_data, transformed, 'Time Modification')
@@ -0,0 +1,282 @@
+"""PyTorch datasets of augmented MIDI files.
+
+`MidiDataset` and `MidiIterableDataset` load MIDI files, apply an augmentation
+pipeline and convert the result, e.g. to a piano roll tensor, taking care of the
+details that hand-written datasets usually get wrong:
+
+- Random state: worker processes started with fork inherit the random state of
+  the main process, so unless they are reseeded every worker draws the same
+  augmentations. Both datasets reseed the transform (see `Compose.reseed`) and
+  the global `np.random` and `random` generators, which custom transforms may
+  use, in every DataLoader worker, from the worker seed DataLoader draws anew
+  every epoch.
+- Reproducibility: with a fixed `seed`, the augmentations of each item depend only
+  on the seed, the epoch (see `set_epoch`) and the item index, not on the number
+  of workers or the order in which they fetch items: transforms draw from
+  counter-based generators keyed on these three values (see
+  `Compose.sample_rng`). In the main process, i.e. with `num_workers=0`, the
+  transform draws from its own generators again after every item and the global
+  generators are left alone.
+- Loading: files are read with a configurable loader, e.g. a converter with a
+  `MidiCache` or `CorpusCache`, and `MidiIterableDataset` can parse upcoming files
+  in background threads while the current one is augmented.
+
+Example:
+    >>> from torch.utils.data import DataLoader
+    >>> from midiogre.augmentations import PitchShift, OnsetTimeShift
+    >>> from midiogre.core import Compose, ToPRollTensor
+    >>> from midiogre.data import MidiDataset
+    >>>
+    >>> dataset = MidiDataset(
+    ...     'midi_dir/',
+    ...     transform=Compose([PitchShift(max_shift=3, p=0.8), OnsetTimeShift(max_shift=0.1, p=0.5)]),
+    ...     conversion=ToPRollTensor(fs=50),
+    ... )
+    >>> loader = DataLoader(dataset, batch_size=None, num_workers=4)
+    >>> for epoch in range(10):
+    ...     dataset.set_epoch(epoch)
+    ...     for piano_roll in loader:
+    ...         ...
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
+
+from midiogre.core.conversions import ConvertToPrettyMIDI
+from midiogre.core.corpus import find_midi_files
+from midiogre.core.seeding import seed_global_rngs, seed_sample, seed_transform
+from midiogre.core.tracing import is_tracing, set_process_name, span, trace_file
+
+__all__ = ['MidiDataset', 'MidiIterableDataset', 'seed_global_rngs', 'seed_sample', 'seed_transform']
+
+
+class _MidiDatasetMixin:
+    """Loading, seeding and epoch handling shared by both datasets."""
+
+    def __init__(self, midi_files: Union[str, os.PathLike, Sequence], transform: Optional[Callable] = None,
+                 conversion: Optional[Callable] = None, loader: Optional[Callable] = None,
+                 seed: Optional[int] = None):
+        if isinstance(midi_files, (str, os.PathLike)):
+            midi_files = find_midi_files(midi_files)
+
+        self.midi_files = midi_files
+        self.transform = transform
+        self.conversion = conversion
+        self.loader = loader if loader is not None else ConvertToPrettyMIDI()
+        self.seed = seed
+        self.epoch = 0
+        self._seeded_worker = None
+
+    def __len__(self):
+        """Return the number of MIDI files."""
+        return len(self.midi_files)
+
+    def set_epoch(self, epoch: int):
+        """Set the epoch, which is mixed into the seed of every item.
+
+        Call this before iterating over the DataLoader of every epoch. Workers
+        receive the new epoch when they are started, so with
+        `persistent_workers=True` it only takes effect for a fixed `seed` if the
+        workers are recreated.
+
+        Args:
+            epoch (int): Epoch number.
+        """
+        self.epoch = epoch
+
+    def _seed_worker(self):
+        """Reseed the transform and global generators once per worker process and epoch.
+
+        DataLoader draws a new base seed for every epoch and derives a distinct
+        seed for every worker from it, so workers never share their random state.
+        """
+        worker_info = get_worker_info()
+        if worker_info is None:
+            return
+
+        key = (os.getpid(), worker_info.seed)
+        if self._seeded_worker != key:
+            seed_transform(self.transform, np.random.SeedSequence(worker_info.seed))
+            self._seeded_worker = key
+
+    def _load_item(self, idx: int):
+        """Load a MIDI file, without augmenting it."""
+        midi_file = self.midi_files[idx]
+        if is_tracing():
+            worker_info = get_worker_info()
+            if worker_info is not None:
+                set_process_name(f"DataLoader worker {worker_info.id}")
+        with trace_file(midi_file), span('load', 'load'):
+            return self.loader(midi_file)
+
+    def _process(self, midi_data, idx: int):
+        """Augment and convert loaded MIDI data."""
+        if self.seed is None:
+            self._seed_worker()
+            return self._augment(midi_data, idx)
+        # The global generators of the main process belong to the caller
+        with seed_sample(self.transform, self.seed, self.epoch, idx, global_rngs=get_worker_info() is not None):
+            return self._augment(midi_data, idx)
+
+    def _augment(self, midi_data, idx: int):
+        """Augment and convert loaded MIDI data with the current random state."""
+        if not is_tracing():
+            if self.transform is not None:
+                midi_data = self.transform(midi_data)
+            if self.conversion is not None:
+                midi_data = self.conversion(midi_data)
+            return midi_data
+
+        with trace_file(self.midi_files[idx]):
+            if self.transform is not None:
+                with span('augment', 'pipeline'):
+                    midi_data = self.transform(midi_data)
+            if self.conversion is not None:
+                with span(type(self.conversion).__name__, getattr(self.conversion, 'trace_category', 'conversion')):
+                    midi_data = self.conversion(midi_data)
+        return midi_data
+
+
+class MidiDataset(_MidiDatasetMixin, Dataset):
+    """Map-style dataset of augmented MIDI files.
+
+    Every item is loaded with `loader`, augmented with `transform` and converted
+    with `conversion`. Random augmentations are never duplicated across DataLoader
+    workers (see the module documentation).
+
+    Args:
+        midi_files (str, os.PathLike or sequence): A directory searched recursively
+            for MIDI files, or a sequence of items accepted by `loader`, e.g. file
+            paths or a `ShardedCorpus`.
+        transform (callable, optional): Augmentation applied to every loaded item,
+            e.g. a `Compose` pipeline.
+            Default: None
+        conversion (callable, optional): Conversion applied after the augmentations,
+            e.g. `ToPRollTensor`.
+            Default: None
+        loader (callable, optional): Loads an item of `midi_files`, e.g.
+            `ConvertToNoteTable(cache=MidiCache())`.
+            Default: `ConvertToPrettyMIDI()`
+        seed (int, optional): If given, the transform is reseeded before augmenting
+            every item, from the seed, the epoch and the item index, and so are the
+            global `np.random` and `random` generators of worker processes.
+            Default: None (seed every worker from the DataLoader's seed)
+
+    Example:
+        >>> dataset = MidiDataset(paths, transform=Compose([PitchShift(max_shift=3)]),
+        ...                       conversion=ToPRollTensor(), seed=0)
+        >>> piano_roll = dataset[0]
+    """
+
+    def __init__(self, midi_files: Union[str, os.PathLike, Sequence], transform: Optional[Callable] = None,
+                 conversion: Optional[Callable] = None, loader: Optional[Callable] = None,
+                 seed: Optional[int] = None):
+        super().__init__(midi_files, transform=transform, conversion=conversion, loader=loader, seed=seed)
+
+    def __getitem__(self, idx: int):
+        """Load, augment and convert the MIDI file at position `idx`."""
+        return self._process(self._load_item(idx), idx)
+
+
+class MidiIterableDataset(_MidiDatasetMixin, IterableDataset):
+    """Iterable dataset of augmented MIDI files with background prefetching.
+
+    Each epoch, the files are optionally shuffled and split into disjoint parts,
+    one per DataLoader worker. Every item is loaded with `loader`, augmented with
+    `transform` and converted with `conversion`. With `prefetch` > 0, the next files
+    are loaded in background threads while the current one is augmented.
+
+    Args:
+        midi_files (str, os.PathLike or sequence): A directory searched recursively
+            for MIDI files, or a sequence of items accepted by `loader`, e.g. file
+            paths or a `ShardedCorpus`.
+        transform (callable, optional): Augmentation applied to every loaded item,
+            e.g. a `Compose` pipeline.
+            Default: None
+        conversion (callable, optional): Conversion applied after the augmentations,
+            e.g. `ToPRollTensor`.
+            Default: None
+        loader (callable, optional): Loads an item of `midi_files`, e.g.
+            `ConvertToNoteTable(cache=MidiCache())`. Must be thread-safe if
+            `prefetch` > 0.
+            Default: `ConvertToPrettyMIDI()`
+        seed (int, optional): If given, the shuffling order depends only on the
+            seed and the epoch, and the transform is reseeded before augmenting
+            every item, from the seed, the epoch and the item index, and so are the
+            global `np.random` and `random` generators of worker processes.
+            Default: None (draw the order from torch's generator and seed every
+            worker from the DataLoader's seed)
+        shuffle (bool, optional): Whether to shuffle the files every epoch.
+            Default: True
+        prefetch (int, optional): Number of files loaded ahead of time per worker.
+            Default: 0 (load every file when it is needed)
+
+    Raises:
+        ValueError: If prefetch is negative.
+
+    Example:
+        >>> dataset = MidiIterableDataset('midi_dir/', transform=transform,
+        ...                               conversion=ToPRollTensor(), prefetch=4)
+        >>> loader = DataLoader(dataset, batch_size=None, num_workers=4)
+    """
+
+    def __init__(self, midi_files: Union[str, os.PathLike, Sequence], transform: Optional[Callable] = None,
+                 conversion: Optional[Callable] = None, loader: Optional[Callable] = None,
+                 seed: Optional[int] = None, shuffle: bool = True, prefetch: int = 0):
+        if prefetch < 0:
+            raise ValueError(f"Number of prefetched files must be non-negative, got {prefetch}")
+
+        super().__init__(midi_files, transform=transform, conversion=conversion, loader=loader, seed=seed)
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+
+    def _epoch_indices(self) -> np.ndarray:
+        """Get the file indices of this worker for the current epoch."""
+        indices = np.arange(len(self.midi_files))
+        worker_info = get_worker_info()
+        if self.shuffle:
+            if self.seed is not None:
+                order_seed = [self.seed, self.epoch]
+            elif worker_info is not None:
+                # Shared by all workers of this epoch, so that their parts are disjoint
+                order_seed = worker_info.seed - worker_info.id
+            else:
+                order_seed = int(torch.empty((), dtype=torch.int64).random_().item())
+            np.random.default_rng(np.random.SeedSequence(order_seed)).shuffle(indices)
+
+        if worker_info is not None:
+            indices = indices[worker_info.id::worker_info.num_workers]
+        return indices
+
+    def _iter_loaded(self, indices: Iterable[int]):
+        """Yield (index, loaded item) pairs, loading up to `prefetch` items ahead."""
+        if self.prefetch == 0:
+            for idx in indices:
+                yield idx, self._load_item(idx)
+            return
+
+        indices = iter(indices)
+        with ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            pending = deque()
+            for idx in indices:
+                pending.append((idx, executor.submit(self._load_item, idx)))
+                if len(pending) >= self.prefetch:
+                    break
+
+            while pending:
+                idx, future = pending.popleft()
+                next_idx = next(indices, None)
+                if next_idx is not None:
+                    pending.append((next_idx, executor.submit(self._load_item, next_idx)))
+                yield idx, future.result()
+
+    def __iter__(self):
+        """Iterate over the augmented and converted MIDI files of this worker."""
+        for idx, midi_data in self._iter_loaded(self._epoch_indices()):
+            yield self._process(midi_data, int(idx))
@@ -0,0 +1,164 @@
+"""Memory accounting of parsed MIDI data.
+
+`memory_usage` estimates how many bytes a PrettyMIDI object, a NoteTable or a Mido
+file holds, split by what holds them, and how large its piano roll would be. This
+shows whether a long file is expensive because of its `pretty_midi.Note` objects,
+its control changes, pretty_midi's tick-to-time table (one float64 per tick up to
+the last event of the file, however few tempo changes it has) or its piano roll
+(128 rows per 1/fs seconds of music).
+
+Python objects are measured with `sys.getsizeof` on one sample per list, so the
+estimates are approximate, but they are computed in O(number of instruments)
+apart from the end time of the piano roll.
+
+Example:
+    >>> from midiogre.inspect import memory_usage
+    >>>
+    >>> usage = memory_usage(pretty_midi.PrettyMIDI('orchestral.mid'), fs=100)
+    >>> {key: f'{nbytes / 2 ** 20:.1f} MiB' for key, nbytes in usage.items() if nbytes is not None}
+"""
+
+import sys
+
+import mido
+import numpy as np
+import pretty_midi
+
+from midiogre.core.note_table import INSTRUMENT_DTYPE, PITCH_DTYPE, TIME_DTYPE, VELOCITY_DTYPE, NoteTable
+
+NUM_PITCHES = 128
+# Bytes per note of the per-note columns of a NoteTable
+NOTE_TABLE_BYTES_PER_NOTE = sum(np.dtype(dtype).itemsize for dtype in
+                                (PITCH_DTYPE, VELOCITY_DTYPE, TIME_DTYPE, TIME_DTYPE, INSTRUMENT_DTYPE))
+
+
+def _value_nbytes(value) -> int:
+    """Bytes held by an attribute value; small ints are interned and cost nothing."""
+    if isinstance(value, int) and -5 <= value <= 256:
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+def _instance_nbytes(obj) -> int:
+    """Bytes held by an object and its attribute values."""
+    if not hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj)
+    attributes = vars(obj)
+    if sys.version_info >= (3, 11):
+        # Attribute values are stored inline rather than in a dict
+        dict_nbytes = 24 + 8 * len(attributes)
+    else:
+        dict_nbytes = sys.getsizeof(attributes)
+    return sys.getsizeof(obj) + dict_nbytes + sum(_value_nbytes(value) for value in attributes.values())
+
+
+def _objects_nbytes(items) -> int:
+    """Approximate the bytes held by a list of objects of the same type, from its first item."""
+    if isinstance(items, np.ndarray):
+        return items.nbytes
+    nbytes = sys.getsizeof(items)
+    if not len(items):
+        return nbytes
+    sample = items[0]
+    if isinstance(sample, (list, tuple)):
+        item_nbytes = sys.getsizeof(sample) + sum(_value_nbytes(value) for value in sample)
+    else:
+        item_nbytes = _instance_nbytes(sample)
+    return nbytes + len(items) * item_nbytes
+
+
+def piano_roll_nbytes(end_time: float, fs: float = 100, dtype=np.float64) -> int:
+    """Size of a piano roll of 128 pitches, sampled at fs up to an end time.
+
+    Args:
+        end_time (float): Time of the last event in seconds.
+        fs (float, optional): Sampling frequency in Hz.
+            Default: 100
+        dtype (np.dtype, optional): Data type of the roll.
+            Default: np.float64, as returned by `get_piano_roll`
+
+    Returns:
+        int: Size of the roll in bytes.
+    """
+    return NUM_PITCHES * int(fs * end_time) * np.dtype(dtype).itemsize
+
+
+def _pretty_midi_usage(midi_data: pretty_midi.PrettyMIDI) -> dict:
+    tick_table = getattr(midi_data, '_PrettyMIDI__tick_to_time', [])
+    num_notes = sum(len(instrument.notes) for instrument in midi_data.instruments)
+    return {
+        'notes': sum(_objects_nbytes(instrument.notes) for instrument in midi_data.instruments),
+        'control_changes': sum(_objects_nbytes(instrument.control_changes) for instrument in midi_data.instruments),
+        'pitch_bends': sum(_objects_nbytes(instrument.pitch_bends) for instrument in midi_data.instruments),
+        'tick_table': _objects_nbytes(tick_table),
+        'tick_scales': _objects_nbytes(midi_data._tick_scales),
+        'events': sum(_objects_nbytes(getattr(midi_data, name, [])) for name in
+                      ('key_signature_changes', 'time_signature_changes', 'lyrics', 'text_events')),
+        'object': sys.getsizeof(midi_data) + sys.getsizeof(midi_data.instruments) + sum(
+            sys.getsizeof(instrument) + sys.getsizeof(instrument.name) for instrument in midi_data.instruments),
+    }, num_notes, midi_data.get_end_time()
+
+
+def _note_table_usage(note_table: NoteTable) -> dict:
+    return {
+        'notes': sum(array.nbytes for array in (note_table.pitch, note_table.velocity, note_table.start,
+                                                note_table.end, note_table.instrument)),
+        'control_changes': note_table.control_changes.nbytes,
+        'pitch_bends': note_table.pitch_bends.nbytes,
+        'object': sys.getsizeof(note_table) + note_table.programs.nbytes + note_table.is_drum.nbytes
+        + _objects_nbytes(note_table.names),
+    }, len(note_table), float(note_table.end_times().max(initial=0.0))
+
+
+def memory_usage(midi_data, fs: float = 100, roll_dtype=np.float64) -> dict:
+    """Estimate the bytes held by parsed MIDI data and by its piano roll.
+
+    Args:
+        midi_data (pretty_midi.PrettyMIDI, NoteTable or mido.MidiFile): The MIDI
+            data.
+        fs (float, optional): Sampling frequency of the piano roll in Hz.
+            Default: 100
+        roll_dtype (np.dtype, optional): Data type of the piano roll.
+            Default: np.float64, as returned by `get_piano_roll`
+
+    Returns:
+        dict: Bytes held by the object, split into:
+            - 'notes': Note objects, or the per-note columns of a NoteTable
+            - 'control_changes' and 'pitch_bends': their objects or arrays
+            - 'tick_table': pretty_midi's tick-to-time table (PrettyMIDI only)
+            - 'tick_scales': pretty_midi's tempo segments (PrettyMIDI only)
+            - 'events': key and time signatures, lyrics and text (PrettyMIDI only)
+            - 'messages': the messages of all tracks (Mido only)
+            - 'object': the object itself, its instruments and metadata
+            - 'total': the sum of the above
+            and, not included in 'total':
+            - 'note_table': the per-note columns of the same notes as a NoteTable
+              (None for Mido files)
+            - 'piano_roll': the roll of the data at `fs` (None for Mido files)
+
+    Raises:
+        TypeError: If the MIDI data is of another type.
+
+    Example:
+        >>> usage = memory_usage(midi_data, fs=100)
+        >>> max((key for key in usage if key != 'total'), key=lambda key: usage[key] or 0)
+        'piano_roll'
+    """
+    if isinstance(midi_data, pretty_midi.PrettyMIDI):
+        usage, num_notes, end_time = _pretty_midi_usage(midi_data)
+    elif isinstance(midi_data, NoteTable):
+        usage, num_notes, end_time = _note_table_usage(midi_data)
+    elif isinstance(midi_data, mido.MidiFile):
+        usage = {'messages': sum(_objects_nbytes(track) for track in midi_data.tracks),
+                 'object': sys.getsizeof(midi_data) + _objects_nbytes(midi_data.tracks)}
+        usage['total'] = sum(usage.values())
+        return {**usage, 'note_table': None, 'piano_roll': None}
+    else:
+        raise TypeError(f"Expected a PrettyMIDI object, a NoteTable or a Mido MidiFile, got {type(midi_data)}")
+
+    usage['total'] = sum(usage.values())
+    usage['note_table'] = num_notes * NOTE_TABLE_BYTES_PER_NOTE
+    usage['piano_roll'] = piano_roll_nbytes(end_time, fs, roll_dtype)
+    return usage
@@ -0,0 +1,314 @@
+"""Parallel offline augmentation of MIDI corpora.
+
+`augment_corpus` spreads the files of a corpus over a pool of worker processes.
+Each worker loads a file, creates `copies` augmented variants of it with
+`Compose.expand` and optionally converts them, e.g. to piano rolls. Results are
+streamed back as soon as they are ready, while only a bounded number of files is
+in flight at any time.
+
+Numeric results, i.e. NoteTables, NumPy arrays and PyTorch tensors, are written
+into a shared memory block by the worker and copied out of it by the main
+process, instead of being pickled and sent through a pipe. Other results, such as
+PrettyMIDI objects, are pickled.
+
+Example:
+    >>> from midiogre.augmentations import PitchShift, NoteDelete
+    >>> from midiogre.core import Compose, ToPRollNumpy
+    >>> from midiogre.parallel import augment_corpus
+    >>>
+    >>> transform = Compose([PitchShift(max_shift=3, p=0.8), NoteDelete(p=0.1)])
+    >>> for result in augment_corpus('midi_dir/', transform, workers=64, copies=8,
+    ...                              conversion=ToPRollNumpy(fs=50)):
+    ...     for copy_idx, piano_roll in enumerate(result.variants):
+    ...         np.save(f'rolls/{Path(result.path).stem}_{copy_idx}.npy', piano_roll)
+"""
+
+import copy
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+import numpy as np
+
+from midiogre.core.compositions import Compose
+from midiogre.core.conversions import ConvertToNoteTable
+from midiogre.core.corpus import SHARD_COLUMNS, find_midi_files
+from midiogre.core.note_table import NoteTable
+from midiogre.core.seeding import seed_sample
+from midiogre.core.tracing import set_process_name, span, trace_file
+
+# Offsets of arrays in shared memory are aligned to cache lines
+SHARED_MEMORY_ALIGNMENT = 64
+
+_worker_state = {}
+
+
+class AugmentedFile(NamedTuple):
+    """Augmented variants of one file of a corpus.
+
+    Attributes:
+        index (int): Position of the file in the input.
+        path (str): Path to the file.
+        variants (list or None): The augmented (and converted) variants, or None
+            if the file failed.
+        error (str or None): Description of the error if the file failed.
+    """
+    index: int
+    path: str
+    variants: Optional[list]
+    error: Optional[str] = None
+
+
+def _to_shared_memory(variants: list) -> tuple:
+    """Write the numeric arrays of a list of results into one shared memory block.
+
+    Returns:
+        tuple: The name of the block (None if no array was written) and, for every
+            result, a (kind, fields, extra) layout, where fields holds a
+            (name, dtype, shape, offset) tuple per array and extra holds anything
+            that is not an array, e.g. instrument names or pickled objects.
+    """
+    # A variant can only be a tensor if torch was imported by whoever produced it
+    torch = sys.modules.get('torch')
+    layouts = []
+    arrays = []
+    nbytes = 0
+    for variant in variants:
+        if isinstance(variant, NoteTable):
+            kind, extra = 'note_table', variant.names
+            fields = {name: getattr(variant, name) for name in SHARD_COLUMNS}
+        elif torch is not None and torch.is_tensor(variant):
+            kind, extra = 'tensor', None
+            fields = {'data': variant.detach().cpu().numpy()}
+        elif isinstance(variant, np.ndarray) and not variant.dtype.hasobject:
+            kind, extra = 'ndarray', None
+            fields = {'data': variant}
+        else:
+            layouts.append(('object', [], variant))
+            continue
+
+        field_layouts = []
+        for name, array in fields.items():
+            nbytes = -(-nbytes // SHARED_MEMORY_ALIGNMENT) * SHARED_MEMORY_ALIGNMENT
+            field_layouts.append((name, array.dtype, array.shape, nbytes))
+            arrays.append((array, nbytes))
+            nbytes += array.nbytes
+        layouts.append((kind, field_layouts, extra))
+
+    if not arrays:
+        return None, layouts
+
+    block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        for array, offset in arrays:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)[...] = array
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    return block.name, layouts
+
+
+def _from_shared_memory(name: Optional[str], layouts: list) -> list:
+    """Copy the results written by `_to_shared_memory` out of shared memory and free it."""
+    if name is None:
+        return [extra for _, _, extra in layouts]
+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        variants = []
+        for kind, field_layouts, extra in layouts:
+            fields = {
+                field_name: np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset).copy()
+                for field_name, dtype, shape, offset in field_layouts
+            }
+            if kind == 'note_table':
+                variants.append(NoteTable(names=extra, **fields))
+            elif kind == 'tensor':
+                import torch
+
+                variants.append(torch.from_numpy(fields['data']))
+            elif kind == 'ndarray':
+                variants.append(fields['data'])
+            else:
+                variants.append(extra)
+    finally:
+        block.close()
+        block.unlink()
+    return variants
+
+
+def _augment_file(transform: Compose, loader: Callable, conversion: Optional[Callable], copies: int,
+                  midi_file, seed: int, index: int, global_rngs: bool = False) -> list:
+    """Load, augment and convert one file, seeding the global generators only if global_rngs is True."""
+    with seed_sample(transform, seed, 0, index, global_rngs=global_rngs), trace_file(midi_file):
+        with span('load', 'load'):
+            midi_data = loader(midi_file)
+        with span('augment', 'pipeline', copies=copies):
+            variants = transform.expand(midi_data, copies)
+        if conversion is not None:
+            conversion_name = type(conversion).__name__
+            conversion_category = getattr(conversion, 'trace_category', 'conversion')
+            converted = []
+            for variant in variants:
+                with span(conversion_name, conversion_category):
+                    converted.append(conversion(variant))
+            variants = converted
+    return variants
+
+
+def _init_worker(transform: Compose, loader: Callable, conversion: Optional[Callable], copies: int):
+    """Store the pipeline once per worker process instead of sending it with every file."""
+    _worker_state.update(transform=transform, loader=loader, conversion=conversion, copies=copies)
+    set_process_name(f"augment_corpus worker {os.getpid()}")
+
+
+def _run_worker_task(midi_file, seed: int, index: int) -> tuple:
+    """Augment one file in a worker process and write the results into shared memory."""
+    try:
+        variants = _augment_file(_worker_state['transform'], _worker_state['loader'],
+                                 _worker_state['conversion'], _worker_state['copies'], midi_file, seed, index,
+                                 global_rngs=True)
+    except Exception as error:
+        return None, None, f"{type(error).__name__}: {error}"
+    name, layouts = _to_shared_memory(variants)
+    return name, layouts, None
+
+
+def augment_corpus(midi_files: Union[str, os.PathLike, Iterable], transform: Compose, workers: Optional[int] = None,
+                   copies: int = 1, loader: Optional[Callable] = None, conversion: Optional[Callable] = None,
+                   seed: Optional[int] = None, max_pending: Optional[int] = None, ordered: bool = False,
+                   skip_errors: bool = False) -> Iterator[AugmentedFile]:
+    """Augment every file of a corpus in parallel worker processes.
+
+    Each file is loaded with `loader`, expanded into `copies` variants with
+    `transform.expand` and every variant is converted with `conversion`. The
+    augmentations of a file depend only on `seed` and the position of the file, not
+    on the number of workers.
+
+    Args:
+        midi_files (str, os.PathLike or iterable): A directory searched recursively
+            for MIDI files, or the items to load, e.g. file paths.
+        transform (Compose): Augmentation pipeline.
+        workers (int, optional): Number of worker processes. With 0, files are
+            augmented in the calling process, with a copy of the transform and
+            without seeding its global generators.
+            Default: None (one per CPU)
+        copies (int, optional): Number of augmented variants per file.
+            Default: 1
+        loader (callable, optional): Loads an item of `midi_files`.
+            Default: `ConvertToNoteTable()`
+        conversion (callable, optional): Conversion applied to every variant, e.g.
+            `ToPRollNumpy`.
+            Default: None
+        seed (int, optional): Seed of all augmentations.
+            Default: None (draw a fresh seed)
+        max_pending (int, optional): Maximum number of files submitted to the
+            workers but not yet yielded, which bounds memory use.
+            Default: None (4 per worker)
+        ordered (bool, optional): Whether to yield files in input order instead of
+            as soon as they are done.
+            Default: False
+        skip_errors (bool, optional): Whether to yield files that fail to load or
+            augment with their error instead of raising it.
+            Default: False
+
+    Yields:
+        AugmentedFile: The variants of each file. NoteTables and arrays are
+            transferred through shared memory; tensors are returned on the CPU.
+
+    Raises:
+        ValueError: If copies or workers is negative, or max_pending is not
+            positive.
+        RuntimeError: If a file fails and skip_errors is False.
+
+    Example:
+        >>> for result in augment_corpus(paths, transform, workers=8, copies=4):
+        ...     for variant in result.variants:
+        ...         variant.to_pretty_midi().write(...)
+    """
+    if copies < 0:
+        raise ValueError(f"Number of copies must be non-negative, got {copies}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError(f"Number of workers must be non-negative, got {workers}")
+
+    if max_pending is None:
+        max_pending = 4 * max(workers, 1)
+    if max_pending < 1:
+        raise ValueError(f"max_pending must be positive, got {max_pending}")
+
+    if isinstance(midi_files, (str, os.PathLike)):
+        midi_files = find_midi_files(midi_files)
+    if loader is None:
+        loader = ConvertToNoteTable()
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    def make_result(index, midi_file, variants, error):
+        if error is not None:
+            if not skip_errors:
+                raise RuntimeError(f"Failed to augment {midi_file}: {error}")
+            logging.warning(f"Skipping {midi_file}: {error}")
+        return AugmentedFile(index, str(midi_file), variants, error)
+
+    if workers == 0:
+        # Like the workers, augment with a copy, which leaves the caller's transform as it was
+        transform = copy.deepcopy(transform)
+        for index, midi_file in enumerate(midi_files):
+            try:
+                variants, error = _augment_file(transform, loader, conversion, copies, midi_file, seed, index), None
+            except Exception as exc:
+                variants, error = None, f"{type(exc).__name__}: {exc}"
+            yield make_result(index, midi_file, variants, error)
+        return
+
+    # Workers must share the parent's resource tracker, which forgets the shared memory
+    # blocks they create when the parent unlinks them
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(transform, loader, conversion, copies)) as executor:
+        pending = deque()
+        midi_files = enumerate(midi_files)
+        try:
+            while True:
+                while len(pending) < max_pending:
+                    index, midi_file = next(midi_files, (None, None))
+                    if index is None:
+                        break
+                    pending.append((index, midi_file, executor.submit(_run_worker_task, midi_file, seed, index)))
+
+                if not pending:
+                    break
+
+                if ordered:
+                    done = pending.popleft()
+                else:
+                    wait([future for _, _, future in pending], return_when=FIRST_COMPLETED)
+                    done = next(task for task in pending if task[2].done())
+                    pending.remove(done)
+
+                index, midi_file, future = done
+                name, layouts, error = future.result()
+                variants = None if error is not None else _from_shared_memory(name, layouts)
+                yield make_result(index, midi_file, variants, error)
+        finally:
+            # Free the shared memory of results that will never be read
+            for _, _, future in pending:
+                if future.cancel():
+                    continue
+                try:
+                    name, _, _ = future.result()
+                except Exception:
+                    continue
+                if name is not None:
+                    block = shared_memory.SharedMemory(name=name)
+                    block.close()
+                    block.unlink()
@@ -3,14 +3,13 @@ As an experiment, this script was initially generated using ChatGPT September 25
 It was subsequently modified to fix errors and better cover the concerned code.
 """
 
-import random
 import time
 
 import numpy as np
 import pytest
 
 from midiogre.augmentations.duration_shift import DurationShift, VALID_MODES
-from tests.core_mocks import generate_mock_midi_data
+from tests.core_mocks import MockGenerator, generate_mock_midi_data
 
 
 @pytest.fixture
@@ -109,11 +108,12 @@ def test_note_selection(duration_shift_instance, monkeypatch):
             return 0.2
         return np.full(size, 0.2)
     
-    def mock_sample(population, k):
-        return list(population)[:k]  # Take first k elements deterministically
+    def mock_random(size=None):
+        return np.arange(size, dtype=float)  # Select the first k notes deterministically
     
-    monkeypatch.setattr(np.random, 'uniform', mock_uniform)
-    monkeypatch.setattr(random, 'sample', mock_sample)
+    monkeypatch.setattr(duration_shift_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(duration_shift_instance.rng, 'uniform', mock_uniform)
+    monkeypatch.setattr(duration_shift_instance.rng, 'random', mock_random)
     
     modified_midi = duration_shift_instance.apply(midi_data)
     
@@ -158,11 +158,12 @@ def test_original_notes_unchanged(duration_shift_instance, monkeypatch):
     original_num_notes = 10
     midi_data = generate_mock_midi_data(num_notes=original_num_notes)
     
-    # Mock random.sample to always select the first 3 notes
-    def mock_sample(population, k):
-        return population[:3]
+    # Mock the random selection keys so that the first notes (3 with p=0.3) are selected
+    def mock_random(size=None):
+        return np.arange(size, dtype=float)
     
-    monkeypatch.setattr(random, 'sample', mock_sample)
+    monkeypatch.setattr(duration_shift_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(duration_shift_instance.rng, 'random', mock_random)
     
     # Mock random shifts to be constant
     def mock_uniform(low, high, size=None):
@@ -170,7 +171,7 @@ def test_original_notes_unchanged(duration_shift_instance, monkeypatch):
             return 0.2
         return np.full(size, 0.2)
     
-    monkeypatch.setattr(np.random, 'uniform', mock_uniform)
+    monkeypatch.setattr(duration_shift_instance.rng, 'uniform', mock_uniform)
     
     modified_midi = duration_shift_instance.apply(midi_data)
     
@@ -11,7 +11,7 @@ import pytest
 from pretty_midi import Note
 
 from midiogre.augmentations.note_add import NoteAdd
-from tests.core_mocks import generate_mock_midi_data
+from tests.core_mocks import MockGenerator, generate_mock_midi_data
 
 
 @pytest.fixture
@@ -74,20 +74,21 @@ def test_apply_enough_notes(note_add_instance, monkeypatch):
     original_num_notes = 10
     midi_data = generate_mock_midi_data(num_notes=original_num_notes)
 
-    # Mock np.random.randint to return predefined values
+    # Mock rng.integers to return predefined values
     def mock_randint(low, high, size=None):
         if size is None:
             return 75
         return np.full(size, 75)
 
-    # Mock np.random.uniform to return predefined values
+    # Mock rng.uniform to return predefined values
     def mock_uniform(low, high, size=None):
         if size is None:
             return 0.3
         return np.full(size, 0.3)
 
-    monkeypatch.setattr(np.random, 'randint', mock_randint)
-    monkeypatch.setattr(np.random, 'uniform', mock_uniform)
+    monkeypatch.setattr(note_add_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(note_add_instance.rng, 'integers', mock_randint)
+    monkeypatch.setattr(note_add_instance.rng, 'uniform', mock_uniform)
 
     # Apply note addition
     modified_midi = note_add_instance.apply(midi_data)
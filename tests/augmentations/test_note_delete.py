@@ -3,10 +3,9 @@ As an experiment, this script was initially generated using ChatGPT September 25
 It was subsequently modified to fix errors and better cover the concerned code.
 """
 
-import random
 import pytest
 from midiogre.augmentations.note_delete import NoteDelete
-from tests.core_mocks import generate_mock_midi_data
+from tests.core_mocks import MockGenerator, generate_mock_midi_data
 import numpy as np
 
 
@@ -23,22 +22,21 @@ def test_apply_enough_notes(note_delete_instance, monkeypatch):
 
     # Mock random generation to delete exactly 20% of notes
     def mock_uniform(low, high, size=None):
-        return note_delete_instance.p  # Return p to delete maximum number of notes
+        return np.full(size, note_delete_instance.p)  # Return p to delete maximum number of notes
 
-    def mock_choice(population, size=None, replace=False):
-        if isinstance(population, int):
-            population = range(population)
-        return list(range(size))  # Return first 'size' indices deterministically
+    # Mock random sort keys so that the last notes are deleted
+    def mock_random(size=None):
+        return np.linspace(0.9, 0.0, size)
 
-    monkeypatch.setattr(np.random, 'uniform', mock_uniform)
-    monkeypatch.setattr(np.random, 'choice', mock_choice)
+    monkeypatch.setattr(note_delete_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(note_delete_instance.rng, 'uniform', mock_uniform)
+    monkeypatch.setattr(note_delete_instance.rng, 'random', mock_random)
 
     # Apply note deletion
     modified_midi_data = note_delete_instance.apply(midi_data)
 
-    # Ensure that the correct number of notes have been deleted
-    # With p=0.2, expect 20% of notes to be deleted (2 notes), leaving 8 notes
-    assert len(modified_midi_data.instruments[0].notes) == 8
+    # With p=0.2, expect 20% of notes to be deleted (2 notes), leaving the first 8 notes
+    assert [note.pitch for note in modified_midi_data.instruments[0].notes] == list(range(60, 68))
 
 
 def test_apply_not_enough_notes(note_delete_instance, monkeypatch):
@@ -47,21 +45,20 @@ def test_apply_not_enough_notes(note_delete_instance, monkeypatch):
 
     # Mock random generation to return values that preserve all notes
     def mock_uniform(low, high, size=None):
-        return 0  # Return 0 to ensure no notes are deleted
+        return np.zeros(size)  # Return 0 to ensure no notes are deleted
 
-    def mock_choice(population, size=None, replace=False):
-        if isinstance(population, int):
-            population = range(population)
-        return list(population)[:size]  # Return all indices to keep all notes
+    def mock_random(size=None):
+        return np.linspace(0.9, 0.0, size)
 
-    monkeypatch.setattr(np.random, 'uniform', mock_uniform)
-    monkeypatch.setattr(np.random, 'choice', mock_choice)
+    monkeypatch.setattr(note_delete_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(note_delete_instance.rng, 'uniform', mock_uniform)
+    monkeypatch.setattr(note_delete_instance.rng, 'random', mock_random)
 
     # Apply note deletion
     modified_midi_data = note_delete_instance.apply(midi_data)
 
     # Ensure that all notes have been preserved
-    assert len(modified_midi_data.instruments[0].notes) == 2
+    assert [note.pitch for note in modified_midi_data.instruments[0].notes] == [60, 61]
 
 
 if __name__ == '__main__':
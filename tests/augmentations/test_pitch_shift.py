@@ -3,14 +3,13 @@ As an experiment, this script was initially generated using ChatGPT September 25
 It was subsequently modified to fix errors and better cover the concerned code.
 """
 
-import random
 import time
 
 import numpy as np
 import pytest
 
 from midiogre.augmentations.pitch_shift import PitchShift, VALID_MODES
-from tests.core_mocks import generate_mock_midi_data
+from tests.core_mocks import MockGenerator, generate_mock_midi_data
 
 
 @pytest.fixture
@@ -95,7 +94,8 @@ def test_note_selection(pitch_shift_instance, monkeypatch):
             return 5
         return np.full(size, 5)
     
-    monkeypatch.setattr(np.random, 'randint', mock_randint)
+    monkeypatch.setattr(pitch_shift_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(pitch_shift_instance.rng, 'integers', mock_randint)
     
     modified_midi = pitch_shift_instance.apply(midi_data)
     
@@ -140,11 +140,12 @@ def test_original_notes_unchanged(pitch_shift_instance, monkeypatch):
     original_num_notes = 10
     midi_data = generate_mock_midi_data(num_notes=original_num_notes)
     
-    # Mock random.sample to always select the first 3 notes
-    def mock_sample(population, k):
-        return population[:3]
+    # Mock the random selection keys so that the first notes (3 with p=0.3) are selected
+    def mock_random(size=None):
+        return np.arange(size, dtype=float)
     
-    monkeypatch.setattr(random, 'sample', mock_sample)
+    monkeypatch.setattr(pitch_shift_instance, 'rng', MockGenerator())
+    monkeypatch.setattr(pitch_shift_instance.rng, 'random', mock_random)
     
     # Mock random shifts to be constant
     def mock_randint(low, high, size=None):
@@ -152,7 +153,7 @@ def test_original_notes_unchanged(pitch_shift_instance, monkeypatch):
             return 5
         return np.full(size, 5)
     
-    monkeypatch.setattr(np.random, 'randint', mock_randint)
+    monkeypatch.setattr(pitch_shift_instance.rng, 'integers', mock_randint)
     
     modified_midi = pitch_shift_instance.apply(midi_data)
     
@@ -2,11 +2,15 @@
 Test cases for the TempoShift augmentation class.
 """
 
+import io
+
 import pytest
 from mido import MidiFile, MetaMessage, Message, MidiTrack
 import numpy as np
+import pretty_midi
 
 from midiogre.augmentations.tempo_shift import TempoShift, VALID_MODES
+from midiogre.core import NoteTable
 
 
 def create_mock_midi_with_tempo(tempo=500000):  # 120 BPM by default
@@ -244,5 +248,112 @@ def test_performance():
     assert end_time - start_time < 0.1  # Should complete in under 100ms
 
 
+def absolute_ticks(track):
+    """Helper function to list the (absolute tick, type) of every event of a track."""
+    ticks = np.cumsum([event.time for event in track]).tolist()
+    return [(tick, event.type) for tick, event in zip(ticks, track)]
+
+
+@pytest.mark.parametrize('respect_tempo_shifts', [True, False])
+def test_events_keep_their_ticks(respect_tempo_shifts):
+    """Test that tempo events are replaced in place and no other event moves."""
+    midi_data = MidiFile()
+    track = MidiTrack()
+    midi_data.tracks.append(track)
+    track.append(MetaMessage('set_tempo', tempo=500000, time=0))
+    track.append(Message('note_on', note=60, velocity=64, time=480))
+    track.append(MetaMessage('set_tempo', tempo=400000, time=240))
+    track.append(Message('note_off', note=60, velocity=64, time=240))
+    track.append(MetaMessage('set_tempo', tempo=300000, time=100))
+    track.append(MetaMessage('end_of_track', time=50))
+    original = absolute_ticks(track)
+
+    TempoShift(max_shift=10, p=1.0, respect_tempo_shifts=respect_tempo_shifts)(midi_data)
+    events = absolute_ticks(midi_data.tracks[0])
+
+    if respect_tempo_shifts:
+        assert events == original
+    else:
+        assert events == [(0, 'set_tempo')] + [event for event in original if event[1] != 'set_tempo']
+    assert events[-1] == (1110, 'end_of_track')
+
+
+def create_pretty_midi_with_tempo_changes():
+    """Helper function to create a PrettyMIDI object with tempo changes, events and meta data."""
+    midi_file = create_mock_midi_with_tempo(tempo=500000)
+    track = midi_file.tracks[0]
+    track.insert(1, MetaMessage('time_signature', numerator=3, denominator=4, time=0))
+    track.insert(2, Message('control_change', control=64, value=100, time=0))
+    track.append(MetaMessage('set_tempo', tempo=400000, time=0))  # 150 BPM from tick 960
+    track.append(MetaMessage('lyrics', text='la', time=240))
+    track.append(Message('note_on', note=64, velocity=64, time=0))
+    track.append(Message('pitchwheel', pitch=1000, time=240))
+    track.append(Message('note_off', note=64, velocity=64, time=480))
+
+    midi_bytes = io.BytesIO()
+    midi_file.save(file=midi_bytes)
+    midi_bytes.seek(0)
+    return pretty_midi.PrettyMIDI(midi_bytes)
+
+
+def test_pretty_midi_keeps_ticks():
+    """Test that shifting a PrettyMIDI object rescales all times while keeping ticks."""
+    midi_data = create_pretty_midi_with_tempo_changes()
+    original = create_pretty_midi_with_tempo_changes()
+    tempo_shift = TempoShift(max_shift=20, mode='up', p=1.0)
+
+    transformed = tempo_shift(midi_data)
+    _, tempi = transformed.get_tempo_changes()
+
+    assert transformed is midi_data
+    assert len(tempi) == 2 and 120 <= tempi[0] <= 140 and 150 <= tempi[1] <= 170
+    notes = transformed.instruments[0].notes
+    original_notes = original.instruments[0].notes
+    assert [transformed.time_to_tick(note.start) for note in notes] == \
+           [original.time_to_tick(note.start) for note in original_notes] == [480, 1200]
+    assert [transformed.time_to_tick(note.end) for note in notes] == [960, 1920]
+    assert transformed.time_to_tick(transformed.instruments[0].pitch_bends[0].time) == 1440
+    assert transformed.time_to_tick(transformed.lyrics[0].time) == 1200
+    assert notes[1].end < original_notes[1].end
+
+
+@pytest.mark.parametrize('respect_tempo_shifts', [True, False])
+def test_pretty_midi_matches_mido(respect_tempo_shifts):
+    """Test that shifting a PrettyMIDI object equals shifting and reloading its file."""
+    midi_data = create_pretty_midi_with_tempo_changes()
+    midi_bytes = io.BytesIO()
+    midi_data.write(midi_bytes)
+    midi_bytes.seek(0)
+    tempo_shift = TempoShift(max_shift=30, p=1.0, respect_tempo_shifts=respect_tempo_shifts)
+
+    tempo_shift.reseed(3)
+    transformed = tempo_shift(midi_data)
+    tempo_shift.reseed(3)
+    mido_transformed = tempo_shift(MidiFile(file=midi_bytes))
+    midi_bytes = io.BytesIO()
+    mido_transformed.save(file=midi_bytes)
+    midi_bytes.seek(0)
+    expected = pretty_midi.PrettyMIDI(midi_bytes)
+
+    assert np.allclose(transformed.get_tempo_changes()[1], expected.get_tempo_changes()[1])
+    assert np.allclose([note.end for note in transformed.instruments[0].notes],
+                       [note.end for note in expected.instruments[0].notes])
+    assert np.isclose(transformed.get_end_time(), expected.get_end_time())
+
+
+def test_note_table():
+    """Test that NoteTables are rescaled as if they were at 120 BPM."""
+    note_table = NoteTable(pitch=[60, 62], velocity=[80, 80], start=[0.0, 1.0], end=[0.5, 2.0], instrument=[0, 0])
+    original_end = note_table.end.copy()
+    tempo_shift = TempoShift(max_shift=30, mode='up', tempo_range=(30, 240), p=1.0)
+
+    transformed = tempo_shift(note_table)
+    ratio = transformed.end / original_end
+
+    assert np.allclose(ratio, ratio[0]) and 0.8 <= ratio[0] < 1.0
+    assert np.isclose(transformed.start[1], ratio[0])
+    assert np.array_equal(TempoShift(max_shift=30, p=0.0)(transformed.copy()).end, transformed.end)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v']) 
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import pickle
+
+import mido
+import pretty_midi
+import pytest
+
+from midiogre.core import CorpusCache, MidiCache, NoteTable
+from midiogre.core.cache import _estimate_nbytes
+from midiogre.core.conversions import ConvertToMido, ConvertToNoteTable, ConvertToPrettyMIDI
+from tests.core_mocks import write_midi
+
+
+class CountingLoader:
+    """Loader that counts how often it parses a file."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return pretty_midi.PrettyMIDI(path)
+
+
+def test_hits_return_independent_clones(tmp_path):
+    """Test that a cached file is parsed once and every lookup returns a new copy."""
+    path = write_midi(tmp_path / 'song.mid')
+    cache = MidiCache()
+    loader = CountingLoader()
+
+    first = cache.get(path, loader)
+    first.instruments[0].notes[0].pitch = 0
+    second = cache.get(path, loader)
+
+    assert loader.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second is not first
+    assert second.instruments[0].notes[0].pitch == 60
+    assert len(cache) == 1 and cache.nbytes > 0
+
+
+def test_invalidated_when_file_changes(tmp_path):
+    """Test that a modified file is parsed again."""
+    path = write_midi(tmp_path / 'song.mid')
+    cache = MidiCache()
+    loader = CountingLoader()
+    cache.get(path, loader)
+
+    write_midi(path, num_notes=12, pitch=70)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    midi_data = cache.get(path, loader)
+
+    assert loader.calls == 2
+    assert midi_data.instruments[0].notes[0].pitch == 70
+
+
+@pytest.mark.parametrize('policy, evicted', [('lru', 'a'), ('lfu', 'b')])
+def test_eviction(tmp_path, policy, evicted):
+    """Test that entries are evicted according to the policy once the budget is exceeded."""
+    paths = {name: write_midi(tmp_path / f'{name}.mid') for name in 'abcd'}
+    loader = CountingLoader()
+    probe = MidiCache()
+    probe.get(paths['a'], loader)
+    entry_nbytes = probe.nbytes
+
+    cache = MidiCache(max_bytes=3 * entry_nbytes, policy=policy)
+    for name in 'abc':
+        cache.get(paths[name], loader)
+    # 'a' becomes the most frequently but least recently used entry, 'b' the least
+    # frequently used one with the oldest use
+    for name in 'aaabc':
+        cache.get(paths[name], loader)
+    cache.get(paths['d'], loader)
+
+    assert len(cache) == 3
+    loader.calls = 0
+    cache.get(paths[evicted], loader)
+    assert loader.calls == 1
+
+
+def test_oversized_objects_not_cached(tmp_path):
+    """Test that objects larger than the budget are returned but not cached."""
+    path = write_midi(tmp_path / 'song.mid')
+    cache = MidiCache(max_bytes=10)
+    assert isinstance(cache.get(path, pretty_midi.PrettyMIDI), pretty_midi.PrettyMIDI)
+    assert len(cache) == 0
+
+
+def test_size_includes_tick_table(tmp_path):
+    """Test that the size of a PrettyMIDI object includes its tick-to-time table."""
+    midi_data = pretty_midi.PrettyMIDI(write_midi(tmp_path / 'song.mid', num_notes=1000))
+    assert _estimate_nbytes(midi_data) > midi_data._PrettyMIDI__tick_to_time.nbytes
+
+
+def test_invalid_parameters():
+    """Test that invalid budgets and policies are rejected."""
+    with pytest.raises(ValueError):
+        MidiCache(max_bytes=-1)
+    with pytest.raises(ValueError):
+        MidiCache(policy='fifo')
+
+
+def test_pickle_keeps_configuration_only(tmp_path):
+    """Test that pickled caches start empty, e.g. in DataLoader workers."""
+    cache = MidiCache(max_bytes=1000, policy='lfu')
+    cache.get(write_midi(tmp_path / 'song.mid'), pretty_midi.PrettyMIDI)
+    restored = pickle.loads(pickle.dumps(cache))
+    assert (restored.max_bytes, restored.policy, len(restored)) == (1000, 'lfu', 0)
+
+
+def test_converters_use_cache(tmp_path):
+    """Test that the file converters share one cache without mixing object types."""
+    path = write_midi(tmp_path / 'song.mid')
+    cache = MidiCache()
+    converters = [ConvertToPrettyMIDI(cache=cache), ConvertToMido(cache=cache), ConvertToNoteTable(cache=cache)]
+    types = [pretty_midi.PrettyMIDI, mido.MidiFile, NoteTable]
+
+    for _ in range(2):
+        for converter, expected_type in zip(converters, types):
+            assert isinstance(converter(path), expected_type)
+
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+@pytest.mark.parametrize('converter_class', [ConvertToPrettyMIDI, ConvertToNoteTable])
+def test_loaders_do_not_share_entries(tmp_path, converter_class):
+    """Test that converters reading files with different parsers or a corpus cache keep separate entries."""
+    path = write_midi(tmp_path / 'song.mid')
+    cache = MidiCache()
+    converters = [converter_class(cache=cache), converter_class(cache=cache, parser='native'),
+                  converter_class(cache=cache, corpus_cache=CorpusCache(tmp_path / 'corpus'))]
+
+    for _ in range(2):
+        for converter in converters:
+            converter(path)
+
+    assert (cache.hits, cache.misses) == (3, 3) and len(cache) == 3
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,95 @@
+import io
+
+import mido
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.augmentations import PitchShift
+from midiogre.core import Compose, NoteTable, clone
+from tests.core_mocks import create_midi
+
+
+def create_parsed_midi():
+    """Helper function to create a parsed PrettyMIDI object with notes, events and meta data."""
+    # Round trip through a file so that all timing tables are populated
+    midi_file = io.BytesIO()
+    create_midi(with_events=True).write(midi_file)
+    midi_file.seek(0)
+    return pretty_midi.PrettyMIDI(midi_file)
+
+
+def test_clone_pretty_midi():
+    """Test that a cloned PrettyMIDI object is equal to but independent of the original."""
+    midi_data = create_parsed_midi()
+    cloned = clone(midi_data)
+
+    assert cloned is not midi_data
+    assert cloned.resolution == midi_data.resolution
+    assert cloned.get_end_time() == midi_data.get_end_time()
+    assert np.allclose(cloned.get_tempo_changes()[1], midi_data.get_tempo_changes()[1])
+    assert [ts.numerator for ts in cloned.time_signature_changes] == [3]
+    assert [lyric.text for lyric in cloned.lyrics] == ['la']
+
+    for original, copied in zip(midi_data.instruments, cloned.instruments):
+        assert copied is not original
+        assert (copied.program, copied.name, copied.is_drum) == (original.program, original.name, original.is_drum)
+        assert [(n.pitch, n.velocity, n.start, n.end) for n in copied.notes] == \
+               [(n.pitch, n.velocity, n.start, n.end) for n in original.notes]
+        assert copied.notes[0] is not original.notes[0]
+        assert copied.control_changes[0] is not original.control_changes[0]
+        assert copied.pitch_bends[0].pitch == original.pitch_bends[0].pitch
+
+    cloned.instruments[0].notes[0].pitch = 0
+    cloned.instruments[0].notes.pop()
+    cloned.lyrics[0].text = 'changed'
+    assert midi_data.instruments[0].notes[0].pitch == 60
+    assert len(midi_data.instruments[0].notes) == 10
+    assert midi_data.lyrics[0].text == 'la'
+
+
+def test_clone_without_notes():
+    """Test cloning only the structure of a PrettyMIDI object."""
+    midi_data = create_parsed_midi()
+    cloned = clone(midi_data, notes=False)
+    assert all(len(instrument.notes) == 0 for instrument in cloned.instruments)
+    assert all(len(instrument.control_changes) == 1 for instrument in cloned.instruments)
+    assert len(midi_data.instruments[0].notes) == 10
+
+
+def test_clone_other_types():
+    """Test cloning NoteTable, Mido and other objects."""
+    note_table = NoteTable.from_pretty_midi(create_parsed_midi())
+    cloned_table = clone(note_table)
+    cloned_table.pitch[:] = 0
+    assert note_table.pitch[0] == 60
+
+    midi_file = io.BytesIO()
+    create_parsed_midi().write(midi_file)
+    midi_file.seek(0)
+    mido_data = mido.MidiFile(file=midi_file)
+    cloned_mido = clone(mido_data)
+    assert len(cloned_mido.tracks) == len(mido_data.tracks)
+    assert cloned_mido.tracks[1][0] == mido_data.tracks[1][0]
+    assert cloned_mido.tracks[1][0] is not mido_data.tracks[1][0]
+    assert cloned_mido.ticks_per_beat == mido_data.ticks_per_beat
+
+    events = {'notes': [1, 2]}
+    assert clone(events) == events and clone(events)['notes'] is not events['notes']
+
+
+def test_compose_copy():
+    """Test that a copying composition leaves its input untouched."""
+    midi_data = create_parsed_midi()
+    transform = Compose([PitchShift(max_shift=12, mode='up', p=1.0)], copy=True)
+
+    transformed = transform(midi_data)
+    batch = transform.apply_batch([midi_data])
+
+    assert transformed is not midi_data and batch[0] is not midi_data
+    assert [note.pitch for note in midi_data.instruments[0].notes] == list(range(60, 70))
+    assert all(note.pitch >= 60 for note in transformed.instruments[0].notes)
+
+
+if __name__ == '__main__':
+    pytest.main()
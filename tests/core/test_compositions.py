@@ -3,10 +3,22 @@ As an experiment, this script was initially generated using ChatGPT 4 April 2023
 It was subsequently modified to fix errors and better cover the concerned code.
 """
 
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pretty_midi
 import pytest
 from pretty_midi import PrettyMIDI
 
+from midiogre.augmentations import NoteAdd, NoteDelete, PitchShift
+from midiogre.core import NoteTable, ToPRollNumpy
 from midiogre.core.compositions import Compose
+from midiogre.core.conversions import ConvertToPrettyMIDI
+from tests.core_mocks import create_midi
+
+# Instruments of constant pitch 60, the last a drum track
+MIDI_KWARGS = dict(num_notes=20, pitch_step=0, drum_last=True)
 
 
 def test_initialization():
@@ -73,5 +85,187 @@ def test_transforms_functionality():
     assert result.estimate_tempo() == 240
 
 
+def test_apply_batch_single_draw(monkeypatch):
+    """Test that a batched transform draws shifts once for the whole batch."""
+    transform = PitchShift(max_shift=5, p=1.0)
+    calls = []
+    generate_shifts = transform._generate_shifts
+
+    def counting_generate_shifts(num_shifts):
+        calls.append(num_shifts)
+        return generate_shifts(num_shifts)
+
+    monkeypatch.setattr(transform, '_generate_shifts', counting_generate_shifts)
+    batch = [create_midi(**MIDI_KWARGS) for _ in range(4)]
+    result = transform.apply_batch(batch)
+
+    assert calls == [4 * 20]
+    assert all(output is midi_data for output, midi_data in zip(result, batch))
+    for midi_data in result:
+        assert len(midi_data.instruments[0].notes) == 20
+        # Drum instruments are left untouched
+        assert all(note.pitch == 60 for note in midi_data.instruments[1].notes)
+
+
+def test_compose_apply_batch():
+    """Test batched composition across note-level transforms and plain callables."""
+    composer = Compose([
+        PitchShift(max_shift=2, p=1.0),
+        NoteAdd(note_num_range=(60, 72), note_velocity_range=(60, 100), note_duration_range=(0.1, 0.5), p=0.5),
+        lambda midi: midi,
+        PitchShift(max_shift=0, p=1.0),
+    ])
+    result = composer.apply_batch([create_midi(**MIDI_KWARGS),
+                                   NoteTable.from_pretty_midi(create_midi(num_instruments=3, **MIDI_KWARGS))])
+
+    assert len(result) == 2
+    assert isinstance(result[0], PrettyMIDI)
+    assert isinstance(result[1], NoteTable)
+    result[1] = ConvertToPrettyMIDI()(result[1])
+    assert [len(midi_data.instruments) for midi_data in result] == [2, 3]
+    for midi_data in result:
+        assert 20 < len(midi_data.instruments[0].notes) <= 30
+        assert all(58 <= note.pitch <= 72 for note in midi_data.instruments[0].notes)
+
+
+def test_apply_batch_selects_instruments_per_file():
+    """Test that p_instruments is applied to each file of a batch separately."""
+    transform = PitchShift(max_shift=5, p_instruments=0.5, p=1.0)
+    note_tables = [NoteTable.from_pretty_midi(create_midi(num_instruments=3, **MIDI_KWARGS)) for _ in range(8)]
+    for note_table in note_tables:
+        note_table.pitch[:] = 0
+
+    for note_table in transform.apply_batch(note_tables):
+        shifted_instruments = np.unique(note_table.instrument[note_table.pitch != 0])
+        assert len(shifted_instruments) <= 1
+        assert 2 not in shifted_instruments
+
+
+def test_apply_batch_empty():
+    """Test batched composition of an empty batch."""
+    assert Compose([PitchShift(max_shift=2)]).apply_batch([]) == []
+
+
+def test_expand(monkeypatch):
+    """Test that expand parses once and returns independent variants."""
+    midi_data = create_midi(**MIDI_KWARGS)
+    midi_data.instruments[0].control_changes.append(pretty_midi.ControlChange(number=64, value=100, time=0.5))
+    conversions = []
+    from_pretty_midi = NoteTable.from_pretty_midi
+
+    def counting_from_pretty_midi(midi):
+        conversions.append(midi)
+        return from_pretty_midi(midi)
+
+    monkeypatch.setattr(NoteTable, 'from_pretty_midi', counting_from_pretty_midi)
+    composer = Compose([PitchShift(max_shift=12, p=1.0), lambda midi: midi])
+    variants = composer.expand(midi_data, k=4)
+
+    assert len(conversions) == 1
+    assert len(variants) == 4
+    assert len({id(variant) for variant in variants}) == 4
+    assert all(variant is not midi_data for variant in variants)
+    # The input is left untouched
+    assert all(note.pitch == 60 for note in midi_data.instruments[0].notes)
+    # Variants are augmented independently
+    pitches = [tuple(note.pitch for note in variant.instruments[0].notes) for variant in variants]
+    assert len(set(pitches)) > 1
+    for variant in variants:
+        assert variant.resolution == midi_data.resolution
+        assert len(variant.instruments[0].notes) == 20
+        assert variant.instruments[0].control_changes[0].value == 100
+        assert variant.instruments[0].control_changes[0] is not midi_data.instruments[0].control_changes[0]
+
+
+def test_expand_note_table():
+    """Test expanding a NoteTable and expanding with no batchable transforms."""
+    note_table = NoteTable.from_pretty_midi(create_midi(**MIDI_KWARGS))
+    variants = Compose([PitchShift(max_shift=12, p=1.0)]).expand(note_table, k=3)
+    assert len(variants) == 3
+    assert all(isinstance(variant, NoteTable) and variant is not note_table for variant in variants)
+    assert np.all(note_table.pitch == 60)
+
+    variants = Compose([lambda midi: midi]).expand(note_table, k=2)
+    assert len(variants) == 2 and variants[0] is not variants[1]
+
+    with pytest.raises(ValueError):
+        Compose([]).expand(note_table, k=-1)
+
+
+def test_reseed():
+    """Test that reseeding a composition gives every transform its own reproducible stream."""
+    note_table = NoteTable.from_pretty_midi(create_midi(**MIDI_KWARGS))
+    transform = Compose([PitchShift(max_shift=12, p=1.0), ConvertToPrettyMIDI(), PitchShift(max_shift=12, p=1.0)])
+
+    transform.reseed(7)
+    first = transform.transforms[0].rng.random(4)
+    third = transform.transforms[2].rng.random(4)
+    assert not np.array_equal(first, third)
+
+    transform.reseed(7)
+    assert np.array_equal(transform.transforms[0].rng.random(4), first)
+    assert np.array_equal(transform.transforms[2].rng.random(4), third)
+
+    transform = Compose([PitchShift(max_shift=12, p=1.0)])
+    transform.reseed(np.random.SeedSequence(3))
+    expected = transform(note_table.copy()).pitch
+    transform.reseed(np.random.SeedSequence(3))
+    assert np.array_equal(transform(note_table.copy()).pitch, expected)
+
+
+def test_apply_threaded():
+    """Test that seeded threaded runs do not depend on the number of threads."""
+    note_tables = [NoteTable.from_pretty_midi(create_midi(**MIDI_KWARGS)) for _ in range(6)]
+    transform = Compose([PitchShift(max_shift=12, p=1.0)], copy=True)
+
+    serial = transform.apply_threaded(note_tables, num_threads=1, seed=5, epoch=2)
+    threaded = transform.apply_threaded(note_tables, num_threads=3, seed=5, epoch=2)
+    assert all(np.array_equal(a.pitch, b.pitch) for a, b in zip(serial, threaded))
+    assert not all(np.array_equal(serial[0].pitch, variant.pitch) for variant in serial[1:])
+    assert all(np.all(note_table.pitch == 60) for note_table in note_tables)
+
+    rolls = transform.apply_threaded(note_tables, num_threads=2, conversion=ToPRollNumpy(fs=10))
+    assert len(rolls) == 6 and all(isinstance(roll, np.ndarray) for roll in rolls)
+
+    with pytest.raises(ValueError):
+        transform.apply_threaded(note_tables, num_threads=0)
+
+
+@pytest.mark.parametrize('num_threads', [1, 2])
+def test_apply_threaded_keeps_caller_rng(num_threads):
+    """Test that seeded threaded runs leave the generators of the calling thread unchanged."""
+    pitch_shift = PitchShift(max_shift=12, p=1.0, seed=3)
+    transform = Compose([pitch_shift], copy=True)
+    rng = pitch_shift.rng
+    transform.apply_threaded([NoteTable.from_pretty_midi(create_midi(**MIDI_KWARGS))], num_threads=num_threads, seed=3)
+    assert pitch_shift.rng is rng
+
+
+def test_thread_local_generators():
+    """Test that threads draw from their own child streams of a transform's generator."""
+    transform = PitchShift(max_shift=12, seed=1)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        thread_rngs = list(executor.map(lambda _: transform.rng, range(2)))
+    assert all(rng is not transform.rng for rng in thread_rngs)
+    assert not np.array_equal(thread_rngs[0].random(4), transform.rng.random(4))
+
+
+@pytest.mark.skipif(getattr(sys, '_is_gil_enabled', lambda: True)(), reason="requires a free-threaded build")
+def test_apply_threaded_under_contention():
+    """Test that many threads sharing a profiled composition lose no calls and keep their random streams."""
+    transform = Compose([PitchShift(max_shift=12, p=0.5, seed=1), NoteDelete(p=0.1, seed=2)], profile=True)
+    note_tables = [NoteTable.from_pretty_midi(create_midi(**MIDI_KWARGS)) for _ in range(512)]
+
+    serial = transform.apply_threaded([note_table.copy() for note_table in note_tables], num_threads=1, seed=0)
+    for _ in range(4):
+        threaded = transform.apply_threaded([note_table.copy() for note_table in note_tables], num_threads=32, seed=0)
+        assert all(np.array_equal(a.pitch, b.pitch) for a, b in zip(serial, threaded))
+
+    transform.reset_stats()
+    for _ in range(4):
+        transform.apply_threaded([note_table.copy() for note_table in note_tables], num_threads=32)
+    assert [stats['calls'] for stats in transform.stats().values()] == [2048, 2048]
+
+
 if __name__ == '__main__':
     pytest.main()
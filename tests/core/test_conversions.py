@@ -4,6 +4,10 @@ import torch
 import pretty_midi
 
 from midiogre.core.conversions import BaseConversion, ToPRollNumpy, ToPRollTensor
+from tests.core_mocks import create_midi
+
+# Three instruments of velocity 100 to 102 playing the same two notes at once
+MIDI_KWARGS = dict(num_instruments=3, num_notes=2, pitch_step=4, velocity=100)
 
 
 def test_base_conversion_not_implemented():
@@ -46,5 +50,64 @@ def test_toprolltensor_apply():
     assert piano_roll.device.type == 'cpu'
 
 
+
+def test_toprollnumpy_binarize():
+    """Test that ToPRollNumpy honors binarize and dtype."""
+    midi_data = create_midi(**MIDI_KWARGS)
+    piano_roll = ToPRollNumpy(fs=10)(midi_data)
+    assert piano_roll.dtype == np.float64 and piano_roll.max() == 303
+
+    binarized = ToPRollNumpy(binarize=True, fs=10)(midi_data)
+    assert np.array_equal(binarized, (piano_roll > 0).astype(np.float64))
+    assert ToPRollNumpy(fs=10, dtype='uint8')(midi_data).max() == 255
+
+    with pytest.raises(ValueError):
+        ToPRollNumpy(dtype='int32')
+
+
+@pytest.mark.parametrize('dtype', ['bool', 'uint8', 'float16', 'float32', torch.uint8, torch.bool])
+def test_toprolltensor_dtype(dtype):
+    """Test that ToPRollTensor returns rolls of the requested data type."""
+    midi_data = create_midi(**MIDI_KWARGS)
+    expected = ToPRollNumpy(fs=10)(midi_data)
+    piano_roll = ToPRollTensor(fs=10, dtype=dtype)(midi_data)
+
+    name = str(dtype).replace('torch.', '')
+    assert piano_roll.dtype == getattr(torch, name) and piano_roll.shape == expected.shape
+    if name == 'bool':
+        assert np.array_equal(piano_roll.numpy(), expected > 0)
+    elif name == 'uint8':
+        assert np.array_equal(piano_roll.numpy(), np.minimum(expected, 255))
+    else:
+        assert np.array_equal(piano_roll.numpy(), expected)
+
+
+def test_toprolltensor_defaults():
+    """Test that ToPRollTensor returns float32 velocities by default and binarizes on request."""
+    midi_data = create_midi(**MIDI_KWARGS)
+    assert ToPRollTensor(fs=10)(midi_data).dtype == torch.float32
+    assert ToPRollTensor(fs=10, binarize=True)(midi_data).unique().tolist() == [0.0, 1.0]
+
+
+def test_toprolltensor_out():
+    """Test that ToPRollTensor writes rolls into slices of a preallocated batch."""
+    midi_data = create_midi(**MIDI_KWARGS)
+    converter = ToPRollTensor(fs=10, dtype=torch.uint8)
+    expected = converter(midi_data)
+
+    batch = torch.full((3, 128, 30), 7, dtype=torch.uint8)
+    row = batch[1]
+    assert converter(midi_data, out=row) is row
+    assert torch.equal(batch[1, :, :15], expected) and not batch[1, :, 15:].any()
+    assert (batch[0] == 7).all() and (batch[2] == 7).all()
+
+    window = torch.empty((128, 5), dtype=torch.uint8)
+    converter(midi_data, out=window)
+    assert torch.equal(window, expected[:, :5])
+
+    with pytest.raises(ValueError):
+        converter(midi_data, out=torch.empty((128, 5)))
+
+
 if __name__ == '__main__':
     pytest.main()
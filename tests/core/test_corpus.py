@@ -0,0 +1,151 @@
+import os
+import pickle
+
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.augmentations import PitchShift
+from midiogre.core import CorpusCache, NoteTable
+from midiogre.core import corpus
+from midiogre.core.corpus import ShardedCorpus, write_sharded_corpus
+from midiogre.core.conversions import ConvertToNoteTable, ConvertToPrettyMIDI
+from tests.core_mocks import write_midi
+
+# Three instruments, the last a drum track, with a tempo change, meta events and controls
+MIDI_KWARGS = dict(num_notes=12, num_instruments=3, drum_last=True, with_events=True)
+
+
+def test_round_trip_matches_parsed_file(tmp_path):
+    """Test that cached files load into the same PrettyMIDI data as parsing them."""
+    path = write_midi(tmp_path / 'song.mid', **MIDI_KWARGS)
+    expected = pretty_midi.PrettyMIDI(path)
+    corpus_cache = CorpusCache(tmp_path / 'cache')
+
+    for _ in range(2):  # Written on the first call, read back on the second
+        midi_data = corpus_cache.load_pretty_midi(path)
+        assert midi_data.resolution == expected.resolution
+        assert np.allclose(midi_data.get_tempo_changes()[1], expected.get_tempo_changes()[1])
+        assert midi_data.time_to_tick(5.0) == expected.time_to_tick(5.0)
+        assert midi_data.get_end_time() == expected.get_end_time()
+        assert [ks.key_number for ks in midi_data.key_signature_changes] == [5]
+        assert [ts.numerator for ts in midi_data.time_signature_changes] == [3]
+        assert [lyric.text for lyric in midi_data.lyrics] == ['la']
+        assert np.array_equal(midi_data.get_piano_roll(), expected.get_piano_roll())
+        for original, loaded in zip(expected.instruments, midi_data.instruments):
+            assert (loaded.program, loaded.is_drum, loaded.name) == (original.program, original.is_drum, original.name)
+            assert [(n.pitch, n.start, n.end) for n in loaded.notes] == [(n.pitch, n.start, n.end) for n in original.notes]
+            assert len(loaded.control_changes) == len(original.control_changes)
+
+    assert len(list((tmp_path / 'cache').glob('*.npz'))) == 1
+
+
+def test_invalidated_when_file_changes(tmp_path):
+    """Test that entries of modified files are rebuilt."""
+    path = write_midi(tmp_path / 'song.mid', **MIDI_KWARGS)
+    corpus_cache = CorpusCache(tmp_path / 'cache')
+    assert corpus_cache.load_note_table(path).pitch[0] == 60
+
+    write_midi(path, pitch=70, **MIDI_KWARGS)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert corpus_cache.load_note_table(path).pitch[0] == 70
+
+
+def test_corrupt_entries_are_rebuilt(tmp_path):
+    """Test that truncated entries and entries missing a field are rebuilt."""
+    path = write_midi(tmp_path / 'song.mid', **MIDI_KWARGS)
+    corpus_cache = CorpusCache(tmp_path / 'cache')
+    corpus_cache.build([path])
+    entry_path = corpus_cache.entry_path(path)
+
+    entry_path.write_bytes(entry_path.read_bytes()[:entry_path.stat().st_size // 2])
+    assert len(corpus_cache.load_note_table(path)) == 36
+
+    np.savez(entry_path, version=np.array(corpus.CACHE_FORMAT_VERSION))
+    assert corpus_cache.build([path]) == []
+    assert len(corpus_cache.load_note_table(path)) == 36
+    with np.load(entry_path) as entry:
+        assert 'source_size' in entry
+
+
+def test_build(tmp_path):
+    """Test preprocessing a directory, skipping files that cannot be parsed."""
+    midi_dir = tmp_path / 'midi'
+    (midi_dir / 'nested').mkdir(parents=True)
+    write_midi(midi_dir / 'a.mid', **MIDI_KWARGS)
+    write_midi(midi_dir / 'nested' / 'b.MIDI', **MIDI_KWARGS)
+    (midi_dir / 'broken.mid').write_bytes(b'not a midi file')
+    (midi_dir / 'notes.txt').write_text('ignored')
+
+    corpus_cache = CorpusCache(tmp_path / 'cache')
+    failed = corpus_cache.build(midi_dir)
+
+    assert failed == [str(midi_dir / 'broken.mid')]
+    assert len(list((tmp_path / 'cache').glob('*.npz'))) == 2
+    with pytest.raises(Exception):
+        corpus_cache.build([str(midi_dir / 'broken.mid')], skip_errors=False)
+
+
+def test_converters_read_from_cache(tmp_path, monkeypatch):
+    """Test that converters read built entries without parsing the files again."""
+    path = write_midi(tmp_path / 'song.mid', **MIDI_KWARGS)
+    corpus_cache = CorpusCache(tmp_path / 'cache')
+    corpus_cache.build([path])
+
+    def fail_to_parse(*args, **kwargs):
+        raise AssertionError("The file should be read from the cache")
+
+    monkeypatch.setattr(corpus.CorpusCache, '_write_entry', fail_to_parse)
+    assert isinstance(ConvertToPrettyMIDI(corpus_cache=corpus_cache)(path), pretty_midi.PrettyMIDI)
+    note_table = ConvertToNoteTable(corpus_cache=corpus_cache)(path)
+    assert isinstance(note_table, NoteTable) and len(note_table) == 36
+
+
+def test_sharded_corpus(tmp_path):
+    """Test that sharded items match the parsed files and are zero-copy views."""
+    midi_dir = tmp_path / 'midi'
+    midi_dir.mkdir()
+    paths = [write_midi(midi_dir / f'{idx}.mid', pitch=40 + idx, **MIDI_KWARGS) for idx in range(5)]
+    (midi_dir / 'broken.mid').write_bytes(b'not a midi file')
+
+    # 36 notes per file, so two files fit into each shard
+    failed = write_sharded_corpus(midi_dir, tmp_path / 'shards', max_notes_per_shard=80)
+    sharded = ShardedCorpus(tmp_path / 'shards')
+
+    assert failed == [str(midi_dir / 'broken.mid')]
+    assert sharded.paths == paths
+    assert len(sharded) == 5 and sharded.num_notes == 5 * 36
+    assert len(list((tmp_path / 'shards').glob('shard-*'))) == 3
+
+    for idx, path in enumerate(paths):
+        expected = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI(path))
+        note_table = sharded[idx]
+        for name in ('pitch', 'velocity', 'start', 'end', 'instrument', 'programs', 'is_drum',
+                     'control_changes', 'pitch_bends'):
+            assert np.array_equal(getattr(note_table, name), getattr(expected, name))
+        assert note_table.names == expected.names
+        assert isinstance(note_table.pitch.base, np.memmap) or isinstance(note_table.pitch.base.base, np.memmap)
+        assert not note_table.pitch.flags.writeable
+
+    assert sharded[-1].pitch[0] == 44
+    with pytest.raises(IndexError):
+        sharded[5]
+
+
+def test_sharded_items_are_copied_on_write(tmp_path):
+    """Test that transforming an item never modifies the shards."""
+    path = write_midi(tmp_path / 'song.mid', **MIDI_KWARGS)
+    write_sharded_corpus([path], tmp_path / 'shards')
+    sharded = ShardedCorpus(tmp_path / 'shards')
+
+    transformed = PitchShift(max_shift=5, mode='up', p=1.0)(sharded[0])
+    transformed.pitch[:] = 0
+
+    reloaded = pickle.loads(pickle.dumps(sharded))
+    assert reloaded[0].pitch[0] == 60
+    assert ShardedCorpus(tmp_path / 'shards')[0].pitch[0] == 60
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,155 @@
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.augmentations import DurationShift, NoteAdd, NoteDelete, OnsetTimeShift, PitchShift
+from midiogre.core import Compose, NoteTable
+from midiogre.core.conversions import ConvertToNoteTable, ConvertToPrettyMIDI
+from tests.core_mocks import create_midi
+
+
+def test_from_pretty_midi():
+    """Test that all notes and instrument metadata are read."""
+    midi_data = create_midi(num_instruments=2, num_notes=5, drum_last=True)
+    note_table = NoteTable.from_pretty_midi(midi_data)
+
+    assert len(note_table) == 10
+    assert note_table.num_instruments == 2
+    assert list(note_table.instrument) == [0] * 5 + [1] * 5
+    assert list(note_table.programs) == [0, 1]
+    assert list(note_table.is_drum) == [False, True]
+    assert note_table.names == ['inst0', 'inst1']
+    assert np.array_equal(note_table.pitch[:5], np.arange(60, 65))
+    assert np.array_equal(note_table.start[:5], np.arange(5, dtype=float))
+
+
+def test_empty_midi():
+    """Test conversion of a MIDI object without instruments."""
+    note_table = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI())
+    assert len(note_table) == 0
+    assert note_table.num_instruments == 0
+    assert len(note_table.to_pretty_midi().instruments) == 0
+
+
+def test_mismatched_lengths():
+    """Test that inconsistent arrays are rejected."""
+    with pytest.raises(ValueError):
+        NoteTable(pitch=[60, 61], velocity=[70], start=[0, 1], end=[1, 2], instrument=[0, 0])
+    with pytest.raises(ValueError):
+        NoteTable(pitch=[60], velocity=[70], start=[0], end=[1], instrument=[1], programs=[0])
+
+
+def test_round_trip():
+    """Test that writing a table into a new PrettyMIDI object preserves everything."""
+    midi_data = create_midi()
+    round_trip = NoteTable.from_pretty_midi(midi_data).to_pretty_midi()
+
+    assert len(round_trip.instruments) == len(midi_data.instruments)
+    for original, converted in zip(midi_data.instruments, round_trip.instruments):
+        assert converted.program == original.program
+        assert converted.name == original.name
+        assert [(n.pitch, n.velocity, n.start, n.end) for n in converted.notes] == \
+               [(n.pitch, n.velocity, n.start, n.end) for n in original.notes]
+
+
+def test_write_back_in_place():
+    """Test that writing back groups appended notes with their instrument."""
+    midi_data = create_midi(num_instruments=2, num_notes=3)
+    first_note = midi_data.instruments[0].notes[0]
+    note_table = NoteTable.from_pretty_midi(midi_data)
+    note_table.pitch[0] = 100
+    note_table.append(pitch=[90], velocity=[50], start=[0.5], end=[0.75], instrument=[0])
+
+    result = note_table.to_pretty_midi(midi_data)
+
+    assert result is midi_data
+    assert midi_data.instruments[0].notes[0] is first_note
+    assert first_note.pitch == 100
+    assert len(midi_data.instruments[0].notes) == 4
+    assert midi_data.instruments[0].notes[-1].pitch == 90
+    assert len(midi_data.instruments[1].notes) == 3
+
+
+def test_filter():
+    """Test that filtering keeps the selected notes in order."""
+    note_table = NoteTable.from_pretty_midi(create_midi(num_instruments=1, num_notes=4))
+    note_table.filter(np.array([True, False, True, False]))
+    assert list(note_table.pitch) == [60, 62]
+
+
+def test_copy_is_independent():
+    """Test that copies do not share arrays."""
+    note_table = NoteTable.from_pretty_midi(create_midi())
+    copied = note_table.copy()
+    copied.pitch[:] = 0
+    assert note_table.pitch[0] == 60
+
+
+def test_concatenate_and_split():
+    """Test that splitting a merged table restores every input table."""
+    first = NoteTable.from_pretty_midi(create_midi(num_instruments=2, num_notes=3))
+    second = NoteTable.from_pretty_midi(create_midi(num_instruments=3, num_notes=4, drum_last=True))
+
+    merged = NoteTable.concatenate([first, second])
+    assert len(merged) == 18
+    assert merged.num_instruments == 5
+    assert list(merged.is_drum) == [False, False, False, False, True]
+
+    # Notes appended to the merged table end up in the right input table
+    merged.append(pitch=[90], velocity=[50], start=[0.5], end=[0.75], instrument=[0])
+    merged.append(pitch=[91], velocity=[50], start=[0.5], end=[0.75], instrument=[3])
+    first_split, second_split = merged.split([2, 3])
+
+    assert list(first_split.instrument) == [0, 0, 0, 1, 1, 1, 0]
+    assert list(first_split.pitch) == [60, 61, 62, 60, 61, 62, 90]
+    assert first_split.names == ['inst0', 'inst1']
+    assert len(second_split) == 13
+    assert second_split.instrument[-1] == 1 and second_split.pitch[-1] == 91
+    assert list(second_split.is_drum) == [False, False, True]
+
+    with pytest.raises(ValueError):
+        merged.split([2, 2])
+
+
+def test_instrument_groups():
+    """Test that instrument groups match per-instrument lookups."""
+    note_table = NoteTable.from_pretty_midi(create_midi(num_instruments=3, num_notes=4))
+    note_table.append(pitch=[90], velocity=[50], start=[0.5], end=[0.75], instrument=[0])
+    for instrument_idx, group in enumerate(note_table.instrument_groups()):
+        assert np.array_equal(group, note_table.instrument_indices(instrument_idx))
+
+
+def test_convert_to_note_table():
+    """Test conversion to and from NoteTable through the converters."""
+    midi_data = create_midi()
+    note_table = ConvertToNoteTable()(midi_data)
+    assert isinstance(note_table, NoteTable)
+    assert ConvertToNoteTable()(note_table) is note_table
+    assert isinstance(ConvertToPrettyMIDI()(note_table), pretty_midi.PrettyMIDI)
+
+
+def test_transforms_on_note_table():
+    """Test that every note-level transform runs natively on a NoteTable."""
+    note_table = NoteTable.from_pretty_midi(create_midi(num_instruments=3, num_notes=50, drum_last=True))
+    transform = Compose([
+        PitchShift(max_shift=5, p=1.0),
+        OnsetTimeShift(max_shift=0.1, p=1.0),
+        DurationShift(max_shift=0.1, p=1.0),
+        NoteDelete(p=0.5),
+        NoteAdd(note_num_range=(60, 72), note_velocity_range=(60, 100), note_duration_range=(0.1, 0.5), p=0.5)
+    ])
+
+    result = transform(note_table)
+
+    assert result is note_table
+    assert np.all((result.pitch >= 0) & (result.pitch <= 127))
+    assert np.all(result.start >= 0)
+    assert np.all(result.start <= result.end)
+
+    # Drum instruments are left untouched
+    drum_notes = result.instrument_indices(2)
+    assert np.array_equal(result.pitch[drum_notes], np.arange(60, 110))
+
+
+if __name__ == '__main__':
+    pytest.main()
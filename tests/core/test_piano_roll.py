@@ -0,0 +1,140 @@
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.core import NoteTable
+from midiogre.core.conversions import ToPRollNumpy
+from midiogre.core.piano_roll import PIANO_ROLL_DTYPES, get_piano_roll
+
+
+def create_random_midi(seed, num_instruments=3, num_notes=40, with_pedal=False, with_bends=False, with_drums=False):
+    """Helper function to create a random multi-instrument PrettyMIDI object."""
+    rng = np.random.default_rng(seed)
+    midi_data = pretty_midi.PrettyMIDI()
+    for instrument_idx in range(num_instruments):
+        is_drum = with_drums and instrument_idx == 0
+        instrument = pretty_midi.Instrument(program=0, is_drum=is_drum)
+        for start in rng.uniform(0, 10, num_notes):
+            instrument.notes.append(pretty_midi.Note(
+                velocity=int(rng.integers(1, 128)),
+                pitch=int(rng.integers(0, 128)),
+                start=start,
+                end=start + rng.uniform(0, 2)
+            ))
+        if with_pedal:
+            for time in np.sort(rng.uniform(0, 12, 8)):
+                instrument.control_changes.append(
+                    pretty_midi.ControlChange(number=64, value=int(rng.integers(0, 128)), time=time)
+                )
+        if with_bends:
+            for time in rng.uniform(0, 11, 4):
+                instrument.pitch_bends.append(pretty_midi.PitchBend(pitch=int(rng.integers(-8192, 8192)), time=time))
+        midi_data.instruments.append(instrument)
+    return midi_data
+
+
+def assert_matches_pretty_midi(midi_data, **kwargs):
+    expected = midi_data.get_piano_roll(**kwargs)
+    actual = get_piano_roll(NoteTable.from_pretty_midi(midi_data), **kwargs)
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected)
+
+
+@pytest.mark.parametrize('fs', [10, 100])
+def test_matches_pretty_midi(fs):
+    """Test that plain notes are rendered like pretty_midi."""
+    for seed in range(5):
+        assert_matches_pretty_midi(create_random_midi(seed), fs=fs)
+
+
+def test_sustain_pedal():
+    """Test that sustain pedal elongation matches pretty_midi."""
+    for seed in range(5):
+        midi_data = create_random_midi(seed, with_pedal=True)
+        assert_matches_pretty_midi(midi_data, fs=100)
+        assert_matches_pretty_midi(midi_data, fs=100, pedal_threshold=None)
+
+
+def test_pitch_bends():
+    """Test that pitch bends match pretty_midi."""
+    for seed in range(5):
+        assert_matches_pretty_midi(create_random_midi(seed, with_bends=True, with_pedal=True), fs=50)
+
+
+def test_drums_extend_roll():
+    """Test that drum instruments add no notes but still extend the roll."""
+    midi_data = create_random_midi(0, with_drums=True)
+    midi_data.instruments[0].notes.append(pretty_midi.Note(velocity=100, pitch=36, start=0.0, end=20.0))
+    assert_matches_pretty_midi(midi_data, fs=100)
+
+
+def test_times():
+    """Test resampling at arbitrary times."""
+    rng = np.random.default_rng(0)
+    for seed in range(5):
+        midi_data = create_random_midi(seed, with_pedal=True)
+        times = np.sort(rng.uniform(0, 15, 30))
+        assert_matches_pretty_midi(midi_data, fs=100, times=times)
+
+
+def test_empty():
+    """Test MIDI data without notes."""
+    assert get_piano_roll(NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI())).shape == (128, 0)
+
+    midi_data = pretty_midi.PrettyMIDI()
+    midi_data.instruments.append(pretty_midi.Instrument(program=0))
+    assert_matches_pretty_midi(midi_data, fs=100)
+
+
+def test_toprollnumpy_accepts_note_table():
+    """Test that ToPRollNumpy renders NoteTable and PrettyMIDI input identically."""
+    midi_data = create_random_midi(0)
+    converter = ToPRollNumpy(fs=50)
+    assert np.array_equal(converter(midi_data), converter(NoteTable.from_pretty_midi(midi_data)))
+
+
+@pytest.mark.parametrize('times', [None, np.linspace(0, 12, 40)])
+def test_dtypes(times):
+    """Test that rolls of every data type hold the float64 roll, rounded, saturated or binarized."""
+    note_table = NoteTable.from_pretty_midi(create_random_midi(0, num_instruments=6, with_bends=True))
+    expected = np.nan_to_num(get_piano_roll(note_table, fs=20, times=times))
+
+    rolls = {dtype: get_piano_roll(note_table, fs=20, times=times, dtype=dtype) for dtype in PIANO_ROLL_DTYPES}
+    assert all(roll.dtype == np.dtype(dtype) and roll.shape == expected.shape for dtype, roll in rolls.items())
+    assert np.array_equal(rolls['uint8'], np.minimum(np.rint(expected), 255))
+    assert np.allclose(rolls['float32'], expected) and np.allclose(rolls['float16'], expected, rtol=1e-3)
+    assert np.array_equal(rolls['bool'], expected > 0)
+    assert np.array_equal(get_piano_roll(note_table, fs=20, times=times, dtype='float32', binarize=True),
+                          (expected > 0).astype(np.float32))
+
+    with pytest.raises(ValueError):
+        get_piano_roll(note_table, dtype=np.int64)
+
+
+def test_out():
+    """Test that rolls are truncated or zero-padded into a preallocated array."""
+    note_table = NoteTable.from_pretty_midi(create_random_midi(0))
+    expected = get_piano_roll(note_table, fs=10, dtype=np.uint8)
+    width = expected.shape[1]
+
+    batch = np.full((2, 128, width + 5), 7, dtype=np.uint8)
+    row = batch[1]
+    assert get_piano_roll(note_table, fs=10, dtype=np.uint8, out=row) is row
+    assert np.array_equal(batch[1, :, :width], expected) and not batch[1, :, width:].any()
+    assert (batch[0] == 7).all()
+
+    truncated = np.empty((128, 10), dtype=np.uint8)
+    get_piano_roll(note_table, fs=10, dtype=np.uint8, out=truncated)
+    assert np.array_equal(truncated, expected[:, :10])
+
+    empty = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI())
+    assert not get_piano_roll(empty, dtype=np.uint8, out=np.ones((128, 3), dtype=np.uint8)).any()
+
+    with pytest.raises(ValueError):
+        get_piano_roll(note_table, dtype=np.uint8, out=np.empty((128, 10)))
+    with pytest.raises(ValueError):
+        get_piano_roll(note_table, out=np.empty((64, 10)))
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,74 @@
+import json
+import pickle
+
+import pytest
+
+from midiogre.augmentations import NoteAdd, NoteDelete, PitchShift
+from midiogre.core import Compose, ToPRollNumpy
+from midiogre.core.profiling import BUCKET_EDGES, Profiler, report
+from tests.core_mocks import create_note_table
+
+
+def test_compose_stats():
+    """Test that calls, hits, skips, note counts and times are recorded per transform."""
+    transform = Compose([PitchShift(max_shift=2, p=1.0), PitchShift(max_shift=2, p=0.0), NoteDelete(p=0.5),
+                         NoteAdd((60, 70), (50, 60), (0.1, 0.2), p=0.5), ToPRollNumpy(fs=10)], profile=True)
+    for _ in range(5):
+        transform(create_note_table())
+
+    stats = transform.stats()
+    assert list(stats) == ['0:PitchShift', '1:PitchShift', '2:NoteDelete', '3:NoteAdd', '4:ToPRollNumpy']
+    assert all(transform_stats['calls'] == 5 for transform_stats in stats.values())
+    assert stats['0:PitchShift']['hits'] == 5 and stats['0:PitchShift']['notes_touched'] == 100
+    assert stats['1:PitchShift']['skips'] == 5 and stats['1:PitchShift']['notes_touched'] == 0
+    assert stats['2:NoteDelete']['notes_deleted'] > 0 and stats['3:NoteAdd']['notes_added'] > 0
+    assert stats['4:ToPRollNumpy']['hits'] is None
+
+    for transform_stats in stats.values():
+        assert sum(transform_stats['histogram']) == 5
+        assert transform_stats['min_time'] <= transform_stats['p50'] <= transform_stats['p99'] \
+            <= transform_stats['max_time']
+
+    transform.reset_stats()
+    assert transform.stats() == {}
+
+
+def test_batched_calls_are_profiled():
+    """Test that apply_batch and expand record every transform, batched or not."""
+    transform = Compose([PitchShift(max_shift=2, p=1.0), ToPRollNumpy(fs=10)], profile=True)
+    transform.apply_batch([create_note_table(), create_note_table()])
+    transform.expand(create_note_table(), k=3)
+
+    stats = transform.stats()
+    assert stats['0:PitchShift']['calls'] == 2 and stats['0:PitchShift']['notes_touched'] == 100
+    assert stats['1:ToPRollNumpy']['calls'] == 2
+
+
+def test_export_and_merge(tmp_path):
+    """Test JSON export and merging stats of several profilers."""
+    transform = Compose([PitchShift(max_shift=2, p=1.0)], profile=True)
+    transform(create_note_table())
+    exported = json.loads(transform.export_stats(tmp_path / 'stats.json'))
+    assert exported == json.loads((tmp_path / 'stats.json').read_text())
+    assert exported['bucket_edges'] == list(BUCKET_EDGES)
+
+    profiler = pickle.loads(pickle.dumps(transform.profiler))
+    profiler.merge(exported['transforms'])
+    merged = profiler.stats()['0:PitchShift']
+    assert merged['calls'] == 2 and merged['hits'] == 2 and merged['notes_touched'] == 40
+
+
+def test_profiling_is_opt_in():
+    """Test that unprofiled compositions record nothing and report does nothing."""
+    transform = Compose([PitchShift(max_shift=2, p=1.0)])
+    transform(create_note_table())
+    report(touched=3)
+    assert transform.stats() == {} and json.loads(transform.export_stats())['transforms'] == {}
+
+    profiler = Profiler()
+    profiler.record('slow', 1e3)
+    assert profiler.stats()['slow']['histogram'][-1] == 1 and profiler.stats()['slow']['p99'] == 1e3
+
+
+if __name__ == '__main__':
+    pytest.main()
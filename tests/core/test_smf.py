@@ -0,0 +1,151 @@
+import io
+import random
+import warnings
+
+import mido
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.core.conversions import ConvertToNoteTable, ConvertToPrettyMIDI
+from midiogre.core.corpus import CorpusCache, pretty_midi_to_arrays
+from midiogre.core.smf import key_signature_to_key_number, parse_smf
+
+
+def random_midi_bytes(seed):
+    """Helper function to create a MIDI file exercising pretty_midi's parsing rules."""
+    rng = random.Random(seed)
+    midi_file = mido.MidiFile(ticks_per_beat=rng.choice([96, 220, 480]))
+    for track_idx in range(rng.randint(1, 4)):
+        track = mido.MidiTrack()
+        midi_file.tracks.append(track)
+        if rng.random() < 0.7:
+            track.append(mido.MetaMessage('track_name', name=f'track {track_idx} é'))
+        if track_idx == 0:
+            for _ in range(rng.randint(0, 3)):
+                track.append(mido.MetaMessage('set_tempo', tempo=rng.randint(200000, 1000000),
+                                              time=rng.randint(0, 300)))
+                track.append(mido.MetaMessage('time_signature', numerator=rng.choice([3, 4, 7]),
+                                              denominator=rng.choice([4, 8]), time=rng.randint(0, 3)))
+                track.append(mido.MetaMessage('key_signature', key=rng.choice(['C', 'Am', 'F#', 'Bbm', 'Cb'])))
+
+        for _ in range(rng.randint(0, 200)):
+            event = rng.random()
+            channel = rng.choice([0, 1, 9])
+            time = rng.choice([0, 0, 1, 5, 30])
+            if event < 0.4:
+                track.append(mido.Message('note_on', channel=channel, note=rng.randint(58, 62),
+                                          velocity=rng.choice([0, 64, 100]), time=time))
+            elif event < 0.6:
+                track.append(mido.Message('note_off', channel=channel, note=rng.randint(58, 62), time=time))
+            elif event < 0.7:
+                track.append(mido.Message('control_change', channel=channel, control=rng.randint(0, 127),
+                                          value=rng.randint(0, 127), time=time))
+            elif event < 0.75:
+                track.append(mido.Message('pitchwheel', channel=channel, pitch=rng.randint(-8192, 8191), time=time))
+            elif event < 0.8:
+                track.append(mido.Message('program_change', channel=channel, program=rng.randint(0, 3), time=time))
+            elif event < 0.85:
+                track.append(mido.MetaMessage('lyrics', text='la', time=time))
+            elif event < 0.9:
+                track.append(mido.MetaMessage('text', text=f'text {track_idx}', time=time))
+            elif event < 0.95:
+                track.append(mido.Message('sysex', data=[1, 2, 3], time=time))
+            else:
+                track.append(mido.Message('aftertouch', channel=channel, value=3, time=time))
+
+    midi_bytes = io.BytesIO()
+    midi_file.save(file=midi_bytes)
+    return midi_bytes.getvalue()
+
+
+def assert_arrays_equal(expected, arrays):
+    """Helper function to check that two dictionaries of arrays are identical."""
+    assert expected.keys() == arrays.keys()
+    for name in expected:
+        assert expected[name].dtype == arrays[name].dtype, name
+        assert np.array_equal(expected[name], arrays[name]), name
+
+
+@pytest.mark.parametrize('seed', range(25))
+def test_matches_pretty_midi(seed):
+    """Test that parsing yields exactly the arrays of pretty_midi's parse."""
+    midi_bytes = random_midi_bytes(seed)
+    expected = pretty_midi_to_arrays(pretty_midi.PrettyMIDI(io.BytesIO(midi_bytes)))
+    assert_arrays_equal(expected, parse_smf(midi_bytes))
+
+
+def test_running_status_and_unknown_chunks():
+    """Test a hand-written file with running status, sysex and an unknown chunk."""
+    track = bytes([
+        0x00, 0xff, 0x03, 0x02, ord('h'), ord('i'),  # Track name
+        0x00, 0xc1, 0x05,  # Program change on channel 1
+        0x00, 0x91, 0x3c, 0x40,  # Note on
+        0x00, 0x3e, 0x50,  # Note on, running status
+        0x00, 0xf0, 0x02, 0x7e, 0xf7,  # Sysex
+        0x83, 0x60, 0x91, 0x3c, 0x00,  # Note off after 480 ticks, as a note on with velocity 0
+        0x00, 0x3e, 0x00,  # Note off, running status
+        0x00, 0xff, 0x2f, 0x00,  # End of track
+    ])
+    midi_bytes = b'MThd' + (6).to_bytes(4, 'big') + bytes([0, 0, 0, 1, 0x01, 0xe0]) + \
+        b'XFIL' + (3).to_bytes(4, 'big') + b'abc' + b'MTrk' + len(track).to_bytes(4, 'big') + track
+
+    arrays = parse_smf(io.BytesIO(midi_bytes))
+    assert arrays['pitch'].tolist() == [60, 62]
+    assert arrays['velocity'].tolist() == [64, 80]
+    assert np.allclose(arrays['end'], 0.5) and arrays['programs'].tolist() == [5]
+    assert arrays['names'].tolist() == ['hi']
+
+    with pytest.raises(ValueError):
+        parse_smf(midi_bytes[:-6])
+    with pytest.raises(ValueError):
+        parse_smf(b'RIFF' + midi_bytes[4:])
+
+
+def test_key_signatures():
+    """Test that key signatures decode to pretty_midi's key numbers."""
+    for key, (sharps, minor) in mido.midifiles.meta._key_signature_encode.items():
+        assert key_signature_to_key_number(sharps, minor) == pretty_midi.key_name_to_key_number(key)
+    with pytest.raises(ValueError):
+        key_signature_to_key_number(8, 0)
+
+
+def test_misplaced_tempo_warning():
+    """Test that tempo events on non-zero tracks trigger pretty_midi's warning."""
+    midi_file = mido.MidiFile()
+    midi_file.tracks.append(mido.MidiTrack())
+    midi_file.tracks.append(mido.MidiTrack([mido.MetaMessage('set_tempo', tempo=400000, time=10)]))
+    midi_bytes = io.BytesIO()
+    midi_file.save(file=midi_bytes)
+
+    with pytest.warns(RuntimeWarning):
+        arrays = parse_smf(midi_bytes.getvalue())
+    assert len(arrays['tick_scales']) == 1
+
+
+def test_native_converters(tmp_path):
+    """Test that converters and caches using the native parser match pretty_midi."""
+    path = tmp_path / 'song.mid'
+    path.write_bytes(random_midi_bytes(3))
+    path = str(path)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = ConvertToPrettyMIDI()(path)
+
+    note_table = ConvertToNoteTable(parser='native')(path)
+    midi_data = ConvertToPrettyMIDI(parser='native')(path)
+    cached = CorpusCache(tmp_path / 'cache', parser='native').load_arrays(path)
+
+    assert np.array_equal(note_table.start, ConvertToNoteTable()(path).start)
+    assert_arrays_equal(pretty_midi_to_arrays(expected), pretty_midi_to_arrays(midi_data))
+    assert np.array_equal(cached['pitch'], note_table.pitch)
+    assert np.allclose(midi_data.get_beats(), expected.get_beats())
+
+    with pytest.raises(ValueError):
+        ConvertToNoteTable(parser='mido')
+    with pytest.raises(ValueError):
+        CorpusCache(tmp_path / 'cache', parser='mido')
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,77 @@
+import io
+
+import mido
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.core import TempoMap
+from midiogre.core.tempo_map import tempo_to_seconds_per_tick
+
+
+def tempo_change_midi(resolution=480):
+    """Helper function to create a Mido file with several tempo changes."""
+    midi_file = mido.MidiFile(ticks_per_beat=resolution)
+    track = mido.MidiTrack()
+    midi_file.tracks.append(track)
+    track.append(mido.MetaMessage('set_tempo', tempo=600000, time=0))
+    track.append(mido.MetaMessage('set_tempo', tempo=400000, time=1000))
+    track.append(mido.MetaMessage('set_tempo', tempo=400000, time=500))  # repeated tempo is ignored
+    track.append(mido.MetaMessage('set_tempo', tempo=1234567, time=700))
+    track.append(mido.Message('note_on', note=60, velocity=100, time=5000))
+    track.append(mido.Message('note_off', note=60, time=480))
+    return midi_file
+
+
+def test_matches_pretty_midi():
+    """Test that ticks are converted to exactly the times pretty_midi computes."""
+    midi_file = tempo_change_midi()
+    buffer = io.BytesIO()
+    midi_file.save(file=buffer)
+    buffer.seek(0)
+    midi_data = pretty_midi.PrettyMIDI(buffer)
+
+    tempo_map = TempoMap.from_mido(midi_file)
+    assert len(tempo_map) == 3
+    assert tempo_map.to_tick_scales() == midi_data._tick_scales
+    assert TempoMap.from_pretty_midi(midi_data).to_tick_scales() == midi_data._tick_scales
+
+    ticks = np.arange(8000)
+    assert np.array_equal(tempo_map.ticks_to_seconds(ticks), [midi_data.tick_to_time(tick) for tick in ticks])
+    assert np.allclose(tempo_map.tempi, [100.0, 150.0, 6e7 / 1234567])
+
+
+def test_round_trip():
+    """Test that seconds_to_ticks inverts ticks_to_seconds, also for fractional ticks."""
+    tempo_map = TempoMap.from_tempo_events([0, 1920, 3000], [500000, 1000000, 250000], resolution=480)
+
+    ticks = np.array([0.0, 0.5, 479.25, 1920.0, 2500.5, 3000.0, 12345.75])
+    assert np.allclose(tempo_map.seconds_to_ticks(tempo_map.ticks_to_seconds(ticks)), ticks)
+    assert np.allclose(tempo_map.ticks_to_seconds([480, 1920, 2400]), [0.5, 2.0, 3.0])
+    assert np.allclose(tempo_map.seconds_to_ticks(3.0), 2400.0)
+
+
+def test_default_tempo():
+    """Test that a map without tempo events is at 120 BPM."""
+    tempo_map = TempoMap.from_tempo_events([], [], resolution=220)
+    assert len(tempo_map) == 1 and np.isclose(tempo_map.tempi[0], 120.0)
+    assert tempo_map.seconds_per_tick[0] == tempo_to_seconds_per_tick(500000, 220)
+    assert np.allclose(tempo_map.ticks_to_seconds([0, 440]), [0.0, 1.0])
+
+
+def test_invalid_maps():
+    """Test that malformed tempo maps are rejected."""
+    with pytest.raises(ValueError):
+        TempoMap([], [], resolution=480)
+    with pytest.raises(ValueError):
+        TempoMap([0, 100], [0.001], resolution=480)
+    with pytest.raises(ValueError):
+        TempoMap([10], [0.001], resolution=480)
+    with pytest.raises(ValueError):
+        TempoMap([0, 200, 100], [0.001, 0.001, 0.001], resolution=480)
+    with pytest.raises(ValueError):
+        TempoMap([0], [0.0], resolution=480)
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from torch.utils.data import DataLoader
+
+from midiogre.augmentations import NoteDelete, PitchShift
+from midiogre.core import Compose, ConvertToNoteTable, ToPRollNumpy, tracing
+from midiogre.data import MidiDataset
+from midiogre.parallel import augment_corpus
+from tests.core_mocks import write_midi
+
+
+@pytest.fixture
+def trace_dir(tmp_path):
+    """Fixture enabling tracing into a temporary directory."""
+    trace_dir = tmp_path / 'trace'
+    tracing.enable_tracing(trace_dir)
+    yield trace_dir
+    tracing.disable_tracing()
+
+
+@pytest.fixture
+def midi_paths(tmp_path):
+    """Fixture writing a small corpus."""
+    return [write_midi(tmp_path / f'{idx}.mid', pitch=20 + 10 * idx) for idx in range(4)]
+
+
+def spans(trace):
+    """Helper function returning the complete events of a trace."""
+    return [event for event in trace['traceEvents'] if event['ph'] == 'X']
+
+
+def test_disabled_by_default(tmp_path, midi_paths):
+    """Test that nothing is recorded unless tracing is enabled."""
+    assert not tracing.is_tracing()
+    assert os.environ.get(tracing.TRACE_DIR_ENV) is None
+    with tracing.trace_file(midi_paths[0]), tracing.span('load', 'load'):
+        Compose([PitchShift(max_shift=2, p=1.0)])(ConvertToNoteTable()(midi_paths[0]))
+    tracing.flush()
+    assert tracing.merge_traces(tmp_path)['traceEvents'] == []
+
+
+def test_concurrent_spans_are_all_written(trace_dir, monkeypatch):
+    """Test that no span is lost when threads flush while others record."""
+    monkeypatch.setattr(tracing, 'FLUSH_THRESHOLD', 7)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+
+    def record(thread_idx):
+        for _ in range(500):
+            with tracing.span(f'thread {thread_idx}'):
+                pass
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(record, range(8)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert len(spans(tracing.merge_traces(trace_dir))) == 8 * 500
+
+
+def test_compose_spans(trace_dir, midi_paths, tmp_path):
+    """Test that every transform, conversion and rasterization gets a span tagged with the file."""
+    transform = Compose([PitchShift(max_shift=2, p=1.0), NoteDelete(p=0.1), ToPRollNumpy(fs=10)])
+    with tracing.trace_file(midi_paths[0]):
+        transform(ConvertToNoteTable()(midi_paths[0]))
+    transform.apply_batch([ConvertToNoteTable()(path) for path in midi_paths])
+
+    trace = tracing.merge_traces(trace_dir, tmp_path / 'trace.json')
+    assert json.loads((tmp_path / 'trace.json').read_text()) == trace
+
+    events = spans(trace)
+    assert [(event['name'], event['cat']) for event in events[:4]] == [
+        ('0:PitchShift', 'transform'), ('1:NoteDelete', 'transform'), ('2:ToPRollNumpy', 'conversion'),
+        ('get_piano_roll', 'rasterize'),
+    ]
+    assert all(event['args']['path'] == midi_paths[0] for event in events[:4])
+    assert all(event['pid'] == os.getpid() and event['dur'] >= 0 for event in events)
+
+    batched = [event for event in events[4:] if event['name'] == '0:PitchShift']
+    assert len(batched) == 1 and batched[0]['args'] == {'batch_size': 4}
+    assert [event['ts'] for event in events] == sorted(event['ts'] for event in events)
+
+
+def test_dataloader_workers_are_merged(trace_dir, midi_paths):
+    """Test that the spans of DataLoader workers are merged into one trace."""
+    dataset = MidiDataset(midi_paths, Compose([PitchShift(max_shift=2, p=1.0)]), ToPRollNumpy(fs=10),
+                          loader=ConvertToNoteTable(), seed=0)
+    assert len(list(DataLoader(dataset, batch_size=None, num_workers=2))) == len(midi_paths)
+
+    trace = tracing.merge_traces(trace_dir)
+    events = spans(trace)
+    assert len({event['pid'] for event in events}) == 2
+    assert {event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M'} == \
+        {'DataLoader worker 0', 'DataLoader worker 1'}
+
+    for path in midi_paths:
+        names = {event['name'] for event in events if event['args']['path'] == path}
+        assert names == {'load', 'augment', '0:PitchShift', 'ToPRollNumpy', 'get_piano_roll'}
+
+
+def test_augment_corpus_spans(trace_dir, midi_paths):
+    """Test that worker processes of augment_corpus record a span per load, copy and conversion."""
+    results = list(augment_corpus(midi_paths, Compose([PitchShift(max_shift=2, p=1.0)]), workers=2, copies=3,
+                                  conversion=ToPRollNumpy(fs=10), seed=0))
+    assert len(results) == len(midi_paths)
+
+    events = [event for event in spans(tracing.merge_traces(trace_dir)) if event['pid'] != os.getpid()]
+    for path in midi_paths:
+        names = [event['name'] for event in events if event['args']['path'] == path]
+        assert names.count('load') == 1 and names.count('ToPRollNumpy') == 3
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,119 @@
+import os
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from midiogre.augmentations import NoteDelete, PitchShift
+from midiogre.core import Compose
+from midiogre.core.seeding import seed_sample
+from midiogre.core.transforms_interface import counter_rng
+from tests.core_mocks import create_note_table
+
+
+def test_seed_and_rng():
+    """Test that seeded transforms and transforms sharing a generator are reproducible."""
+    note_table = create_note_table(num_notes=50, num_instruments=2)
+    expected = PitchShift(max_shift=12, p=0.5, seed=1)(note_table.copy()).pitch
+    assert np.array_equal(PitchShift(max_shift=12, p=0.5, seed=1)(note_table.copy()).pitch, expected)
+    assert not np.array_equal(PitchShift(max_shift=12, p=0.5, seed=2)(note_table.copy()).pitch, expected)
+
+    rng = np.random.default_rng(5)
+    transform = NoteDelete(p=0.5, rng=rng, seed=1)
+    assert transform.rng is rng
+
+    transform.reseed(1)
+    assert transform.rng is not rng
+    assert np.array_equal(PitchShift(max_shift=12, p=0.5, rng=transform.rng)(note_table.copy()).pitch, expected)
+
+
+def test_unseeded_copies_draw_fresh_entropy():
+    """Test that unpickled copies of unseeded transforms do not repeat each other."""
+    unseeded = PitchShift(max_shift=12)
+    copies = [pickle.loads(pickle.dumps(unseeded)) for _ in range(2)]
+    assert not np.array_equal(copies[0].rng.random(8), copies[1].rng.random(8))
+
+    seeded = PitchShift(max_shift=12, seed=3)
+    copies = [pickle.loads(pickle.dumps(seeded)) for _ in range(2)]
+    assert np.array_equal(copies[0].rng.random(8), copies[1].rng.random(8))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires fork")
+def test_unseeded_transforms_reseeded_after_fork():
+    """Test that a forked child draws different values than its parent."""
+    transform = PitchShift(max_shift=12)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, transform.rng.random(4).tobytes())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child_values = np.frombuffer(os.read(read_fd, 32), dtype=np.float64)
+    os.close(read_fd)
+    os.close(write_fd)
+    assert not np.array_equal(child_values, transform.rng.random(4))
+
+
+def test_counter_rng():
+    """Test that counter-based generators depend only on (seed, epoch, index, stream)."""
+    expected = counter_rng(42, 3, 1017).random(6)
+    rng = counter_rng(42, 0, 0)
+    rng.random(100)
+    assert np.array_equal(counter_rng(42, 3, 1017, rng=rng).random(6), expected)
+    assert rng.bit_generator.state['state']['counter'][2:].tolist() != [0, 0]
+
+    others = [counter_rng(43, 3, 1017), counter_rng(42, 4, 1017), counter_rng(42, 3, 1018),
+              counter_rng(42, 3, 1017, stream=(1,))]
+    assert not any(np.array_equal(other.random(6), expected) for other in others)
+
+    with pytest.raises(ValueError):
+        counter_rng(42, -1, 0)
+
+
+def test_reseed_sample():
+    """Test that samples are augmented the same in any order, with distinct streams per transform."""
+    note_table = create_note_table(num_notes=50, num_instruments=2)
+    transform = Compose([PitchShift(max_shift=12, p=0.5), Compose([PitchShift(max_shift=12, p=0.5)])])
+
+    def augment(epoch, index):
+        transform.reseed_sample(7, epoch, index)
+        return transform(note_table.copy()).pitch
+
+    forward = [augment(0, index) for index in range(4)]
+    backward = [augment(0, index) for index in reversed(range(4))][::-1]
+    assert all(np.array_equal(a, b) for a, b in zip(forward, backward))
+    assert not np.array_equal(augment(1, 0), forward[0])
+
+    transform.reseed_sample(7, 0, 0)
+    first, nested = transform.transforms[0].rng, transform.transforms[1].transforms[0].rng
+    assert not np.array_equal(first.random(4), nested.random(4))
+
+
+def test_seed_sample_restores_generators():
+    """Test that seeding one sample leaves the caller's and the global generators as they were."""
+    note_table = create_note_table(num_notes=50, num_instruments=2)
+    transform = Compose([PitchShift(max_shift=12, p=0.5, seed=1), Compose([NoteDelete(p=0.5, seed=2)])])
+    transform.reseed_sample(7, 0, 3)
+    expected = transform(note_table.copy()).pitch
+
+    transform.reseed(5)
+    np.random.seed(123)
+    random.seed(123)
+    inner = transform.transforms[1].transforms[0].rng
+    with seed_sample(transform, 7, 0, 3):
+        assert np.array_equal(transform(note_table.copy()).pitch, expected)
+    assert transform.transforms[1].transforms[0].rng is inner
+    assert np.random.random() == np.random.RandomState(123).random_sample()
+    assert random.random() == random.Random(123).random()
+
+    transform.reseed(5)
+    unseeded = transform(note_table.copy()).pitch
+    transform.reseed(5)
+    with transform.sample_rng(7, 0, 3):
+        pass
+    assert np.array_equal(transform(note_table.copy()).pitch, unseeded)
+
+
+if __name__ == '__main__':
+    pytest.main()
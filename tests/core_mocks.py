@@ -1,12 +1,26 @@
 from unittest.mock import Mock
+import numpy as np
 import pretty_midi
 
+from midiogre.core.note_table import NoteTable
+
+
+class MockGenerator(np.random.Generator):
+    """Random generator whose methods can be replaced with monkeypatch."""
+
+    def __init__(self, seed=0):
+        super().__init__(np.random.PCG64(seed))
+
 
 def generate_mock_midi_data(num_notes):
     """Generate a mock MIDI data object with real pretty_midi Note objects."""
     midi_data = Mock()
     instrument = Mock()
     instrument.is_drum = False
+    instrument.program = 0
+    instrument.name = ''
+    instrument.control_changes = []
+    instrument.pitch_bends = []
 
     mock_note_list = []
     for note_num in range(num_notes):
@@ -22,3 +36,47 @@ def generate_mock_midi_data(num_notes):
     midi_data.instruments = [instrument]
 
     return midi_data
+
+
+def create_midi(num_instruments=2, num_notes=10, pitch=60, pitch_step=1, num_pitches=None, velocity=80,
+                drum_last=False, with_events=False):
+    """Create a multi-instrument PrettyMIDI object with one note per second per instrument.
+
+    Instrument i has program i, name f'inst{i}' and notes of velocity `velocity + i`,
+    with pitches rising by `pitch_step` from `pitch`, starting over every `num_pitches`
+    notes if given. With `with_events`, the object also has a tempo change, time and
+    key signatures, a lyric, a sustain pedal control change and a pitch bend per
+    instrument.
+    """
+    midi_data = pretty_midi.PrettyMIDI(initial_tempo=100 if with_events else 120)
+    if with_events:
+        midi_data._tick_scales.append((960, 60.0 / (150 * midi_data.resolution)))
+        midi_data.time_signature_changes.append(pretty_midi.TimeSignature(3, 4, 0.0))
+        midi_data.key_signature_changes.append(pretty_midi.KeySignature(5, 1.0))
+        midi_data.lyrics.append(pretty_midi.Lyric('la', 2.0))
+    for instrument_idx in range(num_instruments):
+        is_drum = drum_last and instrument_idx == num_instruments - 1
+        instrument = pretty_midi.Instrument(program=instrument_idx, is_drum=is_drum, name=f'inst{instrument_idx}')
+        for note_num in range(num_notes):
+            instrument.notes.append(pretty_midi.Note(velocity=velocity + instrument_idx,
+                                                     pitch=pitch + pitch_step * (note_num % (num_pitches or num_notes)),
+                                                     start=float(note_num), end=note_num + 0.5))
+        if with_events:
+            instrument.control_changes.append(pretty_midi.ControlChange(number=64, value=100, time=0.5))
+            instrument.pitch_bends.append(pretty_midi.PitchBend(pitch=500, time=1.5))
+        midi_data.instruments.append(instrument)
+    return midi_data
+
+
+def write_midi(path, pitch=60, num_notes=32, num_instruments=1, num_pitches=8, **kwargs):
+    """Write a MIDI file created with `create_midi` and return its path as a string."""
+    create_midi(num_instruments, num_notes, pitch, num_pitches=num_pitches, **kwargs).write(str(path))
+    return str(path)
+
+
+def create_note_table(num_notes=20, num_instruments=1):
+    """Create a NoteTable whose notes alternate between instruments."""
+    return NoteTable(pitch=np.full(num_notes, 60), velocity=np.full(num_notes, 80),
+                     start=np.arange(num_notes, dtype=float), end=np.arange(num_notes) + 0.5,
+                     instrument=np.arange(num_notes) % num_instruments, programs=list(range(num_instruments)),
+                     is_drum=[False] * num_instruments)
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.imports import LIGHT_MODULES, run as run_imports, slowest_dependencies
+from benchmarks.loader import DISTRIBUTIONS, MAX_NOTES, MIN_NOTES, file_lengths, run as run_loader
+from benchmarks.memory import run as run_memory
+from benchmarks.micro import BENCHMARKS, find_superlinear, run
+from benchmarks.synthetic import MAX_DURATION, SyntheticPiece, make_note_table
+
+
+def test_make_note_table():
+    """Test that synthetic pieces have the requested size and bounded duration."""
+    note_table = make_note_table(1003, num_instruments=4)
+    assert len(note_table) == 1003 and note_table.num_instruments == 4
+    assert np.ptp(np.bincount(note_table.instrument)) <= 1
+    assert note_table.start.max() < MAX_DURATION
+    assert np.array_equal(make_note_table(50, seed=1).velocity, make_note_table(50, seed=1).velocity)
+
+    with pytest.raises(ValueError):
+        make_note_table(10, num_instruments=0)
+
+
+def test_fresh_copies(tmp_path):
+    """Test that every representation of a piece holds all of its notes."""
+    piece = SyntheticPiece(40, num_instruments=2, directory=str(tmp_path))
+    assert sum(len(instrument.notes) for instrument in piece.fresh('pretty_midi').instruments) == 40
+    assert piece.fresh('path').startswith(str(tmp_path))
+    assert len(piece.fresh('mido').tracks) == 3
+    assert piece.fresh('note_table') is not piece.fresh('note_table')
+
+
+def test_run_micro_benchmarks():
+    """Test that every benchmark runs on a small grid."""
+    report = run(note_counts=[50, 100], instrument_counts=[1, 2], min_time=0, max_repeats=1, verbose=False)
+    assert len(report['results']) == 4 * len(BENCHMARKS)
+    assert all(result['best'] > 0 for result in report['results'])
+
+
+def test_find_superlinear():
+    """Test that steps growing faster than linearly are flagged."""
+    results = [{'name': 'linear', 'notes': notes, 'instruments': 1, 'best': notes * 1e-5} for notes in (100, 1000)]
+    results += [{'name': 'quadratic', 'notes': notes, 'instruments': 1, 'best': notes ** 2 * 1e-7}
+                for notes in (100, 1000)]
+    flags = find_superlinear(results)
+    assert [(flag['name'], flag['axis'], flag['from'], flag['to']) for flag in flags] == \
+        [('quadratic', 'notes', 100, 1000)]
+    assert flags[0]['exponent'] == pytest.approx(2)
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+def test_file_lengths(distribution):
+    """Test that file lengths are drawn around the median and within bounds."""
+    lengths = file_lengths(distribution, 200, 1000)
+    assert len(lengths) == 200 and lengths.min() >= MIN_NOTES and lengths.max() <= MAX_NOTES
+    assert 200 <= np.median(lengths) <= 1500
+
+
+def test_run_loader_benchmark():
+    """Test that the loader harness reports every configuration."""
+    report = run_loader(worker_counts=[0, 1], batch_sizes=[3], distributions=['bimodal'], num_files=5,
+                        median_notes=40, num_instruments=2, verbose=False)
+    assert [(result['num_workers'], result['batch_size']) for result in report['results']] == [(0, 3), (1, 3)]
+    for result in report['results']:
+        assert result['samples'] == 5 and result['batches'] == 2
+        assert 0 < result['latency_p50'] <= result['latency_p99'] <= result['latency_max']
+        assert result['samples_per_second'] > 0
+    assert report['environment']['cpu_count'] == os.cpu_count()
+
+
+def test_run_memory_benchmark():
+    """Test that the memory benchmark measures every stage in separate processes."""
+    report = run_memory(note_counts=[200], instrument_counts=[2], stages=['load', 'rasterize'], verbose=False)
+    load, rasterize = report['results']
+    assert load['tracemalloc_peak'] > load['usage']['notes'] > 0
+    assert rasterize['roll_nbytes'] == rasterize['usage']['piano_roll']
+    assert rasterize['tracemalloc_peak'] >= rasterize['roll_nbytes']
+    if load['peak_rss'] is not None:
+        assert rasterize['peak_rss'] >= rasterize['baseline_rss']
+
+    with pytest.raises(ValueError):
+        run_memory(stages=['train'], verbose=False)
+
+
+def test_light_modules_import_lazily():
+    """Test that modules which do not need torch or matplotlib do not import them."""
+    report = run_imports(LIGHT_MODULES, repeats=1, top=3, verbose=False)
+    assert report['failures'] == []
+    assert all(result['heavy'] == [] and result['median'] > 0 for result in report['results'])
+    assert len(report['results'][0]['slowest']) <= 3
+
+    report = run_imports(['midiogre.core'], repeats=1, max_seconds=0, verbose=False)
+    assert len(report['failures']) == 1 and report['failures'][0].startswith('midiogre.core takes')
+
+
+def test_slowest_dependencies():
+    """Test that import times are summed by top-level package."""
+    output = '\n'.join(['import time: self [us] | cumulative | imported package',
+                         'import time:       300 |        300 |     numpy.core',
+                         'import time:       200 |        500 |   numpy',
+                         'import time:       400 |        400 | mido'])
+    assert slowest_dependencies(output) == [('numpy', pytest.approx(5e-4)), ('mido', pytest.approx(4e-4))]
+    assert slowest_dependencies(output, top=1)[0][0] == 'numpy'
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.augmentations import NoteDelete, PitchShift
+from midiogre.cli import QUARANTINE_FILE, build_pipeline, main
+from tests.core_mocks import write_midi
+
+PIPELINE = json.dumps([{'name': 'PitchShift', 'max_shift': 3, 'p': 1.0}, 'NoteDelete'])
+
+
+@pytest.fixture
+def midi_dir(tmp_path):
+    """Fixture writing a nested corpus with one corrupt file."""
+    (tmp_path / 'midi' / 'sub').mkdir(parents=True)
+    write_midi(tmp_path / 'midi' / 'a.mid')
+    write_midi(tmp_path / 'midi' / 'sub' / 'b.mid', pitch=60)
+    (tmp_path / 'midi' / 'broken.mid').write_bytes(b'not a midi file')
+    return tmp_path / 'midi'
+
+
+def test_build_pipeline(tmp_path):
+    """Test building pipelines from inline and file specifications."""
+    pipeline = build_pipeline(PIPELINE)
+    assert [type(transform) for transform in pipeline.transforms] == [PitchShift, NoteDelete]
+    assert pipeline.transforms[0].max_shift == 3
+
+    spec_path = tmp_path / 'pipeline.json'
+    spec_path.write_text('["ConvertToMido", {"name": "TempoShift", "max_shift": 10}]')
+    assert len(build_pipeline(str(spec_path))) == 2
+
+    for spec in ['{"name": "PitchShift"}', '["Unknown"]', '[{"max_shift": 2}]', 'not json']:
+        with pytest.raises(ValueError):
+            build_pipeline(spec)
+
+
+@pytest.mark.parametrize('workers', ['0', '2'])
+def test_augment_midi(midi_dir, tmp_path, workers):
+    """Test that copies are written, failures quarantined and finished files skipped."""
+    out_dir = tmp_path / 'out'
+    args = ['augment', str(midi_dir), str(out_dir), '--pipeline', PIPELINE, '--copies', '2', '--workers', workers, '--quiet']
+
+    assert main(args) == 1
+    assert sorted(str(path.relative_to(out_dir)) for path in out_dir.rglob('*.mid')) == \
+           ['a_0.mid', 'a_1.mid', 'sub/b_0.mid', 'sub/b_1.mid']
+    augmented = pretty_midi.PrettyMIDI(str(out_dir / 'sub' / 'b_0.mid'))
+    assert all(57 <= note.pitch <= 70 for note in augmented.instruments[0].notes)
+    quarantine = (out_dir / QUARANTINE_FILE).read_text().splitlines()
+    assert len(quarantine) == 1 and quarantine[0].startswith(str(midi_dir / 'broken.mid'))
+
+    # Resuming skips finished and quarantined files
+    (out_dir / 'a_1.mid').unlink()
+    modified_time = (out_dir / 'sub' / 'b_0.mid').stat().st_mtime_ns
+    assert main(args) == 0
+    assert (out_dir / 'a_1.mid').is_file()
+    assert (out_dir / 'sub' / 'b_0.mid').stat().st_mtime_ns == modified_time
+
+    assert main(args + ['--retry-quarantined']) == 1
+    assert (out_dir / QUARANTINE_FILE).read_text().splitlines() == quarantine
+
+    # Files that succeed on retry leave the quarantine
+    write_midi(midi_dir / 'broken.mid')
+    assert main(args + ['--retry-quarantined']) == 0
+    assert (out_dir / QUARANTINE_FILE).read_text() == ''
+    assert (out_dir / 'broken_1.mid').is_file()
+
+
+def test_augment_rolls_from_glob(midi_dir, tmp_path):
+    """Test writing piano rolls of the files matching a glob pattern."""
+    out_dir = tmp_path / 'rolls'
+    assert main(['augment', str(midi_dir / '**' / 'b.mid'), str(out_dir), '--pipeline', '[]', '--format', 'roll',
+                 '--fs', '10', '--workers', '0', '--quiet']) == 0
+
+    piano_roll = np.load(out_dir / 'b_0.npy')
+    assert piano_roll.shape[0] == 128 and piano_roll[60:68].max() == 80
+
+
+def test_invalid_arguments(midi_dir, tmp_path):
+    """Test that invalid arguments exit with a usage error."""
+    for args in [['--pipeline', '["Unknown"]'], ['--pipeline', '[]', '--copies', '-1']]:
+        with pytest.raises(SystemExit):
+            main(['augment', str(midi_dir), str(tmp_path / 'out')] + args)
+
+
+if __name__ == '__main__':
+    pytest.main()
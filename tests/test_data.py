@@ -0,0 +1,100 @@
+import random
+
+import numpy as np
+import pytest
+from torch.utils.data import DataLoader
+
+from midiogre.augmentations import PitchShift
+from midiogre.core import Compose, ConvertToNoteTable
+from midiogre.data import MidiDataset, MidiIterableDataset
+from tests.core_mocks import write_midi
+
+
+def get_pitches(note_table):
+    """Conversion returning the pitches of a NoteTable."""
+    return note_table.pitch.copy()
+
+
+def create_dataset(dataset_class, paths, **kwargs):
+    """Helper function to create a dataset that pitch shifts every note of every file."""
+    return dataset_class(paths, transform=Compose([PitchShift(max_shift=30, mode='both', p=1.0)]),
+                         conversion=get_pitches, loader=ConvertToNoteTable(), **kwargs)
+
+
+def test_dataset_directory_and_length(tmp_path):
+    """Test that a directory is searched for MIDI files."""
+    for idx in range(3):
+        write_midi(tmp_path / f'{idx}.mid')
+    dataset = MidiDataset(str(tmp_path), loader=ConvertToNoteTable())
+
+    assert len(dataset) == 3
+    assert np.array_equal(dataset[0].pitch, ConvertToNoteTable()(str(tmp_path / '0.mid')).pitch)
+
+
+def test_workers_draw_different_augmentations(tmp_path):
+    """Test that forked workers do not repeat each other's augmentations."""
+    paths = [write_midi(tmp_path / 'song.mid')] * 4
+    loader = DataLoader(create_dataset(MidiDataset, paths), batch_size=None, num_workers=2)
+
+    pitches = [tuple(item.tolist()) for item in loader]
+    assert len(set(pitches)) == 4
+
+
+def test_seed_is_independent_of_workers(tmp_path):
+    """Test that seeded augmentations depend only on the seed, epoch and index."""
+    paths = [write_midi(tmp_path / 'song.mid')] * 4
+    dataset = create_dataset(MidiDataset, paths, seed=0)
+
+    single = [item.tolist() for item in DataLoader(dataset, batch_size=None, num_workers=0)]
+    multi = [item.tolist() for item in DataLoader(dataset, batch_size=None, num_workers=2)]
+    assert single == multi
+    assert dataset[1].tolist() == single[1] and single[0] != single[1]
+
+    dataset.set_epoch(1)
+    assert dataset[1].tolist() != single[1]
+
+
+@pytest.mark.parametrize('dataset_class', [MidiDataset, MidiIterableDataset])
+def test_seeded_main_process_keeps_caller_rngs(tmp_path, dataset_class):
+    """Test that seeded items augmented in the main process leave the caller's generators as they were."""
+    paths = [write_midi(tmp_path / f'{idx}.mid') for idx in range(3)]
+    dataset = create_dataset(dataset_class, paths, seed=0)
+    pitch_shift = dataset.transform.transforms[0]
+    pitch_shift.reseed(5)
+    rng = pitch_shift.rng
+    np.random.seed(123)
+    random.seed(123)
+
+    assert len(list(DataLoader(dataset, batch_size=None, num_workers=0))) == 3
+    assert np.random.random() == np.random.RandomState(123).random_sample()
+    assert random.random() == random.Random(123).random()
+    assert pitch_shift.rng is rng
+
+
+def test_iterable_dataset_splits_files_across_workers(tmp_path):
+    """Test that every file is used exactly once per epoch."""
+    paths = [write_midi(tmp_path / f'{idx}.mid', pitch=20 + 10 * idx) for idx in range(5)]
+    dataset = MidiIterableDataset(paths, conversion=lambda note_table: int(note_table.pitch[0]),
+                                  loader=ConvertToNoteTable())
+
+    first_pitches = list(DataLoader(dataset, batch_size=None, num_workers=2))
+    assert sorted(first_pitches) == [20, 30, 40, 50, 60]
+
+
+def test_iterable_dataset_prefetch(tmp_path):
+    """Test that prefetching yields the same items as loading on demand."""
+    paths = [write_midi(tmp_path / f'{idx}.mid', pitch=20 + 10 * idx) for idx in range(5)]
+
+    expected = [item.tolist() for item in create_dataset(MidiIterableDataset, paths, seed=3)]
+    prefetched = [item.tolist() for item in create_dataset(MidiIterableDataset, paths, seed=3, prefetch=2)]
+    unshuffled = [item.tolist() for item in create_dataset(MidiIterableDataset, paths, seed=3, shuffle=False)]
+
+    assert prefetched == expected
+    assert sorted(unshuffled) == sorted(expected) and len(expected) == 5
+
+    with pytest.raises(ValueError):
+        MidiIterableDataset(paths, prefetch=-1)
+
+
+if __name__ == '__main__':
+    pytest.main()
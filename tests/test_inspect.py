@@ -0,0 +1,52 @@
+import mido
+import numpy as np
+import pretty_midi
+import pytest
+
+from midiogre.core import NoteTable, ToPRollNumpy
+from midiogre.inspect import NOTE_TABLE_BYTES_PER_NOTE, memory_usage, piano_roll_nbytes
+from tests.core_mocks import write_midi
+
+
+def test_pretty_midi_usage(tmp_path):
+    """Test that Note objects, the tick table and the piano roll are accounted for."""
+    midi_data = pretty_midi.PrettyMIDI(write_midi(tmp_path / 'song.mid'))
+    usage = memory_usage(midi_data, fs=100)
+
+    tick_table = midi_data._PrettyMIDI__tick_to_time
+    assert usage['tick_table'] == tick_table.nbytes
+    assert usage['notes'] > 32 * 64
+    assert usage['total'] == sum(usage[key] for key in ('notes', 'control_changes', 'pitch_bends', 'tick_table',
+                                                        'tick_scales', 'events', 'object'))
+    assert usage['note_table'] == 32 * NOTE_TABLE_BYTES_PER_NOTE
+    assert usage['piano_roll'] == ToPRollNumpy(fs=100)(midi_data).nbytes
+    assert memory_usage(midi_data, fs=100, roll_dtype=np.uint8)['piano_roll'] == usage['piano_roll'] // 8
+
+
+def test_note_table_usage(tmp_path):
+    """Test that the arrays of a NoteTable are accounted for exactly."""
+    note_table = NoteTable.from_pretty_midi(pretty_midi.PrettyMIDI(write_midi(tmp_path / 'song.mid')))
+    usage = memory_usage(note_table, fs=10)
+    assert usage['notes'] == usage['note_table'] == len(note_table) * NOTE_TABLE_BYTES_PER_NOTE
+    assert 'tick_table' not in usage
+    assert usage['piano_roll'] == ToPRollNumpy(fs=10)(note_table).nbytes
+
+
+def test_mido_usage(tmp_path):
+    """Test that the messages of Mido files are accounted for."""
+    usage = memory_usage(mido.MidiFile(write_midi(tmp_path / 'song.mid')))
+    assert usage['messages'] > 64 * 32
+    assert usage['note_table'] is None and usage['piano_roll'] is None
+
+    with pytest.raises(TypeError):
+        memory_usage('song.mid')
+
+
+def test_piano_roll_nbytes():
+    """Test the size of piano rolls."""
+    assert piano_roll_nbytes(2.0, fs=50) == 128 * 100 * 8
+    assert piano_roll_nbytes(2.0, fs=50, dtype=np.float16) == 128 * 100 * 2
+
+
+if __name__ == '__main__':
+    pytest.main()
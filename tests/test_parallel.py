@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pretty_midi
+import pytest
+import torch
+
+from midiogre.augmentations import PitchShift
+from midiogre.core import Compose, NoteTable, ToPRollNumpy, ToPRollTensor
+from midiogre.parallel import _from_shared_memory, _to_shared_memory, augment_corpus
+from tests.core_mocks import write_midi
+
+
+@pytest.fixture
+def midi_paths(tmp_path):
+    """Fixture writing a small corpus with one corrupt file."""
+    paths = [write_midi(tmp_path / f'{idx}.mid', pitch=20 + 10 * idx) for idx in range(4)]
+    (tmp_path / 'broken.mid').write_bytes(b'not a midi file')
+    return paths
+
+
+def test_shared_memory_round_trip():
+    """Test that results are restored from shared memory unchanged."""
+    midi_data = pretty_midi.PrettyMIDI(initial_tempo=90)
+    note_table = NoteTable(pitch=[60, 62], velocity=[80, 90], start=[0.0, 1.0], end=[0.5, 1.5],
+                           instrument=[0, 1], programs=[0, 33], is_drum=[False, True], names=['a', 'b'])
+    variants = [note_table, np.arange(6, dtype=np.float32).reshape(2, 3), torch.ones(3, dtype=torch.uint8),
+                {'meta': 1}, midi_data]
+
+    restored = _from_shared_memory(*_to_shared_memory(variants))
+
+    assert np.array_equal(restored[0].pitch, note_table.pitch) and restored[0].names == ['a', 'b']
+    assert np.array_equal(restored[0].is_drum, [False, True])
+    assert restored[1].dtype == np.float32 and np.array_equal(restored[1], variants[1])
+    assert torch.equal(restored[2], variants[2])
+    assert restored[3] == {'meta': 1} and isinstance(restored[4], pretty_midi.PrettyMIDI)
+    assert _to_shared_memory([None])[0] is None
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_augment_corpus(midi_paths, workers):
+    """Test that every file yields its augmented copies, in any order."""
+    transform = Compose([PitchShift(max_shift=5, mode='up', p=1.0)])
+    results = list(augment_corpus(midi_paths, transform, workers=workers, copies=3, seed=0))
+
+    assert sorted(result.index for result in results) == [0, 1, 2, 3]
+    for result in results:
+        assert result.path == midi_paths[result.index] and result.error is None
+        assert len(result.variants) == 3
+        base_pitch = 20 + 10 * result.index
+        for note_table in result.variants:
+            assert len(note_table) == 32
+            assert np.all(note_table.pitch >= base_pitch) and np.all(note_table.pitch <= base_pitch + 12)
+
+
+def test_augment_corpus_is_reproducible(midi_paths):
+    """Test that seeded results do not depend on the number of workers."""
+    transform = Compose([PitchShift(max_shift=5, mode='both', p=1.0)])
+
+    serial = list(augment_corpus(midi_paths, transform, workers=0, copies=2, seed=1, conversion=ToPRollNumpy()))
+    parallel = list(augment_corpus(midi_paths, transform, workers=2, copies=2, seed=1, ordered=True,
+                                   conversion=ToPRollNumpy()))
+
+    assert [result.index for result in parallel] == [0, 1, 2, 3]
+    for expected, result in zip(serial, parallel):
+        assert all(np.array_equal(a, b) for a, b in zip(expected.variants, result.variants))
+    assert not np.array_equal(serial[0].variants[0], serial[0].variants[1])
+
+
+def test_augment_corpus_in_process_keeps_caller_state(midi_paths):
+    """Test that augmenting in the calling process leaves the caller's transform and generators as they were."""
+    transform = Compose([PitchShift(max_shift=6, p=1.0, seed=5)])
+    pitch_shift = transform.transforms[0]
+    rng = pitch_shift.rng
+    rng_state = rng.bit_generator.state
+    np.random.seed(123)
+    random.seed(123)
+
+    assert len(list(augment_corpus(midi_paths, transform, workers=0, copies=2, seed=1))) == 4
+    assert pitch_shift.rng is rng and rng.bit_generator.state == rng_state
+    assert np.random.random() == np.random.RandomState(123).random_sample()
+    assert random.random() == random.Random(123).random()
+
+
+def test_augment_corpus_errors(midi_paths, tmp_path):
+    """Test that corrupt files are reported or raised."""
+    paths = midi_paths + [str(tmp_path / 'broken.mid')]
+    transform = Compose([])
+
+    results = list(augment_corpus(paths, transform, workers=2, ordered=True, skip_errors=True,
+                                  conversion=ToPRollTensor()))
+    assert [result.error is None for result in results] == [True] * 4 + [False]
+    assert results[-1].variants is None and isinstance(results[0].variants[0], torch.Tensor)
+
+    with pytest.raises(RuntimeError):
+        list(augment_corpus(paths, transform, workers=0))
+
+    with pytest.raises(ValueError):
+        list(augment_corpus(paths, transform, copies=-1))
+
+
+if __name__ == '__main__':
+    pytest.main()